@@ -0,0 +1,163 @@
+# activity.py
+# Columnar activity engine: a user's activity becomes int32 arrays of
+# day ordinals (days since 1970-01-01) and minutes, reduced with
+# np.bincount through calendar lookup tables that map each day of a
+# window to its daily / ISO-week / month bucket index.
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import numpy as np
+from models.quest import rollups_collection
+
+EPOCH = date(1970, 1, 1)
+
+# -----------------------------
+# Columns
+# -----------------------------
+def day_ordinal(d):
+    return (d - EPOCH).days
+
+def day_ordinals(day_strings):
+    """
+    Parses YYYY-MM-DD strings into an int32 array, vectorised.
+    Malformed entries become -1 so they fall outside every window.
+    """
+    days = list(day_strings)
+    try:
+        return np.array(days, dtype="datetime64[D]").astype(np.int32)
+    except ValueError:
+        ordinals = np.full(len(days), -1, dtype=np.int32)
+        for i, day in enumerate(days):
+            try:
+                ordinals[i] = np.datetime64(day, "D").astype(np.int32)
+            except ValueError:
+                pass
+        return ordinals
+
+def columns_from_logs(logs):
+    """
+    spent_logs -> (day ordinals, minutes), one entry per log.
+    """
+    logs = list(logs)
+    ordinals = day_ordinals((log.get("spent_at") or "")[:10] for log in logs)
+    minutes = np.fromiter((log.get("spent_minutes", 0) for log in logs), dtype=np.int32, count=len(logs))
+    return ordinals, minutes
+
+def load_activity(user_id, start_day, end_day):
+    """
+    Loads the user's rollup days in start_day..end_day as columns:
+    day, actual, planned, active (int32).
+    """
+    rows = list(rollups_collection.find(
+        {"userId": user_id, "day": {"$gte": start_day, "$lte": end_day}},
+        {"_id": 0, "day": 1, "actual_total": 1, "planned_total": 1, "active_logs": 1}
+    ))
+
+    return {
+        "day": day_ordinals(row["day"] for row in rows),
+        "actual": np.array([row.get("actual_total", 0) for row in rows], dtype=np.int32),
+        "planned": np.array([row.get("planned_total", 0) for row in rows], dtype=np.int32),
+        "active": np.array([row.get("active_logs", 0) for row in rows], dtype=np.int32)
+    }
+
+# -----------------------------
+# Calendar lookup tables (cached per window, so per day for "today"-anchored windows)
+# -----------------------------
+@lru_cache(maxsize=64)
+def calendar_table(start_ordinal, n_days):
+    """
+    For the window [start_ordinal, start_ordinal + n_days) returns
+    {mode: (bucket index per day, bucket labels)} for daily, weekly and monthly.
+    """
+    days = np.arange(start_ordinal, start_ordinal + n_days, dtype=np.int32)
+    as_dates = days.astype("datetime64[D]")
+
+    # 1970-01-01 was a Thursday; shift so Monday is weekday 0
+    week_starts = days - (days + 3) % 7
+    week_index = (week_starts - week_starts[0]) // 7
+
+    months = as_dates.astype("datetime64[M]").astype(np.int32)
+    month_index = months - months[0]
+
+    first = EPOCH + timedelta(days=int(start_ordinal))
+    daily_labels = [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(n_days)]
+    weekly_labels = [
+        (EPOCH + timedelta(days=int(w))).strftime("%G-W%V")
+        for w in np.unique(week_starts)
+    ]
+    monthly_labels = [
+        str(m) for m in np.unique(months).astype("datetime64[M]")
+    ]
+
+    return {
+        "daily": (np.arange(n_days, dtype=np.int32), daily_labels),
+        "weekly": (week_index.astype(np.int32), weekly_labels),
+        "monthly": (month_index.astype(np.int32), monthly_labels)
+    }
+
+def window_mask(ordinals, start_ordinal, n_days):
+    return (ordinals >= start_ordinal) & (ordinals < start_ordinal + n_days)
+
+def bucket_sums(ordinals, values, start_ordinal, n_days, mode):
+    """
+    Sums values into the mode's buckets for the window. Returns {label: total}.
+    """
+    index, labels = calendar_table(start_ordinal, n_days)[mode]
+    mask = window_mask(ordinals, start_ordinal, n_days)
+    sums = np.bincount(
+        index[ordinals[mask] - start_ordinal],
+        weights=values[mask],
+        minlength=len(labels)
+    ).astype(np.int64)
+    return dict(zip(labels, sums.tolist()))
+
+def span(start_day, end_day):
+    """
+    (start_ordinal, n_days) for an inclusive YYYY-MM-DD range.
+    """
+    start = day_ordinal(date.fromisoformat(start_day))
+    return start, day_ordinal(date.fromisoformat(end_day)) - start + 1
+
+# -----------------------------
+# Benchmark: python activity.py
+# Pure-Python dict loop (as in the old daily-actual-308 / resolve_bucket_key)
+# versus the columnar engine, over a five-year weekly window.
+# -----------------------------
+def _python_weekly(logs, start, n_days):
+    first = EPOCH + timedelta(days=start)
+    window = {(first + timedelta(days=i)).isoformat() for i in range(n_days)}
+    totals = defaultdict(int)
+    for log in logs:
+        if log["spent_at"] in window:
+            key = datetime.strptime(log["spent_at"], "%Y-%m-%d").strftime("%G-W%V")
+            totals[key] += log["spent_minutes"]
+    return totals
+
+def _numpy_weekly(logs, start, n_days):
+    ordinals, minutes = columns_from_logs(logs)
+    return bucket_sums(ordinals, minutes, start, n_days, "weekly")
+
+def benchmark(sizes=(10_000, 100_000, 1_000_000), n_days=5 * 365):
+    rng = np.random.default_rng(0)
+    start = day_ordinal(datetime.utcnow().date()) - n_days + 1
+
+    for size in sizes:
+        offsets = rng.integers(0, n_days, size)
+        logs = [
+            {"spent_at": (EPOCH + timedelta(days=int(start + o))).isoformat(), "spent_minutes": int(m)}
+            for o, m in zip(offsets, rng.integers(1, 120, size))
+        ]
+
+        t0 = time.perf_counter()
+        expected = _python_weekly(logs, start, n_days)
+        t1 = time.perf_counter()
+        result = _numpy_weekly(logs, start, n_days)
+        t2 = time.perf_counter()
+
+        assert {k: v for k, v in result.items() if v} == dict(expected)
+        print(f"{size:>9} logs | python {1000 * (t1 - t0):9.1f} ms | numpy {1000 * (t2 - t1):9.1f} ms")
+
+if __name__ == "__main__":
+    benchmark([int(arg) for arg in sys.argv[1:]] or (10_000, 100_000, 1_000_000))
@@ -0,0 +1,146 @@
+# activity_bitmap.py
+# Per-user activity bitmap stored on the user document: one bit per
+# calendar day, packed into 32-bit words under "activity_bits". Word keys
+# are absolute (day ordinal // 32), so words exist only from the first
+# active day onward and every bit can be set atomically with $bit.
+# Streaks, active-day counts and "active today" become bit operations.
+import sys
+from datetime import date
+from activity import day_ordinal
+from analytics_cache import bump_version
+from models.quest import users_collection, rollups_collection, spent_logs_collection
+from spent_logs import embedded_logs
+
+WORD_BITS = 32
+WORD_MASK = (1 << WORD_BITS) - 1
+
+def locate(day):
+    """
+    (word key, bit position) for a date.
+    """
+    ordinal = day_ordinal(day)
+    return str(ordinal // WORD_BITS), ordinal % WORD_BITS
+
+def parse_day(day_str):
+    try:
+        return date.fromisoformat((day_str or "")[:10])
+    except ValueError:
+        return None
+
+# -----------------------------
+# Write path
+# -----------------------------
+def set_active_day(user_id, day_str):
+    day = parse_day(day_str)
+    if not day:
+        return
+    word, bit = locate(day)
+    users_collection.update_one(
+        {"userId": user_id},
+        {"$bit": {f"activity_bits.{word}": {"or": 1 << bit}}}
+    )
+
+def clear_inactive_days(user_id, day_strs):
+    """
+    Clears the bits of days that no longer have an active log
+    (their rollup active_logs dropped to zero, e.g. after a quest delete).
+    """
+    inactive = rollups_collection.find(
+        {"userId": user_id, "day": {"$in": list(day_strs)}, "active_logs": {"$lte": 0}},
+        {"_id": 0, "day": 1}
+    )
+    clears = {}
+    for row in inactive:
+        day = parse_day(row["day"])
+        if day:
+            word, bit = locate(day)
+            clears[word] = clears.get(word, 0) | (1 << bit)
+
+    if clears:
+        users_collection.update_one(
+            {"userId": user_id},
+            {"$bit": {f"activity_bits.{word}": {"and": WORD_MASK & ~mask} for word, mask in clears.items()}}
+        )
+
+# -----------------------------
+# Read path
+# -----------------------------
+def load_bitmap(user_id):
+    user = users_collection.find_one({"userId": user_id}, {"_id": 0, "activity_bits": 1})
+    return {int(k): v & WORD_MASK for k, v in (user or {}).get("activity_bits", {}).items()}
+
+def is_active(bits, day):
+    ordinal = day_ordinal(day)
+    return bool(bits.get(ordinal // WORD_BITS, 0) >> (ordinal % WORD_BITS) & 1)
+
+def streak_length(bits, today):
+    """
+    Consecutive active days ending today: trailing-ones count across words.
+    """
+    ordinal = day_ordinal(today)
+    word, bit = ordinal // WORD_BITS, ordinal % WORD_BITS
+    streak = 0
+
+    while True:
+        # bits 0..bit of this word, shifted so "today" is the top bit
+        shifted = (bits.get(word, 0) << (WORD_BITS - 1 - bit)) & WORD_MASK
+        ones = WORD_BITS - (~shifted & WORD_MASK).bit_length()
+        streak += ones
+        if ones < bit + 1:
+            return streak
+        word, bit = word - 1, WORD_BITS - 1
+
+def active_days_between(bits, start, end):
+    """
+    Popcount of active days in start..end (inclusive dates).
+    """
+    first, last = day_ordinal(start), day_ordinal(end)
+    count = 0
+    for word in range(first // WORD_BITS, last // WORD_BITS + 1):
+        value = bits.get(word, 0)
+        if not value:
+            continue
+        low = max(first - word * WORD_BITS, 0)
+        high = min(last - word * WORD_BITS, WORD_BITS - 1)
+        mask = ((1 << (high + 1)) - 1) & ~((1 << low) - 1)
+        count += (value & mask).bit_count()
+    return count
+
+# -----------------------------
+# Repair: python activity_bitmap.py [userId ...]
+# -----------------------------
+def rebuild_bitmap(user_id):
+    """
+    Recomputes the bitmap from spent_logs (days with a positive log),
+    including the logs of quests not migrated yet.
+    """
+    rows = spent_logs_collection.aggregate([
+        {"$match": {"meta.userId": user_id, "spent_minutes": {"$gt": 0}}},
+        {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$spent_at"}}}}
+    ])
+    days = {row["_id"] for row in rows}
+    days.update(log["spent_at"] for _, log in embedded_logs(user_id) if log.get("spent_minutes", 0) > 0)
+
+    bits = {}
+    for day_str in days:
+        day = parse_day(day_str)
+        if day:
+            word, bit = locate(day)
+            bits[word] = bits.get(word, 0) | (1 << bit)
+
+    users_collection.update_one({"userId": user_id}, {"$set": {"activity_bits": bits}})
+    bump_version(user_id)
+    return sum(value.bit_count() for value in bits.values())
+
+def repair(user_ids=None):
+    if not user_ids:
+        user_ids = users_collection.distinct("userId")
+
+    for user_id in user_ids:
+        count = rebuild_bitmap(user_id)
+        print(f"✅ Rebuilt activity bitmap for user {user_id}: {count} active days")
+
+if __name__ == "__main__":
+    from indexes import ensure_indexes
+    ensure_indexes()
+    repair([int(arg) for arg in sys.argv[1:]])
@@ -1,7 +1,12 @@
 from datetime import datetime, timedelta
-from collections import defaultdict
 from flask import Blueprint, request, jsonify
-from models.quest import quests_collection
+import config
+from models.quest import quests_collection, rollups_collection, spent_logs_collection
+from spent_logs import embedded_logs
+from kanban import parse_iso_date, build_kanban_buckets, status_snapshots
+from analytics_cache import cached_analytics, cache_stats
+from activity import load_activity, bucket_sums, span
+from activity_bitmap import load_bitmap, streak_length
 
 
 analytics_bp = Blueprint("analytics", __name__, url_prefix="/analytics")
@@ -53,246 +58,218 @@ def resolve_bucket_key(date_str, mode):
     if mode == "monthly":
         return d.strftime("%Y-%m")
 
+def bucket_day_range(buckets, mode):
+    """
+    Returns the (first_day, last_day) YYYY-MM-DD span covered by a bucket list,
+    used to bound rollup reads before bucket keys are resolved.
+    """
+    if mode == "daily":
+        return buckets[0], buckets[-1]
+    if mode == "weekly":
+        first = datetime.strptime(buckets[0] + "-1", "%G-W%V-%u").date()
+        last = datetime.strptime(buckets[-1] + "-7", "%G-W%V-%u").date()
+        return first.isoformat(), last.isoformat()
+    if mode == "monthly":
+        first = datetime.strptime(buckets[0], "%Y-%m").date()
+        last = datetime.strptime(buckets[-1], "%Y-%m").date()
+        last = (last.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        return first.isoformat(), last.isoformat()
+
 # -------------------------
-# 1) SUMMARY (TOTAL + ACHIEVEMENT)
+# Rollup aggregation pipelines
 # -------------------------
 
-@analytics_bp.route("/summary", methods=["GET"])
-def analytics_summary():
-    user_id = int(request.args.get("userId"))
-    mode = request.args.get("mode", "daily")
+BUCKET_FORMATS = {"daily": "%Y-%m-%d", "weekly": "%G-W%V", "monthly": "%Y-%m"}
 
-    buckets = build_buckets(mode)
-    actual = defaultdict(int)
-    planned = defaultdict(int)
+def bucket_stages(user_id, buckets, mode):
+    """
+    Pipeline prefix: rollup days of the user inside the bucket span,
+    tagged with the same bucket key resolve_bucket_key would produce.
+    """
+    start_day, end_day = bucket_day_range(buckets, mode)
+    return [
+        {"$match": {"userId": user_id, "day": {"$gte": start_day, "$lte": end_day}}},
+        {"$addFields": {"bucket": {"$dateToString": {
+            "format": BUCKET_FORMATS[mode],
+            "date": {"$dateFromString": {"dateString": "$day", "format": "%Y-%m-%d"}}
+        }}}},
+        {"$match": {"bucket": {"$in": buckets}}}
+    ]
 
-    quests = quests_collection.find({"userId": user_id})
+def aggregate_bucket_totals(user_id, buckets, mode):
+    """
+    Returns {bucket_key: {"actual": int, "planned": int}} for buckets that have rollups.
+    """
+    pipeline = bucket_stages(user_id, buckets, mode) + [
+        {"$group": {
+            "_id": "$bucket",
+            "actual": {"$sum": "$actual_total"},
+            "planned": {"$sum": "$planned_total"}
+        }}
+    ]
+    return {row["_id"]: row for row in rollups_collection.aggregate(pipeline)}
+
+def aggregate_subject_totals(user_id, buckets, mode):
+    """
+    Returns [(subject, minutes)] summed over the buckets, in quest order:
+    each subject appears where its first quest with a log in the buckets
+    does, as in the original quest scan. One pipeline sums the minutes per
+    quest and joins each quest's subject; while SPENT_LOGS_LEGACY_READS=1
+    the logs still embedded in unmigrated quests are added.
+    """
+    start_day, end_day = bucket_day_range(buckets, mode)
+    pipeline = [
+        {"$match": {
+            "meta.userId": user_id,
+            "spent_at": {
+                "$gte": datetime.strptime(start_day, "%Y-%m-%d"),
+                "$lt": datetime.strptime(end_day, "%Y-%m-%d") + timedelta(days=1)
+            }
+        }},
+        {"$addFields": {"bucket": {"$dateToString": {"format": BUCKET_FORMATS[mode], "date": "$spent_at"}}}},
+        {"$match": {"bucket": {"$in": buckets}}},
+        {"$group": {"_id": "$meta.questId", "minutes": {"$sum": "$spent_minutes"}}},
+        {"$lookup": {"from": quests_collection.name, "localField": "_id", "foreignField": "questId", "as": "quest"}},
+        {"$unwind": "$quest"},
+        {"$project": {"minutes": 1, "quest._id": 1, "quest.subject": 1}}
+    ]
+    rows = {row["quest"]["_id"]: row for row in spent_logs_collection.aggregate(pipeline)}
 
-    for q in quests:
-        # ACTUAL
-        for log in q.get("spent_logs", []):
-            key = resolve_bucket_key(log["spent_at"], mode)
-            if key in buckets:
-                actual[key] += log["spent_minutes"]
+    if config.SPENT_LOGS_LEGACY_READS:
+        for quest, log in embedded_logs(user_id):
+            if resolve_bucket_key(log["spent_at"][:10], mode) in buckets:
+                row = rows.setdefault(quest["_id"], {"quest": quest, "minutes": 0})
+                row["minutes"] += log.get("spent_minutes", 0)
 
-        # PLANNED
-        if q.get("deadline"):
-            key = resolve_bucket_key(q["deadline"], mode)
-            if key in buckets:
-                planned[key] += q.get("suggested_minutes", 0)
+    subject_map = {}
+    for _, row in sorted(rows.items()):
+        subject = row["quest"].get("subject", "Unknown")
+        subject_map[subject] = subject_map.get(subject, 0) + row["minutes"]
+    return list(subject_map.items())
+
+# -------------------------
+# Panel builders (shared by the single endpoints and /dashboard)
+# -------------------------
 
-    total_actual = sum(actual.values())
-    total_planned = sum(planned.values())
+def summary_panel(totals):
+    total_actual = sum(row["actual"] for row in totals.values())
+    total_planned = sum(row["planned"] for row in totals.values())
 
-    return jsonify({
+    return {
         "total_actual_minutes": total_actual,
         "total_planned_minutes": total_planned,
         "achievement_rate": int(total_actual / total_planned * 100) if total_planned > 0 else 0
-    })
-    
-# PLAN VS ACTUAL (BAR CHART)
-@analytics_bp.route("/plan-vs-actual", methods=["GET"])
-def plan_vs_actual():
-    user_id = int(request.args.get("userId"))
-    mode = request.args.get("mode", "daily")
-
-    buckets = build_buckets(mode)
-    result = {b: {"actual": 0, "planned": 0} for b in buckets}
-
-    quests = quests_collection.find({"userId": user_id})
-
-    for q in quests:
-        for log in q.get("spent_logs", []):
-            key = resolve_bucket_key(log["spent_at"], mode)
-            if key in result:
-                result[key]["actual"] += log["spent_minutes"]
-
-        if q.get("deadline"):
-            key = resolve_bucket_key(q["deadline"], mode)
-            if key in result:
-                result[key]["planned"] += q.get("suggested_minutes", 0)
+    }
 
+def plan_vs_actual_panel(buckets, totals):
     response = []
     for k in buckets:
-        a = result[k]["actual"]
-        p = result[k]["planned"]
+        a = totals.get(k, {}).get("actual", 0)
+        p = totals.get(k, {}).get("planned", 0)
         response.append({
             "bucket": k,
             "actual": a,
             "planned": p,
             "achievement": int(a / p * 100) if p > 0 else 0
         })
+    return response
 
-    return jsonify(response)
+def subjects_panel(subject_totals):
+    total = sum(m for _, m in subject_totals)
 
-# 3) TIME SPENT BY SUBJECT (DONUT)
-@analytics_bp.route("/subjects", methods=["GET"])
-def subject_distribution():
+    return [
+        {
+            "subject": s,
+            "minutes": m,
+            "share": int(m / total * 100) if total > 0 else 0
+        }
+        for s, m in subject_totals
+    ]
+
+# -------------------------
+# 1) SUMMARY (TOTAL + ACHIEVEMENT)
+# -------------------------
+
+@analytics_bp.route("/summary", methods=["GET"])
+@cached_analytics("summary")
+def analytics_summary():
     user_id = int(request.args.get("userId"))
     mode = request.args.get("mode", "daily")
 
     buckets = build_buckets(mode)
-    subject_map = defaultdict(int)
+    totals = aggregate_bucket_totals(user_id, buckets, mode)
 
-    quests = quests_collection.find({"userId": user_id})
+    return jsonify(summary_panel(totals))
 
-    for q in quests:
-        subject = q.get("subject", "Unknown")
-        for log in q.get("spent_logs", []):
-            key = resolve_bucket_key(log["spent_at"], mode)
-            if key in buckets:
-                subject_map[subject] += log["spent_minutes"]
+# PLAN VS ACTUAL (BAR CHART)
+@analytics_bp.route("/plan-vs-actual", methods=["GET"])
+@cached_analytics("plan-vs-actual")
+def plan_vs_actual():
+    user_id = int(request.args.get("userId"))
+    mode = request.args.get("mode", "daily")
 
-    total = sum(subject_map.values())
+    buckets = build_buckets(mode)
+    totals = aggregate_bucket_totals(user_id, buckets, mode)
 
-    return jsonify([
-        {
-            "subject": s,
-            "minutes": m,
-            "share": int(m / total * 100) if total > 0 else 0
-        }
-        for s, m in subject_map.items()
-    ])
+    return jsonify(plan_vs_actual_panel(buckets, totals))
 
-# 4) STREAK API
-@analytics_bp.route("/streak", methods=["GET"])
-def streak():
+# 3) TIME SPENT BY SUBJECT (DONUT)
+@analytics_bp.route("/subjects", methods=["GET"])
+@cached_analytics("subjects")
+def subject_distribution():
     user_id = int(request.args.get("userId"))
-    quests = quests_collection.find({"userId": user_id})
-
-    active_days = set()
+    mode = request.args.get("mode", "daily")
 
-    for q in quests:
-        for log in q.get("spent_logs", []):
-            if log["spent_minutes"] > 0:
-                active_days.add(log["spent_at"])
+    buckets = build_buckets(mode)
+    subject_totals = aggregate_subject_totals(user_id, buckets, mode)
 
-    streak = 0
-    day = datetime.utcnow().date()
+    return jsonify(subjects_panel(subject_totals))
 
-    while day.strftime("%Y-%m-%d") in active_days:
-        streak += 1
-        day -= timedelta(days=1)
+# 4) STREAK API
+@analytics_bp.route("/streak", methods=["GET"])
+@cached_analytics("streak")
+def streak():
+    user_id = int(request.args.get("userId"))
+    today = datetime.utcnow().date()
 
-    return jsonify({"streak_days": streak})
+    return jsonify({"streak_days": streak_length(load_bitmap(user_id), today)})
 
-def parse_iso_date(date_str: str):
-    """
-    Safely parse a date from ISO string.
-    Accepts 'YYYY-MM-DD' or 'YYYY-MM-DDTHH:MM:SS.sssZ' formats.
-    Returns a datetime.date object or None if invalid.
-    """
-    if not date_str:
-        return None
-    try:
-        # Try full ISO with timezone
-        return datetime.fromisoformat(date_str.replace("Z", "+00:00")).date()
-    except ValueError:
-        try:
-            # Fallback to just date part
-            return datetime.strptime(date_str[:10], "%Y-%m-%d").date()
-        except ValueError:
-            return None
-        
 # 5) KANBAN SNAPSHOT API
+MAX_KANBAN_BUCKETS = 120
+
 @analytics_bp.route("/kanban", methods=["GET"])
+@cached_analytics("kanban")
 def kanban_flow():
     user_id = int(request.args.get("userId"))
     mode = request.args.get("mode", "daily")
     end_date_str = request.args.get("date")
 
-    # ------------------
-    # Helper: safe ISO date parsing
-    # ------------------
-    def parse_iso_date(date_str):
-        if not date_str:
-            return None
-        try:
-            # Full ISO format with optional Z
-            return datetime.fromisoformat(date_str.replace("Z", "+00:00")).date()
-        except ValueError:
-            try:
-                # fallback to just date part
-                return datetime.strptime(date_str[:10], "%Y-%m-%d").date()
-            except ValueError:
-                return None
+    try:
+        count = int(request.args.get("buckets", 10))
+    except ValueError:
+        return jsonify({"error": "Invalid buckets"}), 400
+    if not 1 <= count <= MAX_KANBAN_BUCKETS:
+        return jsonify({"error": f"buckets must be between 1 and {MAX_KANBAN_BUCKETS}"}), 400
 
     # ------------------
     # End date
     # ------------------
     if end_date_str:
         end_date = parse_iso_date(end_date_str)
+        if not end_date:
+            return jsonify({"error": "Invalid date"}), 400
     else:
         end_date = datetime.utcnow().date()
 
-    # ------------------
-    # Build bucket ranges
-    # ------------------
-    buckets = []
-
-    if mode == "daily":
-        for i in range(9, -1, -1):
-            d = end_date - timedelta(days=i)
-            buckets.append({"label": d.strftime("%Y-%m-%d"), "start": d, "end": d})
-
-    elif mode == "weekly":
-        week_end = end_date - timedelta(days=end_date.weekday()) + timedelta(days=6)
-        for i in range(9, -1, -1):
-            end = week_end - timedelta(weeks=i)
-            start = end - timedelta(days=6)
-            buckets.append({"label": end.strftime("%G-W%V"), "start": start, "end": end})
-
-    elif mode == "monthly":
-        month_end = end_date.replace(day=1)
-        for i in range(9, -1, -1):
-            d = month_end - timedelta(days=32 * i)
-            start = d.replace(day=1)
-            next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
-            end = next_month - timedelta(days=1)
-            buckets.append({"label": start.strftime("%Y-%m"), "start": start, "end": end})
-
-    else:
+    try:
+        buckets = build_kanban_buckets(mode, end_date, count)
+    except ValueError:
         return jsonify({"error": "Invalid mode"}), 400
 
-    quests = list(quests_collection.find({"userId": user_id}))
-    results = []
-
-    # ------------------
-    # Bucket evaluation
-    # ------------------
-    for B in buckets:
-        prepare = active = done = 0
-
-        for q in quests:
-            created = parse_iso_date(q.get("created_at"))
-            if not created or created > B["end"]:
-                continue
-
-            # ---- DONE ----
-            if q.get("status") == "done":
-                updated = parse_iso_date(q.get("updated_at"))
-                if updated and updated <= B["end"]:
-                    done += 1
-                    continue
-
-            # ---- ACTIVE ----
-            is_active = False
-            for log in q.get("spent_logs", []):
-                log_date = parse_iso_date(log.get("spent_at"))
-                if log_date and log["spent_minutes"] > 0 and B["start"] <= log_date <= B["end"]:
-                    is_active = True
-                    break
-
-            if is_active:
-                active += 1
-            else:
-                prepare += 1
-
-        results.append({"bucket": B["label"], "prepare": prepare, "active": active, "done": done})
-
-    return jsonify({"mode": mode, "buckets": results})
+    return jsonify({"mode": mode, "buckets": status_snapshots(user_id, buckets)})
 
 @analytics_bp.route("/daily-actual-308", methods=["GET"])
+@cached_analytics("daily-actual-308")
 def actual_timeseries_308():
     try:
         user_id = int(request.args.get("userId"))
@@ -300,16 +277,88 @@ def actual_timeseries_308():
         return jsonify({"error": "Missing or invalid userId"}), 400
 
     today = datetime.utcnow().date()
-    daily_actual = { (today - timedelta(days=i)).isoformat(): 0 for i in range(307, -1, -1) }
+    start_day = (today - timedelta(days=307)).isoformat()
+
+    columns = load_activity(user_id, start_day, today.isoformat())
+    daily_actual = bucket_sums(columns["day"], columns["actual"], *span(start_day, today.isoformat()), "daily")
+
+    response = [{"date": d, "actual_minutes": m} for d, m in daily_actual.items()]
+    return jsonify(response)
+
+# LONG-WINDOW TIME SERIES (HEATMAPS)
+MAX_TIMESERIES_DAYS = 5 * 366
+
+@analytics_bp.route("/timeseries", methods=["GET"])
+@cached_analytics("timeseries")
+def actual_timeseries():
+    try:
+        user_id = int(request.args.get("userId"))
+        days = int(request.args.get("days", 308))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Missing or invalid userId or days"}), 400
+
+    mode = request.args.get("mode", "daily")
+    if mode not in BUCKET_FORMATS:
+        return jsonify({"error": "Invalid mode"}), 400
+    if not 1 <= days <= MAX_TIMESERIES_DAYS:
+        return jsonify({"error": f"days must be between 1 and {MAX_TIMESERIES_DAYS}"}), 400
+
+    today = datetime.utcnow().date()
+    start_day = (today - timedelta(days=days - 1)).isoformat()
+
+    columns = load_activity(user_id, start_day, today.isoformat())
+    totals = bucket_sums(columns["day"], columns["actual"], *span(start_day, today.isoformat()), mode)
+
+    return jsonify([{"bucket": b, "actual_minutes": m} for b, m in totals.items()])
+
+# 6) DASHBOARD (ALL PANELS IN ONE RESPONSE)
+DASHBOARD_PANELS = ("summary", "plan-vs-actual", "subjects", "streak", "kanban")
+
+@analytics_bp.route("/dashboard", methods=["GET"])
+@cached_analytics("dashboard")
+def analytics_dashboard():
+    user_id = int(request.args.get("userId"))
+    mode = request.args.get("mode", "daily")
+    panels = request.args.get("panels")
+    panels = [p.strip() for p in panels.split(",") if p.strip()] if panels else list(DASHBOARD_PANELS)
+
+    unknown = [p for p in panels if p not in DASHBOARD_PANELS]
+    if unknown:
+        return jsonify({"error": f"Unknown panels: {', '.join(unknown)}"}), 400
+
+    try:
+        buckets = build_buckets(mode)
+    except ValueError:
+        return jsonify({"error": "Invalid mode"}), 400
+
+    today = datetime.utcnow().date()
+    response = {"mode": mode}
+
+    # ------------------
+    # The panels come from four sources (rollups, spent_logs joined with
+    # quests, the user's bitmap, the status log); each is read once and
+    # shared, e.g. one bucket-totals read feeds summary and plan-vs-actual
+    # ------------------
+    if "summary" in panels or "plan-vs-actual" in panels:
+        totals = aggregate_bucket_totals(user_id, buckets, mode)
+        if "summary" in panels:
+            response["summary"] = summary_panel(totals)
+        if "plan-vs-actual" in panels:
+            response["plan-vs-actual"] = plan_vs_actual_panel(buckets, totals)
 
-    quests = quests_collection.find({"userId": user_id})
+    if "subjects" in panels:
+        response["subjects"] = subjects_panel(aggregate_subject_totals(user_id, buckets, mode))
 
-    for q in quests:
-        for log in q.get("spent_logs", []):
-            spent_date = log.get("spent_at", "")[:10]
-            spent_minutes = log.get("spent_minutes", 0)
-            if spent_date in daily_actual:
-                daily_actual[spent_date] += spent_minutes
+    if "streak" in panels:
+        response["streak"] = {"streak_days": streak_length(load_bitmap(user_id), today)}
+
+    if "kanban" in panels:
+        kanban_buckets = build_kanban_buckets(mode, today)
+        response["kanban"] = {"mode": mode, "buckets": status_snapshots(user_id, kanban_buckets)}
 
-    response = [{"date": d, "actual_minutes": daily_actual[d]} for d in sorted(daily_actual.keys())]
     return jsonify(response)
+
+# 7) RESULT CACHE COUNTERS
+@analytics_bp.route("/cache-stats", methods=["GET"])
+def analytics_cache_stats():
+    return jsonify(cache_stats())
@@ -0,0 +1,174 @@
+# analytics_cache.py
+# Bounded in-process LRU in front of the analytics handlers.
+# Entries are tagged with the user's data version; the quest write routes
+# bump that version, so a cached result is served only while it is exact.
+# An outdated entry is recomputed on the spot; the last result is served
+# stale only if that recompute fails or takes longer than
+# ANALYTICS_CACHE_SLOW_MS, in which case it finishes in the background.
+# When every background worker is busy the recompute runs on the request
+# thread instead of queueing.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from functools import wraps
+from flask import current_app, request, make_response
+from pymongo.errors import PyMongoError
+import config
+from lru import LRUCache
+from models.quest import versions_collection
+
+# -----------------------------
+# Data versions
+# -----------------------------
+_local_versions = {}
+_local_versions_lock = threading.Lock()
+
+def current_version(user_id):
+    if config.ANALYTICS_VERSION_STORE == "local":
+        return _local_versions.get(user_id, 0)
+
+    doc = versions_collection.find_one(
+        {"userId": user_id},
+        {"_id": 0, "version": 1},
+        max_time_ms=config.ANALYTICS_VERSION_TIMEOUT_MS
+    )
+    return doc["version"] if doc else 0
+
+def bump_version(user_id):
+    """
+    Called by every write that changes a user's analytics.
+    """
+    user_id = int(user_id)
+    if config.ANALYTICS_VERSION_STORE == "local":
+        with _local_versions_lock:
+            _local_versions[user_id] = _local_versions.get(user_id, 0) + 1
+        return
+
+    try:
+        versions_collection.update_one({"userId": user_id}, {"$inc": {"version": 1}}, upsert=True)
+    except PyMongoError as e:
+        print("❌ Analytics version bump failed:", e)
+
+# -----------------------------
+# Result cache
+# -----------------------------
+cache = LRUCache(config.ANALYTICS_CACHE_SIZE)
+
+# -----------------------------
+# Latency tracking (per endpoint, exponentially weighted)
+# -----------------------------
+_latency_ms = {}
+_revalidating = {}  # cache key -> Future of the recompute in flight
+_revalidating_lock = threading.Lock()
+_revalidate_pool = ThreadPoolExecutor(max_workers=config.ANALYTICS_REVALIDATE_WORKERS)
+
+def record_latency(endpoint, elapsed_ms):
+    previous = _latency_ms.get(endpoint)
+    _latency_ms[endpoint] = elapsed_ms if previous is None else 0.8 * previous + 0.2 * elapsed_ms
+
+def cache_stats():
+    return {**cache.stats(), "latency_ms": {k: round(v, 1) for k, v in _latency_ms.items()}}
+
+# -----------------------------
+# Compute + store
+# -----------------------------
+def compute(endpoint, key, view, version, args, kwargs):
+    started = time.perf_counter()
+    response = make_response(view(*args, **kwargs))
+    record_latency(endpoint, (time.perf_counter() - started) * 1000)
+
+    if version is not None and response.status_code == 200:
+        cache.put(key, {"version": version, "body": response.get_data(), "mimetype": response.mimetype})
+    return response
+
+def revalidate(app, endpoint, key, view, user_id, path, query_string):
+    """
+    Recomputes a handler off the request thread. Returns the response, or
+    None if it failed.
+    """
+    try:
+        with app.test_request_context(path, query_string=query_string):
+            response = compute(endpoint, key, view, current_version(user_id), (), {})
+        cache.count("revalidations")
+        return response
+    except Exception as e:
+        print("❌ Analytics revalidation failed:", e)
+        return None
+    finally:
+        with _revalidating_lock:
+            _revalidating.pop(key, None)
+
+def schedule_revalidate(endpoint, key, view, user_id):
+    """
+    Future of the recompute for key; requests for the same key share one.
+    None if every worker is busy: a new recompute would only queue, so the
+    caller runs it itself.
+    """
+    with _revalidating_lock:
+        future = _revalidating.get(key)
+        if future is None:
+            if len(_revalidating) >= config.ANALYTICS_REVALIDATE_WORKERS:
+                return None
+            future = _revalidate_pool.submit(
+                revalidate, current_app._get_current_object(), endpoint, key, view,
+                user_id, request.path, request.query_string.decode()
+            )
+            _revalidating[key] = future
+    return future
+
+# -----------------------------
+# Decorator
+# -----------------------------
+def cached_analytics(endpoint):
+    """
+    Caches a handler's 200 responses per (userId, endpoint, query args, today).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                user_id = int(request.args.get("userId"))
+            except (TypeError, ValueError):
+                return view(*args, **kwargs)
+
+            query = tuple(sorted((k, v) for k, v in request.args.items(multi=True) if k != "userId"))
+            key = (user_id, endpoint, query, datetime.utcnow().date().isoformat())
+            entry = cache.get(key)
+
+            try:
+                version = current_version(user_id)
+            except PyMongoError as e:
+                print("❌ Analytics version read failed:", e)
+                version = None
+
+            if entry and version is not None and entry["version"] == version:
+                cache.count("hits")
+                return current_app.response_class(entry["body"], mimetype=entry["mimetype"])
+
+            if not entry:
+                cache.count("misses")
+                return compute(endpoint, key, view, version, args, kwargs)
+
+            # outdated (or unverifiable) entry: recompute, and fall back to it
+            # only if that fails or is slow
+            future = schedule_revalidate(endpoint, key, view, user_id)
+            if future is None:
+                try:
+                    fresh = compute(endpoint, key, view, version, args, kwargs)
+                except Exception as e:
+                    print("❌ Analytics recompute failed:", e)
+                    fresh = None
+            else:
+                wait([future], timeout=config.ANALYTICS_CACHE_SLOW_MS / 1000)
+                fresh = future.result() if future.done() else None
+            if fresh is not None:
+                cache.count("misses")
+                return fresh
+
+            cache.count("stale")
+            response = current_app.response_class(entry["body"], mimetype=entry["mimetype"])
+            response.headers["X-Analytics-Cache"] = "stale"
+            return response
+        return wrapper
+    return decorator
@@ -9,4 +9,90 @@ load_dotenv()
 MONGO_URL = os.getenv("MONGO_URL")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 OCI_NAMESPACE = os.getenv("OCI_NAMESPACE")
-OCI_REGION = os.getenv("OCI_REGION")
\ No newline at end of file
+OCI_REGION = os.getenv("OCI_REGION")
+
+# Analytics result cache
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "2048"))
+ANALYTICS_CACHE_SLOW_MS = int(os.getenv("ANALYTICS_CACHE_SLOW_MS", "500"))  # recompute budget before serving stale
+ANALYTICS_REVALIDATE_WORKERS = int(os.getenv("ANALYTICS_REVALIDATE_WORKERS", "8"))  # past this, recompute on the request thread
+ANALYTICS_VERSION_TIMEOUT_MS = int(os.getenv("ANALYTICS_VERSION_TIMEOUT_MS", "200"))
+# "mongo" shares data versions across gunicorn workers, "local" keeps them in-process
+ANALYTICS_VERSION_STORE = os.getenv("ANALYTICS_VERSION_STORE", "mongo")
+
+# IDs leased per process from the counters collection
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "1000"))
+
+# Quests the spent_logs migration hasn't reached still embed their logs; turn
+# these reads off once `python spent_logs.py` has moved them all
+SPENT_LOGS_LEGACY_READS = os.getenv("SPENT_LOGS_LEGACY_READS", "1") == "1"
+
+# LLM gateway (llm_gateway.py); limits are per chain and per process
+LLM_TUTOR_DEADLINE_S = float(os.getenv("LLM_TUTOR_DEADLINE_S", "20"))
+LLM_SUMMARY_DEADLINE_S = float(os.getenv("LLM_SUMMARY_DEADLINE_S", "30"))
+LLM_PARENTS_DEADLINE_S = float(os.getenv("LLM_PARENTS_DEADLINE_S", "20"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+LLM_MAX_WAITING = int(os.getenv("LLM_MAX_WAITING", "8"))
+LLM_QUEUE_WAIT_S = float(os.getenv("LLM_QUEUE_WAIT_S", "5"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_RETRY_BASE_S = float(os.getenv("LLM_RETRY_BASE_S", "0.5"))
+LLM_RETRY_MAX_S = float(os.getenv("LLM_RETRY_MAX_S", "4"))
+LLM_MIN_ATTEMPT_S = float(os.getenv("LLM_MIN_ATTEMPT_S", "2"))  # no retry with less of the deadline left
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+
+# "gemini" or "fake" (fake_llm.py: offline, deterministic output)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "lognormal")  # fixed | lognormal | heavy
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+FAKE_LLM_SIGMA = float(os.getenv("FAKE_LLM_SIGMA", "0.5"))
+FAKE_LLM_TAIL_ALPHA = float(os.getenv("FAKE_LLM_TAIL_ALPHA", "1.5"))
+FAKE_LLM_TOKEN_MS = float(os.getenv("FAKE_LLM_TOKEN_MS", "30"))
+FAKE_LLM_PROMPT_TOKEN_MS = float(os.getenv("FAKE_LLM_PROMPT_TOKEN_MS", "0.2"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+# LLM response cache (llm_cache.py): comma-separated chains that opt in
+LLM_CACHE_CHAINS = [c for c in os.getenv("LLM_CACHE_CHAINS", "summary,page_summary,parents").split(",") if c]
+LLM_CACHE_TTL_S = int(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+
+# Precomputed parent interpretations (parent_interpretations.py)
+PARENT_INTERPRETATION_RELOAD_S = int(os.getenv("PARENT_INTERPRETATION_RELOAD_S", "300"))
+PARENT_INTERPRETATION_MAX_AGE_H = int(os.getenv("PARENT_INTERPRETATION_MAX_AGE_H", "24"))
+
+# Coalesce identical in-flight LLM calls across workers via a Mongo lease (single_flight.py)
+SINGLE_FLIGHT_MONGO = os.getenv("SINGLE_FLIGHT_MONGO", "0") == "1"
+
+# Per-page pre-summaries for /logs/summary (page_summaries.py)
+PAGE_SUMMARY_WORKERS = int(os.getenv("PAGE_SUMMARY_WORKERS", "2"))
+PAGE_SUMMARY_MIN_CHARS = int(os.getenv("PAGE_SUMMARY_MIN_CHARS", "280"))  # shorter pages are used as-is
+PAGE_SUMMARY_MAX_CHARS = int(os.getenv("PAGE_SUMMARY_MAX_CHARS", "400"))
+
+# Nightly summary pre-generation (summary_batch.py); keep concurrency <= LLM_CONCURRENCY
+SUMMARY_BATCH_CONCURRENCY = int(os.getenv("SUMMARY_BATCH_CONCURRENCY", "4"))
+SUMMARY_BATCH_RATE_PER_MIN = int(os.getenv("SUMMARY_BATCH_RATE_PER_MIN", "60"))
+
+# Speculative tutor quick actions (quick_prefetch.py), off unless TUTOR_PREFETCH=1
+TUTOR_PREFETCH = os.getenv("TUTOR_PREFETCH", "0") == "1"
+TUTOR_PREFETCH_TOP_K = int(os.getenv("TUTOR_PREFETCH_TOP_K", "2"))
+TUTOR_PREFETCH_BUDGET_PER_HOUR = int(os.getenv("TUTOR_PREFETCH_BUDGET_PER_HOUR", "30"))
+TUTOR_PREFETCH_WORKERS = int(os.getenv("TUTOR_PREFETCH_WORKERS", "2"))
+TUTOR_PREFETCH_TTL_S = int(os.getenv("TUTOR_PREFETCH_TTL_S", "86400"))
+
+# Per-user tutor history buffers (conversation_cache.py), evicted LRU past this size
+TUTOR_HISTORY_CACHE_BYTES = int(os.getenv("TUTOR_HISTORY_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# Rolling tutor conversation digest (conversation_digest.py): turns older than the
+# recent window are folded into a stored summary every TUTOR_DIGEST_EVERY messages
+TUTOR_DIGEST = os.getenv("TUTOR_DIGEST", "1") == "1"
+TUTOR_DIGEST_EVERY = int(os.getenv("TUTOR_DIGEST_EVERY", "6"))
+TUTOR_DIGEST_MAX_FOLD = int(os.getenv("TUTOR_DIGEST_MAX_FOLD", "40"))  # messages per fold
+TUTOR_DIGEST_MAX_CHARS = int(os.getenv("TUTOR_DIGEST_MAX_CHARS", "1200"))
+TUTOR_DIGEST_WORKERS = int(os.getenv("TUTOR_DIGEST_WORKERS", "2"))
+TUTOR_DIGEST_CACHE_SIZE = int(os.getenv("TUTOR_DIGEST_CACHE_SIZE", "10000"))
+
+# Bucketed tutor message storage (message_buckets.py); turn legacy reads off
+# once `python message_buckets.py` has moved the flat messages collection
+TUTOR_BUCKET_SIZE = int(os.getenv("TUTOR_BUCKET_SIZE", "50"))
+MESSAGES_LEGACY_READS = os.getenv("MESSAGES_LEGACY_READS", "1") == "1"
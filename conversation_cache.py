@@ -0,0 +1,140 @@
+# conversation_cache.py
+# Recent tutor messages per user, held in memory so a steady conversation
+# doesn't re-read its history from Mongo. Each user's buffer keeps the last
+# BUFFER_LIMIT messages (the recent window plus those the rolling digest
+# may not cover yet, see conversation_digest.py); buffers are evicted least-recently-used once their
+# total size passes TUTOR_HISTORY_CACHE_BYTES.
+# Workers don't share buffers, so every turn bumps the user's turn sequence
+# in tutor_sequences (one $inc, in place of the history query). A buffer is
+# used only if it was last updated by the turn just before this one;
+# otherwise another worker (or a cancelled stream) has moved the
+# conversation on and history is read from Mongo again. (A refilled buffer
+# can still miss a turn that another worker hasn't saved yet, exactly as
+# the Mongo read would.)
+import threading
+from collections import OrderedDict, deque
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+import config
+from models.quest import tutor_sequences_collection
+
+HISTORY_LIMIT = 6          # messages sent to the tutor as history, current one included
+BUFFER_LIMIT = HISTORY_LIMIT + config.TUTOR_DIGEST_EVERY
+MESSAGE_OVERHEAD = 200     # rough bytes per cached message besides its content
+
+class Buffer:
+    def __init__(self, seq, messages):
+        self.seq = seq
+        self.messages = deque(messages, maxlen=BUFFER_LIMIT)
+        self.size = sum(message_size(m) for m in self.messages)
+
+    def extend(self, seq, messages):
+        for message in messages:
+            if len(self.messages) == self.messages.maxlen:
+                self.size -= message_size(self.messages[0])
+            self.messages.append(message)
+            self.size += message_size(message)
+        self.seq = seq
+
+def message_size(message):
+    return len(message.get("content") or "") + MESSAGE_OVERHEAD
+
+def slim(message):
+    return {
+        "messageId": message.get("messageId"),
+        "role": message["role"],
+        "content": message["content"],
+        "createdAt": message.get("createdAt")
+    }
+
+_buffers = OrderedDict()  # userId -> Buffer
+_lock = threading.Lock()
+_bytes = 0
+_counters = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+def _drop(user_id):
+    global _bytes
+    buffer = _buffers.pop(user_id, None)
+    if buffer is not None:
+        _bytes -= buffer.size
+
+def _store(user_id, buffer):
+    global _bytes
+    _drop(user_id)
+    _buffers[user_id] = buffer
+    _bytes += buffer.size
+    while _bytes > config.TUTOR_HISTORY_CACHE_BYTES and len(_buffers) > 1:
+        _, evicted = _buffers.popitem(last=False)
+        _bytes -= evicted.size
+        _counters["evictions"] += 1
+
+# -----------------------------
+# Turn start / end
+# -----------------------------
+def next_turn_seq(user_id):
+    doc = tutor_sequences_collection.find_one_and_update(
+        {"_id": user_id},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["seq"]
+
+def begin_turn(user_id):
+    """
+    Returns (seq, messages). messages is the cached history (oldest first),
+    or None when the caller has to load it. seq is None if the sequence
+    couldn't be bumped; the turn then runs uncached.
+    """
+    try:
+        seq = next_turn_seq(user_id)
+    except PyMongoError as e:
+        print("❌ Tutor sequence bump failed:", e)
+        return None, None
+
+    with _lock:
+        buffer = _buffers.get(user_id)
+        if buffer is None:
+            _counters["misses"] += 1
+            return seq, None
+        if buffer.seq != seq - 1:
+            _counters["stale"] += 1
+            _drop(user_id)
+            return seq, None
+        _buffers.move_to_end(user_id)
+        _counters["hits"] += 1
+        return seq, list(buffer.messages)
+
+def record_turn(user_id, seq, previous_messages, new_messages):
+    """
+    Called once the turn's messages are saved. previous_messages is the
+    history the turn started from (cached or loaded).
+    """
+    if seq is None:
+        return
+
+    new_messages = [slim(m) for m in new_messages]
+    with _lock:
+        buffer = _buffers.get(user_id)
+        if buffer is not None and buffer.seq == seq - 1:
+            _drop(user_id)
+            buffer.extend(seq, new_messages)
+            _store(user_id, buffer)
+        elif buffer is None or buffer.seq < seq:
+            _store(user_id, Buffer(seq, [slim(m) for m in previous_messages] + new_messages))
+        else:
+            # a later turn was recorded first and is missing these messages
+            _drop(user_id)
+
+def history_cache_stats():
+    with _lock:
+        counters = dict(_counters)
+        users, size = len(_buffers), _bytes
+    lookups = counters["hits"] + counters["misses"] + counters["stale"]
+    return {
+        **counters,
+        "users": users,
+        "bytes": size,
+        "max_bytes": config.TUTOR_HISTORY_CACHE_BYTES,
+        "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0
+    }
@@ -0,0 +1,225 @@
+# conversation_digest.py
+# Rolling digest of a tutor conversation, so long sessions keep their
+# context without growing the prompt. After a turn is saved, a background
+# job folds messages older than the recent window into a per-user summary
+# (tutor_digests), once at least TUTOR_DIGEST_EVERY of them are waiting.
+# The tutor then gets the digest plus every message it doesn't cover yet,
+# read from storage when the history buffer doesn't reach back that far
+# (a late or failed fold): normally the window plus one fold's worth, so
+# prompt size stays flat however long the conversation gets.
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError, PyMongoError
+import config
+from lru import LRUCache
+from conversation_cache import BUFFER_LIMIT, HISTORY_LIMIT
+from message_buckets import latest_messages, scan, sort_key
+from models.quest import tutor_digests_collection
+from tutor_agent import build_history, fold_digest
+
+NO_DIGEST = {"text": None, "through": ""}
+MAX_UNCOVERED = HISTORY_LIMIT + config.TUTOR_DIGEST_MAX_FOLD  # messages read for a lagging digest
+
+_pool = ThreadPoolExecutor(max_workers=config.TUTOR_DIGEST_WORKERS)
+_digests = LRUCache(config.TUTOR_DIGEST_CACHE_SIZE)  # userId -> {text, through}
+_lock = threading.Lock()
+_pending = set()
+_counters = {"folds": 0, "messages_folded": 0, "skipped": 0, "failed": 0}
+
+def count(counter, amount=1):
+    with _lock:
+        _counters[counter] += amount
+
+def load_digest(user_id):
+    doc = tutor_digests_collection.find_one({"_id": user_id}, {"_id": 0, "text": 1, "through": 1})
+    return {"text": doc["text"], "through": doc["through"]} if doc else NO_DIGEST
+
+def current_digest(user_id, reload=False):
+    """
+    {text, through} for the user; text is None until the first fold.
+    through is the createdAt of the newest message the digest covers.
+    reload: read Mongo even if this worker has it (its history buffer was stale).
+    """
+    if not config.TUTOR_DIGEST:
+        return NO_DIGEST
+
+    digest = None if reload else _digests.get(user_id)
+    if digest is None:
+        try:
+            digest = load_digest(user_id)
+        except PyMongoError as e:
+            print("❌ Tutor digest read failed:", e)
+            return NO_DIGEST
+        _digests.put(user_id, digest)
+    return digest
+
+def load_uncovered(user_id, messages, digest):
+    """
+    messages: the latest messages as loaded for a turn (at most BUFFER_LIMIT,
+    oldest first). If all of them are newer than the digest, older ones it
+    doesn't cover may exist too; the latest MAX_UNCOVERED are read from
+    storage instead. Anything older than that is left to the fold, which
+    catches up from storage.
+    """
+    if digest["text"] is None or len(messages) < BUFFER_LIMIT or messages[0]["createdAt"] <= digest["through"]:
+        return messages
+    return latest_messages(user_id, MAX_UNCOVERED)
+
+def waiting(messages, digest):
+    """
+    How many of messages are older than the recent window but not folded yet.
+    """
+    return sum(1 for m in messages if m["createdAt"] > digest["through"]) - HISTORY_LIMIT
+
+def uncovered(messages, digest):
+    """
+    The messages the tutor should see verbatim: those newer than the digest,
+    and never fewer than the recent window.
+    """
+    if digest["text"] is None:
+        return messages[-HISTORY_LIMIT:]
+    newer = [m for m in messages if m.get("createdAt", "") > digest["through"]]
+    return messages[-max(len(newer), HISTORY_LIMIT):]
+
+def with_digest(digest, history_text):
+    if not digest["text"]:
+        return history_text
+    return f"Summary of the earlier conversation: {digest['text']}\n\n{history_text}"
+
+# -----------------------------
+# Fold (background)
+# -----------------------------
+def fold(user_id):
+    """
+    Folds every message older than the recent window into the digest,
+    oldest first and at most TUTOR_DIGEST_MAX_FOLD per LLM call, until fewer
+    than TUTOR_DIGEST_EVERY are left. Each step is stored before the next,
+    so an interrupted fold resumes where it stopped. Returns the number of
+    messages folded.
+    """
+    window = latest_messages(user_id, HISTORY_LIMIT)
+    if len(window) < HISTORY_LIMIT:
+        return 0
+    window_start = sort_key(window[0])
+
+    digest = load_digest(user_id)
+    folded = 0
+    while True:
+        # "\uffff" sorts after every messageId: strictly after through
+        chunk = scan(user_id, config.TUTOR_DIGEST_MAX_FOLD, after=(digest["through"], "\uffff"))
+        older = [m for m in chunk if sort_key(m) < window_start]
+        if len(older) < config.TUTOR_DIGEST_EVERY:
+            return folded
+
+        turns = build_history(older, limit=len(older), max_chars=sys.maxsize)
+        step = {
+            "text": fold_digest(digest["text"], turns)[:config.TUTOR_DIGEST_MAX_CHARS],
+            "through": older[-1]["createdAt"]
+        }
+
+        try:
+            # only over the digest this step started from; a concurrent fold wins
+            tutor_digests_collection.update_one(
+                {"_id": user_id, "through": digest["through"] or None},
+                {"$set": {**step, "updatedAt": datetime.utcnow().isoformat() + "Z"}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return folded
+
+        _digests.put(user_id, step)
+        digest = step
+        folded += len(older)
+
+def run_fold(user_id):
+    try:
+        folded = fold(user_id)
+        if folded:
+            count("folds")
+            count("messages_folded", folded)
+        else:
+            count("skipped")
+    except Exception as e:
+        print(f"❌ Tutor digest fold failed for user {user_id}:", e)
+        count("failed")
+    finally:
+        with _lock:
+            _pending.discard(user_id)
+
+def schedule_digest(user_id, messages):
+    """
+    Called after every saved tutor turn with the history it ended on (the
+    buffer or what was read from Mongo, oldest first); the request never
+    waits for the fold.
+    """
+    if not config.TUTOR_DIGEST:
+        return
+
+    if waiting(messages, current_digest(user_id)) < config.TUTOR_DIGEST_EVERY:
+        return
+    with _lock:
+        if user_id in _pending:
+            return
+        _pending.add(user_id)
+    _pool.submit(run_fold, user_id)
+
+def digest_stats():
+    with _lock:
+        counters = dict(_counters)
+        pending = len(_pending)
+    return {"enabled": config.TUTOR_DIGEST, **counters, "pending": pending}
+
+# -----------------------------
+# Benchmark: python conversation_digest.py [turns] [samples]
+# Prompt size and tutor latency with the full raw history vs digest + window,
+# as a synthetic conversation grows. Runs in memory (no Mongo writes);
+# use LLM_BACKEND=fake to avoid spending Gemini quota.
+# -----------------------------
+def benchmark(turns=200, samples=5):
+    from fake_llm import WORDS
+    from tutor_agent import run_tutor, tutor_prompt
+
+    def sentence(i, n):
+        return " ".join(WORDS[(i * 7 + k * 3) % len(WORDS)] for k in range(n)).capitalize() + "."
+
+    messages = []
+    for i in range(turns):
+        at = f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}"
+        messages.append({"role": "user", "content": f"Question {i}: {sentence(i, 15)}", "createdAt": at + ".000Z"})
+        messages.append({"role": "assistant", "content": sentence(i + 1, 60), "createdAt": at + ".500Z"})
+
+    def measure(history):
+        rendered = tutor_prompt.format_messages(history=history, message="And what comes next?")
+        tokens = sum(len(str(m.content).split()) for m in rendered)
+        latencies = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            run_tutor("And what comes next?", history)
+            latencies.append((time.perf_counter() - started) * 1000)
+        return tokens, sorted(latencies)[len(latencies) // 2]
+
+    digest = NO_DIGEST
+    folded_upto = 0
+    checkpoints = [n for n in (10, 25, 50, 100, 200, 500) if n <= turns] or [turns]
+    print(f"{'turns':>6} | {'raw tokens':>10} {'raw p50':>10} | {'digest tokens':>13} {'digest p50':>10}")
+    for n in checkpoints:
+        window = messages[:2 * n]
+        # fold the way the background job would have by now
+        while len(window) - HISTORY_LIMIT - folded_upto >= config.TUTOR_DIGEST_EVERY:
+            older = window[folded_upto:len(window) - HISTORY_LIMIT][:config.TUTOR_DIGEST_MAX_FOLD]
+            text = fold_digest(digest["text"], build_history(older, limit=len(older), max_chars=sys.maxsize))
+            digest = {"text": text[:config.TUTOR_DIGEST_MAX_CHARS], "through": older[-1]["createdAt"]}
+            folded_upto += len(older)
+
+        raw = build_history(window, limit=len(window), max_chars=sys.maxsize)
+        recent = uncovered(window[-(HISTORY_LIMIT + config.TUTOR_DIGEST_EVERY):], digest)
+        compact = with_digest(digest, build_history(recent, limit=len(recent), max_chars=sys.maxsize))
+        raw_tokens, raw_ms = measure(raw)
+        digest_tokens, digest_ms = measure(compact)
+        print(f"{n:6} | {raw_tokens:10} {raw_ms:8.1f}ms | {digest_tokens:13} {digest_ms:8.1f}ms")
+
+if __name__ == "__main__":
+    benchmark(*[int(arg) for arg in sys.argv[1:3]])
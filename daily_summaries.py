@@ -0,0 +1,111 @@
+# daily_summaries.py
+# Generated /logs/summary results, one document per (userId, date), with a
+# fingerprint of the pages they were built from. Page writes mark the day
+# stale and bump its version; a fresh stored summary is returned without
+# touching the pages or the LLM. A stale one is rebuilt only if the pages'
+# fingerprint actually changed (a tags-only edit keeps the old summary).
+# A summary finished after a newer invalidation is not stored.
+import hashlib
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+from models.quest import daily_summaries_collection, pages_collection
+from page_summaries import content_hash, day_pre_summaries
+from summary_agent import summarize_logs
+
+UNAVAILABLE = "Summary is temporarily unavailable."
+
+def page_day(created_at):
+    return (created_at or "")[:10]
+
+def fingerprint(pages):
+    parts = sorted(f"{page['pageId']}:{content_hash(page.get('content'))}" for page in pages)
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+def invalidate_day(user_id, date):
+    """
+    Called on page create / update / delete for the page's day.
+    """
+    daily_summaries_collection.update_one(
+        {"userId": user_id, "date": date},
+        {"$set": {"stale": True}, "$inc": {"version": 1}},
+        upsert=True
+    )
+
+def load_summary(user_id, date):
+    return daily_summaries_collection.find_one({"userId": user_id, "date": date}, {"_id": 0})
+
+def is_current(doc):
+    return bool(doc) and not doc.get("stale") and "summary" in doc
+
+def mark_current(user_id, date, version):
+    """
+    The pages still match the stored fingerprint: clear the stale flag.
+    """
+    daily_summaries_collection.update_one(
+        {"userId": user_id, "date": date, "version": version},
+        {"$set": {"stale": False}}
+    )
+
+def store_summary(user_id, date, version, pages_fingerprint, summary):
+    """
+    Stores the summary unless the day was invalidated after version was read.
+    Returns the updatedAt timestamp.
+    """
+    updated_at = datetime.utcnow().isoformat() + "Z"
+    try:
+        daily_summaries_collection.update_one(
+            {"userId": user_id, "date": date, "version": version},
+            {"$set": {
+                "fingerprint": pages_fingerprint,
+                "summary": summary,
+                "stale": False,
+                "updatedAt": updated_at
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass  # invalidated meanwhile (version moved on); the next view rebuilds
+    return updated_at
+
+# -----------------------------
+# Read-through
+# -----------------------------
+def get_daily_summary(user_id, date, stored=False):
+    """
+    {summary, updatedAt, fingerprint} for the day, or None if it has no pages.
+    fingerprint is None when the LLM failed (the fallback text is not stored).
+    stored: the day's document if the caller already loaded it.
+    """
+    if stored is False:
+        stored = load_summary(user_id, date)
+    if is_current(stored):
+        return {"summary": stored["summary"], "updatedAt": stored["updatedAt"], "fingerprint": stored["fingerprint"]}
+
+    version = stored.get("version", 0) if stored else 0
+
+    logs = list(pages_collection.find(
+        {
+            "userId": user_id,
+            "createdAt": {"$regex": f"^{date}"}
+        },
+        {"_id": 0}
+    ))
+    if not logs:
+        return None
+
+    pages_fingerprint = fingerprint(logs)
+    if stored and "summary" in stored and stored.get("fingerprint") == pages_fingerprint:
+        mark_current(user_id, date, version)
+        return {"summary": stored["summary"], "updatedAt": stored["updatedAt"], "fingerprint": pages_fingerprint}
+
+    # reduce the per-page pre-summaries instead of the full page text
+    combined_text = "\n".join(f"- {summary}" for summary in day_pre_summaries(logs) if summary)
+
+    try:
+        summary_text = summarize_logs(combined_text)
+    except Exception as e:
+        print("❌ Summary AI error:", e)
+        return {"summary": UNAVAILABLE, "updatedAt": datetime.utcnow().isoformat() + "Z", "fingerprint": None}
+
+    updated_at = store_summary(user_id, date, version, pages_fingerprint, summary_text)
+    return {"summary": summary_text, "updatedAt": updated_at, "fingerprint": pages_fingerprint}
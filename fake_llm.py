@@ -0,0 +1,163 @@
+# fake_llm.py
+# Offline stand-in for Gemini, selected with LLM_BACKEND=fake.
+# It is a LangChain chat model, so it drops into the existing
+# prompt | llm | StrOutputParser chains through llm_gateway.chat_model.
+# Output is a pure function of the rendered prompt; latency, streaming
+# cadence and injected errors come from a seeded RNG.
+import hashlib
+import random
+import sys
+import threading
+import time
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+import config
+
+WORDS = (
+    "learning practice review focus steady progress idea example step concept "
+    "question answer notes plan effort habit time method result check explain "
+    "simple clear small daily goal try again build understand compare remember"
+).split()
+
+class FakeLLMError(Exception):
+    """
+    Injected failure. Carries an HTTP-like code so the gateway treats it as transient.
+    """
+    def __init__(self, code=503):
+        super().__init__(f"fake LLM error {code}")
+        self.code = code
+
+class FakeChatModel(BaseChatModel):
+    model: str = "fake-chat"
+    temperature: float | None = None
+    max_output_tokens: int | None = None
+    timeout: float | None = None
+
+    latency: str = config.FAKE_LLM_LATENCY            # fixed | lognormal | heavy
+    latency_ms: float = config.FAKE_LLM_LATENCY_MS    # fixed value / median / tail minimum
+    sigma: float = config.FAKE_LLM_SIGMA              # lognormal spread
+    tail_alpha: float = config.FAKE_LLM_TAIL_ALPHA    # pareto shape for "heavy"
+    token_ms: float = config.FAKE_LLM_TOKEN_MS        # streaming cadence
+    prompt_token_ms: float = config.FAKE_LLM_PROMPT_TOKEN_MS  # prefill cost per prompt token
+    error_rate: float = config.FAKE_LLM_ERROR_RATE
+    seed: int = config.FAKE_LLM_SEED
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    # -----------------------------
+    # Seeded randomness (latency + errors only)
+    # -----------------------------
+    def _draw(self):
+        with _rng_lock:
+            rng = _rngs.get(self.seed)
+            if rng is None:
+                rng = _rngs[self.seed] = random.Random(self.seed)
+            if self.latency == "lognormal":
+                delay = self.latency_ms * rng.lognormvariate(0, self.sigma)
+            elif self.latency == "heavy":
+                delay = self.latency_ms * rng.paretovariate(self.tail_alpha)
+            else:
+                delay = self.latency_ms
+            return delay / 1000, rng.random() < self.error_rate
+
+    def _wait_first_token(self, messages):
+        delay, fail = self._draw()
+        delay += self.prompt_token_ms * prompt_tokens(messages) / 1000
+        if self.timeout is not None and delay > self.timeout:
+            time.sleep(self.timeout)
+            raise TimeoutError(f"fake LLM timed out after {self.timeout}s")
+        time.sleep(delay)
+        if fail:
+            raise FakeLLMError(503)
+
+    # -----------------------------
+    # Deterministic output
+    # -----------------------------
+    def _tokens(self, messages):
+        prompt = "\n".join(f"{m.type}: {m.content}" for m in messages)
+        digest = hashlib.sha256(f"{self.model}|{self.temperature}|{prompt}".encode()).digest()
+        count = 20 + digest[0] % 40
+        if self.max_output_tokens:
+            count = min(count, self.max_output_tokens)
+        words = [WORDS[digest[(i + 1) % len(digest)] * (i + 1) % len(WORDS)] for i in range(count)]
+        tokens = (" ".join(words).capitalize() + ".").split(" ")
+        return [token + " " for token in tokens[:-1]] + tokens[-1:]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._wait_first_token(messages)
+        tokens = self._tokens(messages)
+        time.sleep(self.token_ms * len(tokens) / 1000)
+        input_tokens = prompt_tokens(messages)
+        message = AIMessage(
+            content="".join(tokens),
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": len(tokens),
+                "total_tokens": input_tokens + len(tokens)
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._wait_first_token(messages)
+        for i, token in enumerate(self._tokens(messages)):
+            if i:
+                time.sleep(self.token_ms / 1000)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+def prompt_tokens(messages):
+    # whitespace words: close enough to tokens for relative comparisons
+    return sum(len(str(m.content).split()) for m in messages)
+
+_rngs = {}
+_rng_lock = threading.Lock()
+
+# -----------------------------
+# Benchmark: LLM_BACKEND=fake python fake_llm.py [calls] [threads]
+# Drives the three chains through the gateway, no network needed.
+# -----------------------------
+def benchmark(calls=200, threads=16):
+    from concurrent.futures import ThreadPoolExecutor
+    import llm_gateway
+    from tutor_agent import run_tutor
+    from summary_agent import summarize_logs
+    from parents_llm import run_parent_interpretation
+
+    jobs = [
+        ("tutor", lambda i: run_tutor(f"What is a derivative? ({i % 20})", "No prior conversation.")),
+        ("summary", lambda i: summarize_logs(f"Studied calculus for {i % 20} minutes.")),
+        ("parents", lambda i: run_parent_interpretation([f"Consistent routine ({i % 20})"]))
+    ]
+
+    def run(i):
+        started = time.perf_counter()
+        try:
+            jobs[i % 3][1](i)
+            ok = True
+        except Exception:
+            ok = False
+        return jobs[i % 3][0], (time.perf_counter() - started) * 1000, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(run, range(calls)))
+    elapsed = time.perf_counter() - started
+
+    for chain, _ in jobs:
+        latencies = sorted(ms for name, ms, _ in results if name == chain)
+        failed = sum(1 for name, _, ok in results if name == chain and not ok)
+        print(f"{chain:>8} | n {len(latencies):5} | p50 {latencies[len(latencies) // 2]:8.1f} ms | "
+              f"p95 {latencies[int(0.95 * (len(latencies) - 1))]:8.1f} ms | failed {failed}")
+    print(f"{calls} calls in {elapsed:.2f}s ({calls / elapsed:.1f}/s)")
+    print(llm_gateway.gateway_stats())
+
+if __name__ == "__main__":
+    if config.LLM_BACKEND != "fake":
+        sys.exit("Set LLM_BACKEND=fake to benchmark against the fake model.")
+    benchmark(*[int(arg) for arg in sys.argv[1:3]])
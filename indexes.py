@@ -0,0 +1,61 @@
+# indexes.py
+# Collection and index setup for every module, in one place. Nothing here
+# runs at import time (importing server or an agent must not need Mongo);
+# ensure_indexes() is called once at startup by server.py and the CLI jobs.
+# create_index is a no-op for indexes that already exist.
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import CollectionInvalid, OperationFailure
+import config
+from models.quest import (
+    db, quests_collection, rollups_collection, status_events_collection, status_checkpoints_collection, versions_collection,
+    llm_cache_collection, llm_leases_collection, daily_summaries_collection,
+    period_summaries_collection, tutor_prefetch_collection, messages_collection,
+    message_buckets_collection
+)
+
+def ensure_spent_logs_collection():
+    try:
+        db.create_collection(
+            "spent_logs",
+            timeseries={"timeField": "spent_at", "metaField": "meta", "granularity": "hours"}
+        )
+    except CollectionInvalid:
+        pass  # already exists
+
+def ensure_ttl_index(collection, field, seconds):
+    try:
+        collection.create_index(field, expireAfterSeconds=seconds)
+    except OperationFailure:
+        # TTL changed since the index was built
+        collection.database.command(
+            "collMod", collection.name,
+            index={"keyPattern": {field: 1}, "expireAfterSeconds": seconds}
+        )
+
+def ensure_indexes():
+    ensure_spent_logs_collection()
+
+    # analytics (/subjects joins quests on questId)
+    quests_collection.create_index([("questId", ASCENDING)])
+    rollups_collection.create_index([("userId", ASCENDING), ("day", ASCENDING)], unique=True)
+    status_events_collection.create_index([("userId", ASCENDING), ("day", ASCENDING), ("at", ASCENDING)])
+    status_checkpoints_collection.create_index([("userId", ASCENDING), ("day", ASCENDING)], unique=True)
+    versions_collection.create_index([("userId", ASCENDING)], unique=True)
+
+    # LLM
+    ensure_ttl_index(llm_cache_collection, "createdAt", config.LLM_CACHE_TTL_S)
+    llm_leases_collection.create_index([("expiresAt", ASCENDING)], expireAfterSeconds=0)
+
+    # summaries
+    daily_summaries_collection.create_index([("userId", ASCENDING), ("date", ASCENDING)], unique=True)
+    period_summaries_collection.create_index(
+        [("userId", ASCENDING), ("period", ASCENDING), ("key", ASCENDING)], unique=True
+    )
+
+    # tutor
+    tutor_prefetch_collection.create_index([("assistantMessageId", ASCENDING), ("action", ASCENDING)], unique=True)
+    ensure_ttl_index(tutor_prefetch_collection, "createdAt", config.TUTOR_PREFETCH_TTL_S)
+    message_buckets_collection.create_index([("userId", ASCENDING), ("end", DESCENDING)])
+    message_buckets_collection.create_index([("userId", ASCENDING), ("start", ASCENDING)])
+    # legacy (pre-bucket) reads page by (createdAt, messageId)
+    messages_collection.create_index([("userId", ASCENDING), ("createdAt", ASCENDING), ("messageId", ASCENDING)])
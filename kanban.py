@@ -0,0 +1,252 @@
+# kanban.py
+# Kanban snapshots from the quest_status_events log: every status
+# transition is appended by the quest routes, and a snapshot replays only
+# the events from the start of the first bucket's month onward on top of a
+# stored baseline, so its cost follows the window rather than the whole
+# history. The baseline is a per-user checkpoint (counts as of the first
+# day of a month, in quest_status_checkpoints), stored the first time a
+# snapshot needs it.
+import sys
+from datetime import date, datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from analytics_cache import bump_version
+from models.quest import quests_collection, status_events_collection, status_checkpoints_collection
+
+STATUSES = ("prepare", "active", "done")
+
+def parse_iso_date(date_str: str):
+    """
+    Safely parse a date from ISO string.
+    Accepts 'YYYY-MM-DD' or 'YYYY-MM-DDTHH:MM:SS.sssZ' formats.
+    Returns a datetime.date object or None if invalid.
+    """
+    if not date_str:
+        return None
+    try:
+        # Try full ISO with timezone
+        return datetime.fromisoformat(date_str.replace("Z", "+00:00")).date()
+    except ValueError:
+        try:
+            # Fallback to just date part
+            return datetime.strptime(date_str[:10], "%Y-%m-%d").date()
+        except ValueError:
+            return None
+
+# -----------------------------
+# Bucket ranges
+# -----------------------------
+def build_kanban_buckets(mode, end_date, count=10):
+    """
+    Returns [{label, start, end}] oldest first, ending at the bucket containing end_date.
+    Raises ValueError for an unknown mode.
+    """
+    buckets = []
+
+    if mode == "daily":
+        for i in range(count - 1, -1, -1):
+            d = end_date - timedelta(days=i)
+            buckets.append({"label": d.strftime("%Y-%m-%d"), "start": d, "end": d})
+
+    elif mode == "weekly":
+        week_end = end_date - timedelta(days=end_date.weekday()) + timedelta(days=6)
+        for i in range(count - 1, -1, -1):
+            end = week_end - timedelta(weeks=i)
+            start = end - timedelta(days=6)
+            buckets.append({"label": end.strftime("%G-W%V"), "start": start, "end": end})
+
+    elif mode == "monthly":
+        for i in range(count - 1, -1, -1):
+            # i calendar months back (a fixed number of days can skip a month)
+            months = end_date.year * 12 + end_date.month - 1 - i
+            start = date(months // 12, months % 12 + 1, 1)
+            next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+            end = next_month - timedelta(days=1)
+            buckets.append({"label": start.strftime("%Y-%m"), "start": start, "end": end})
+
+    else:
+        raise ValueError("Invalid mode")
+
+    return buckets
+
+# -----------------------------
+# Status event log
+# -----------------------------
+def status_event(user_id, quest_id, status, prev_status=None, at=None):
+    """
+    One transition. status=None marks a deleted quest,
+    prev_status=None a newly created one.
+    """
+    at = at or datetime.utcnow().isoformat() + "Z"
+    return {
+        "userId": user_id,
+        "questId": quest_id,
+        "status": status,
+        "prev_status": prev_status,
+        "at": at,
+        "day": at[:10]
+    }
+
+def record_status_event(user_id, quest_id, status, prev_status=None):
+    status_events_collection.insert_one(status_event(user_id, quest_id, status, prev_status))
+
+def delete_user_status_events(user_id):
+    status_events_collection.delete_many({"userId": user_id})
+    status_checkpoints_collection.delete_many({"userId": user_id})
+
+def apply_event(counts, event):
+    if event.get("status") in counts:
+        counts[event["status"]] += 1
+    if event.get("prev_status") in counts:
+        counts[event["prev_status"]] -= 1
+
+# -----------------------------
+# Snapshots
+# -----------------------------
+def add_events(user_id, counts, from_day, before_day):
+    """
+    Applies the events with from_day <= day < before_day to counts, summed
+    server-side. from_day=None starts from the first event.
+    """
+    day = {"$lt": before_day}
+    if from_day:
+        day["$gte"] = from_day
+    pipeline = [
+        {"$match": {"userId": user_id, "day": day}},
+        {"$facet": {
+            "added": [{"$group": {"_id": "$status", "n": {"$sum": 1}}}],
+            "removed": [{"$group": {"_id": "$prev_status", "n": {"$sum": 1}}}]
+        }}
+    ]
+    for row in status_events_collection.aggregate(pipeline):
+        for added in row["added"]:
+            if added["_id"] in counts:
+                counts[added["_id"]] += added["n"]
+        for removed in row["removed"]:
+            if removed["_id"] in counts:
+                counts[removed["_id"]] -= removed["n"]
+
+def checkpoint_counts(user_id, before_day):
+    """
+    (counts, day): the latest checkpoint at or before before_day, or zeros
+    and None. If before_day is in a later month than that checkpoint, one
+    is stored for the month's first day on the way and returned, so later
+    reads only need the events from there on.
+    """
+    checkpoint = status_checkpoints_collection.find_one(
+        {"userId": user_id, "day": {"$lte": before_day}},
+        {"_id": 0, "day": 1, "counts": 1},
+        sort=[("day", -1)]
+    )
+    counts = {status: checkpoint["counts"].get(status, 0) if checkpoint else 0 for status in STATUSES}
+    from_day = checkpoint["day"] if checkpoint else None
+
+    # only months that started before today: events are stamped with the
+    # current day, so nothing can be added before such a checkpoint later
+    month_start = before_day[:8] + "01"
+    if (from_day or "") < month_start < datetime.utcnow().date().isoformat():
+        add_events(user_id, counts, from_day, month_start)
+        try:
+            status_checkpoints_collection.update_one(
+                {"userId": user_id, "day": month_start},
+                {"$set": {"counts": dict(counts)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass  # a concurrent baseline stored the same counts first
+        from_day = month_start
+
+    return counts, from_day
+
+def status_baseline(user_id, before_day):
+    """
+    Status counts as of the end of the day before before_day: the latest
+    checkpoint plus the events since, summed server-side.
+    """
+    counts, from_day = checkpoint_counts(user_id, before_day)
+    if from_day != before_day:
+        add_events(user_id, counts, from_day, before_day)
+    return counts
+
+def status_snapshots(user_id, buckets):
+    """
+    Counts prepare/active/done quests as of each bucket's end.
+    buckets must be ordered oldest first, as build_kanban_buckets returns them.
+    Events are read once, from the checkpoint of the first bucket's month
+    (at most a month before the span) to the last bucket's end.
+    """
+    first_day = buckets[0]["start"].isoformat()
+    last_day = buckets[-1]["end"].isoformat()
+
+    counts, from_day = checkpoint_counts(user_id, first_day)
+    if from_day is None or from_day < first_day[:8] + "01":
+        # no checkpoint for this month (it starts today): sum up to the span server-side
+        add_events(user_id, counts, from_day, first_day)
+        from_day = first_day
+
+    events = status_events_collection.find(
+        {"userId": user_id, "day": {"$gte": from_day, "$lte": last_day}},
+        {"_id": 0, "day": 1, "status": 1, "prev_status": 1}
+    ).sort([("day", 1), ("at", 1)])
+
+    results = []
+    pending = next(events, None)
+    while pending and pending["day"] < first_day:
+        apply_event(counts, pending)
+        pending = next(events, None)
+
+    for B in buckets:
+        end_day = B["end"].isoformat()
+        while pending and pending["day"] <= end_day:
+            apply_event(counts, pending)
+            pending = next(events, None)
+
+        results.append({"bucket": B["label"], **counts})
+
+    return results
+
+# -----------------------------
+# Backfill
+# -----------------------------
+def backfill_status_events(user_ids=None):
+    """
+    Seeds the event log from current quest state: a creation event at
+    created_at and, for active/done quests, one transition at updated_at.
+    The seeded events are inserted before the user's old events (and then
+    the checkpoints built from them) are deleted, so a snapshot taken
+    meanwhile never stores a checkpoint from an empty log.
+    """
+    if not user_ids:
+        user_ids = quests_collection.distinct("userId")
+
+    for user_id in user_ids:
+        quests = list(quests_collection.find(
+            {"userId": user_id},
+            {"_id": 0, "questId": 1, "status": 1, "created_at": 1, "updated_at": 1}
+        ))
+        # events up to the quest read are replaced by the seed; later ones stay
+        old_ids = status_events_collection.distinct("_id", {"userId": user_id})
+
+        events = []
+        for q in quests:
+            created_at = q.get("created_at") or q.get("updated_at")
+            if not created_at:
+                continue
+            events.append(status_event(user_id, q["questId"], "prepare", at=created_at))
+            if q.get("status") in ("active", "done"):
+                updated_at = max(created_at, q.get("updated_at") or created_at)
+                events.append(status_event(user_id, q["questId"], q["status"], "prepare", at=updated_at))
+
+        if events:
+            status_events_collection.insert_many(events)
+        status_events_collection.delete_many({"_id": {"$in": old_ids}})
+        status_checkpoints_collection.delete_many({"userId": user_id})
+        bump_version(user_id)
+        print(f"✅ Seeded {len(events)} status events for user {user_id}")
+
+# -----------------------------
+# CLI: python kanban.py [userId ...]
+# -----------------------------
+if __name__ == "__main__":
+    from indexes import ensure_indexes
+    ensure_indexes()
+    backfill_status_events([int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,85 @@
+# llm_cache.py
+# Content-addressed cache for LLM responses. The key is a hash of
+# (chain, model, temperature, rendered prompt messages), so identical
+# prompts are answered without calling Gemini. Entries live in an
+# in-process LRU and in the llm_cache collection (TTL index on createdAt),
+# which is shared by every worker. Chains opt in with LLM_CACHE_CHAINS.
+import hashlib
+import json
+import threading
+from datetime import datetime
+from pymongo.errors import PyMongoError
+import config
+from lru import LRUCache
+from models.quest import llm_cache_collection
+
+_lru = LRUCache(config.LLM_CACHE_SIZE)
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+def enabled(chain):
+    return chain in config.LLM_CACHE_CHAINS
+
+def cache_key(chain, model, prompt_value):
+    messages = [[m.type, m.content] for m in prompt_value.to_messages()]
+    material = json.dumps(
+        [chain, getattr(model, "model", None), getattr(model, "temperature", None), messages],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+def count(chain, counter, amount=1):
+    with _metrics_lock:
+        metrics = _metrics.setdefault(chain, {
+            "hits": 0, "mongo_hits": 0, "misses": 0, "latency_saved_ms": 0.0, "tokens_saved": 0
+        })
+        metrics[counter] += amount
+
+# -----------------------------
+# Lookup / store
+# -----------------------------
+def get(chain, key):
+    """
+    Cached response text or None. Checks the LRU, then Mongo.
+    """
+    entry = _lru.get(key)
+    if entry is None:
+        try:
+            entry = llm_cache_collection.find_one(
+                {"_id": key}, {"_id": 0, "text": 1, "latency_ms": 1, "tokens": 1}
+            )
+        except PyMongoError as e:
+            print("❌ LLM cache read failed:", e)
+            entry = None
+        if entry is None:
+            count(chain, "misses")
+            return None
+        _lru.put(key, entry)
+        count(chain, "mongo_hits")
+
+    count(chain, "hits")
+    count(chain, "latency_saved_ms", entry.get("latency_ms", 0))
+    count(chain, "tokens_saved", entry.get("tokens", 0))
+    return entry["text"]
+
+def put(chain, key, text, latency_ms, tokens):
+    entry = {"text": text, "latency_ms": round(latency_ms, 1), "tokens": tokens}
+    _lru.put(key, entry)
+    try:
+        llm_cache_collection.replace_one(
+            {"_id": key},
+            {**entry, "chain": chain, "createdAt": datetime.utcnow()},  # BSON date for the TTL index
+            upsert=True
+        )
+    except PyMongoError as e:
+        print("❌ LLM cache write failed:", e)
+
+def cache_stats(chain):
+    with _metrics_lock:
+        metrics = dict(_metrics.get(chain, {}))
+    lookups = metrics.get("hits", 0) + metrics.get("misses", 0)
+    return {
+        **metrics,
+        "latency_saved_ms": round(metrics.get("latency_saved_ms", 0), 1),
+        "hit_rate": round(metrics["hits"] / lookups, 4) if lookups else 0
+    }
@@ -0,0 +1,314 @@
+# llm_gateway.py
+# Every LLM chain (tutor, summary, parents) goes through here.
+# One ChatGoogleGenerativeAI client (one HTTP connection pool) is shared,
+# or fake_llm.FakeChatModel when LLM_BACKEND=fake; each chain gets a copy of it with its own generation settings.
+# Calls are bounded per chain (slots + a short wait queue), retried with
+# jitter on transient errors within the chain's deadline (each attempt's
+# HTTP timeout is what is left of it), and guarded by a circuit breaker.
+# When a call can't be made, LLMUnavailable is raised so the caller's
+# existing fallback message is returned immediately.
+# Opted-in chains are answered from llm_cache when the prompt repeats,
+# and identical concurrent calls can be coalesced (single_flight).
+import random
+import threading
+import time
+from collections import deque
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import RunnableSequence
+from langchain_google_genai import ChatGoogleGenerativeAI
+import config
+import llm_cache
+import single_flight
+
+CHAINS = ("tutor", "tutor_prefetch", "summary", "page_summary", "parents", "digest")
+
+DEADLINES_S = {
+    "tutor": config.LLM_TUTOR_DEADLINE_S,
+    "tutor_prefetch": config.LLM_TUTOR_DEADLINE_S,
+    "summary": config.LLM_SUMMARY_DEADLINE_S,
+    "page_summary": config.LLM_SUMMARY_DEADLINE_S,
+    "parents": config.LLM_PARENTS_DEADLINE_S,
+    "digest": config.LLM_SUMMARY_DEADLINE_S
+}
+
+class LLMUnavailable(Exception):
+    """
+    Raised instead of calling the model (breaker open, queue full, deadline spent).
+    """
+
+# -----------------------------
+# Shared client
+# -----------------------------
+def base_model():
+    if config.LLM_BACKEND == "fake":
+        from fake_llm import FakeChatModel
+        return FakeChatModel()
+
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash",
+        max_retries=1,  # retries happen here, not inside the SDK
+        client_args={
+            "limits": httpx.Limits(
+                max_connections=config.LLM_POOL_SIZE,
+                max_keepalive_connections=config.LLM_POOL_SIZE
+            )
+        }
+    )
+
+_base_llm = base_model()
+
+def chat_model(chain, **params):
+    """
+    The shared model with per-chain settings (temperature, max_output_tokens ...).
+    model_copy keeps the underlying client, so every chain uses the same pool.
+    """
+    return _base_llm.model_copy(update={"timeout": DEADLINES_S[chain], **params})
+
+def with_timeout(runnable, seconds):
+    """
+    runnable with every chat model in it limited to seconds per request.
+    """
+    if isinstance(runnable, RunnableSequence):
+        return RunnableSequence(*[with_timeout(step, seconds) for step in runnable.steps])
+    if isinstance(runnable, BaseChatModel):
+        return runnable.model_copy(update={"timeout": seconds})
+    return runnable
+
+# -----------------------------
+# Per-chain state
+# -----------------------------
+class ChainState:
+    def __init__(self, name):
+        self.name = name
+        self.slots = threading.BoundedSemaphore(config.LLM_CONCURRENCY)
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.failures = 0          # consecutive failed calls
+        self.open_until = 0.0      # breaker open while now < open_until
+        self.probing = False       # half-open: one call allowed through
+        self.latency_ms = deque(maxlen=500)
+        self.counters = {
+            "calls": 0, "ok": 0, "errors": 0, "retries": 0,
+            "rejected": 0, "short_circuited": 0, "breaker_opens": 0
+        }
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    # circuit breaker
+    def allow(self):
+        with self.lock:
+            if self.failures < config.LLM_BREAKER_FAILURES:
+                return True
+            if time.monotonic() < self.open_until or self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def record_result(self, ok, elapsed_ms):
+        with self.lock:
+            self.probing = False
+            self.latency_ms.append(elapsed_ms)
+            if ok:
+                self.failures = 0
+                self.counters["ok"] += 1
+                return
+            self.failures += 1
+            self.counters["errors"] += 1
+            if self.failures >= config.LLM_BREAKER_FAILURES:
+                self.open_until = time.monotonic() + config.LLM_BREAKER_COOLDOWN_S
+                self.counters["breaker_opens"] += 1
+
+    # bounded concurrency
+    def acquire(self, timeout):
+        with self.lock:
+            if self.waiting >= config.LLM_MAX_WAITING:
+                return False
+            self.waiting += 1
+        try:
+            return self.slots.acquire(timeout=max(timeout, 0))
+        finally:
+            with self.lock:
+                self.waiting -= 1
+
+    def stats(self):
+        with self.lock:
+            samples = sorted(self.latency_ms)
+            breaker = "closed"
+            if self.failures >= config.LLM_BREAKER_FAILURES:
+                breaker = "open" if time.monotonic() < self.open_until else "half-open"
+            return {
+                **self.counters,
+                "waiting": self.waiting,
+                "breaker": breaker,
+                "latency_ms": {
+                    "p50": round(samples[len(samples) // 2], 1) if samples else None,
+                    "p95": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 1) if samples else None
+                }
+            }
+
+_chains = {name: ChainState(name) for name in CHAINS}
+
+def gateway_stats():
+    stats = {name: state.stats() for name, state in _chains.items()}
+    for name in stats:
+        if llm_cache.enabled(name):
+            stats[name]["cache"] = llm_cache.cache_stats(name)
+        stats[name]["single_flight"] = single_flight.flight_stats(name)
+    return stats
+
+# -----------------------------
+# Retry policy
+# -----------------------------
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+
+def is_transient(error):
+    if isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code in TRANSIENT_STATUS
+
+def backoff(attempt):
+    """
+    Full jitter: uniform in [0, base * 2^attempt], capped.
+    """
+    return random.uniform(0, min(config.LLM_RETRY_MAX_S, config.LLM_RETRY_BASE_S * 2 ** attempt))
+
+def can_retry(error, attempt, delay, deadline):
+    """
+    Transient, retries left, and after the backoff at least LLM_MIN_ATTEMPT_S
+    of the deadline remains for the next attempt.
+    """
+    return (attempt < config.LLM_RETRIES and is_transient(error)
+            and time.monotonic() + delay + config.LLM_MIN_ATTEMPT_S <= deadline)
+
+def enter(chain):
+    """
+    Breaker check + slot acquisition. Returns (state, deadline).
+    """
+    state = _chains[chain]
+    state.count("calls")
+    deadline = time.monotonic() + DEADLINES_S[chain]
+
+    if not state.allow():
+        state.count("short_circuited")
+        raise LLMUnavailable(f"{chain}: circuit open")
+
+    if not state.acquire(min(config.LLM_QUEUE_WAIT_S, DEADLINES_S[chain])):
+        state.count("rejected")
+        with state.lock:
+            state.probing = False
+        raise LLMUnavailable(f"{chain}: too many concurrent calls")
+
+    return state, deadline
+
+# -----------------------------
+# Calls
+# -----------------------------
+def call(chain, runnable, arg):
+    """
+    runnable.invoke(arg) under the chain's breaker, slots, deadline and retry policy.
+    """
+    state, deadline = enter(chain)
+    started = time.perf_counter()
+    try:
+        attempt = 0
+        while True:
+            try:
+                result = with_timeout(runnable, deadline - time.monotonic()).invoke(arg)
+                state.record_result(True, (time.perf_counter() - started) * 1000)
+                return result
+            except Exception as e:
+                delay = backoff(attempt)
+                if not can_retry(e, attempt, delay, deadline):
+                    state.record_result(False, (time.perf_counter() - started) * 1000)
+                    raise
+                print(f"❌ LLM {chain} transient error (retrying):", e)
+                state.count("retries")
+                time.sleep(delay)
+                attempt += 1
+    finally:
+        state.slots.release()
+
+def invoke(chain, runnable, inputs, use_cache=True, coalesce=False):
+    """
+    runnable.invoke(inputs) through the gateway. For chains in LLM_CACHE_CHAINS
+    the prompt | llm | parser chain is run step by step so the rendered
+    prompt can be looked up in llm_cache first; hits skip the model entirely.
+    use_cache=False forces a fresh answer (which still refreshes the cache).
+    coalesce=True shares one in-flight call among identical concurrent prompts.
+    """
+    cached_chain = llm_cache.enabled(chain)
+    if not cached_chain and not coalesce:
+        return call(chain, runnable, inputs)
+
+    prompt, model, parser = runnable.first, runnable.middle[0], runnable.last
+    prompt_value = prompt.invoke(inputs)
+    key = llm_cache.cache_key(chain, model, prompt_value)
+
+    cached = llm_cache.get(chain, key) if cached_chain and use_cache else None
+    if cached is not None:
+        return cached
+
+    def generate():
+        started = time.perf_counter()
+        message = call(chain, model, prompt_value)
+        text = parser.invoke(message)
+        if cached_chain:
+            usage = getattr(message, "usage_metadata", None) or {}
+            llm_cache.put(chain, key, text, (time.perf_counter() - started) * 1000, usage.get("total_tokens", 0))
+        return text
+
+    if coalesce:
+        return single_flight.run(chain, key, generate, DEADLINES_S[chain])
+    return generate()
+
+def stream(chain, runnable, inputs):
+    """
+    Yields chunks from runnable.stream. Retries only before the first chunk.
+    Closing this generator closes the upstream stream; a stream closed that
+    way (the client went away) is not counted as a model success or failure.
+    """
+    state, deadline = enter(chain)
+    started = time.perf_counter()
+    chunks = None
+    ok = False
+    cancelled = False
+    try:
+        attempt = 0
+        while True:
+            chunks = with_timeout(runnable, deadline - time.monotonic()).stream(inputs)
+            try:
+                first = next(chunks)
+                break
+            except StopIteration:
+                first = None
+                break
+            except Exception as e:
+                chunks.close()
+                delay = backoff(attempt)
+                if not can_retry(e, attempt, delay, deadline):
+                    raise
+                print(f"❌ LLM {chain} transient stream error (retrying):", e)
+                state.count("retries")
+                time.sleep(delay)
+                attempt += 1
+
+        if first is not None:
+            yield first
+            yield from chunks
+        ok = True
+    except GeneratorExit:
+        cancelled = True
+        raise
+    finally:
+        if chunks is not None:
+            chunks.close()
+        if cancelled:
+            with state.lock:
+                state.probing = False  # a cancelled probe proves nothing; the next call probes again
+        else:
+            state.record_result(ok, (time.perf_counter() - started) * 1000)
+        state.slots.release()
@@ -0,0 +1,42 @@
+# lru.py
+# Bounded, thread-safe LRU shared by the in-process caches (analytics
+# results, LLM responses, tutor digests), with hit/miss counters the
+# caches report through their stats endpoints.
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "revalidations": 0}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["misses"] + self.counters["stale"]
+            return {
+                **self.counters,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0
+            }
@@ -0,0 +1,213 @@
+# message_buckets.py
+# Tutor messages are stored in buckets, one document per user per (up to)
+# TUTOR_BUCKET_SIZE messages:
+#   {"userId", "start", "end", "count", "messages": [{messageId, role, content, createdAt}]}
+# so the recent window or a page of history is one or two document reads
+# instead of one per message. A turn $push-es its two messages into the
+# bucket its turn sequence (tutor_sequences, see conversation_cache.py)
+# maps to: _id "<userId>:<seq // TURNS_PER_BUCKET>". The _id is derived,
+# not looked up, so concurrent turns upsert the same document rather than
+# each opening a bucket of their own.
+# Messages written before buckets stay in the flat messages collection
+# until `python message_buckets.py` moves them; while MESSAGES_LEGACY_READS=1
+# reads merge both.
+import sys
+import uuid
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+import config
+from conversation_cache import next_turn_seq
+from models.quest import message_buckets_collection, messages_collection
+
+PAGE_DEFAULT = 50
+PAGE_MAX = 200
+TURNS_PER_BUCKET = max(config.TUTOR_BUCKET_SIZE // 2, 1)  # a turn is a message and its reply
+
+def slim(message):
+    return {
+        "messageId": message["messageId"],
+        "role": message["role"],
+        "content": message["content"],
+        "createdAt": message["createdAt"]
+    }
+
+def sort_key(message):
+    return (message["createdAt"], message["messageId"])
+
+# -----------------------------
+# Cursors: "<createdAt>|<messageId>"
+# -----------------------------
+def encode_cursor(message):
+    return f"{message['createdAt']}|{message['messageId']}"
+
+def decode_cursor(cursor):
+    """
+    (createdAt, messageId), or ValueError for a malformed cursor.
+    """
+    created_at, sep, message_id = (cursor or "").partition("|")
+    if not sep or not created_at or not message_id:
+        raise ValueError(f"invalid cursor: {cursor!r}")
+    return created_at, message_id
+
+# -----------------------------
+# Write path
+# -----------------------------
+def bucket_id(user_id, turn_seq):
+    return f"{user_id}:{turn_seq // TURNS_PER_BUCKET}"
+
+def append_messages(user_id, messages, turn_seq=None):
+    """
+    Adds a turn's messages (in order) to its bucket. turn_seq is the seq
+    begin_turn returned; None (the bump failed) takes a fresh one.
+    """
+    if turn_seq is None:
+        turn_seq = next_turn_seq(user_id)
+
+    query = {"_id": bucket_id(user_id, turn_seq)}
+    update = {
+        "$setOnInsert": {"userId": user_id},
+        "$push": {"messages": {"$each": [slim(m) for m in messages]}},
+        "$inc": {"count": len(messages)},
+        "$min": {"start": messages[0]["createdAt"]},
+        "$max": {"end": messages[-1]["createdAt"]}
+    }
+    try:
+        message_buckets_collection.update_one(query, update, upsert=True)
+    except DuplicateKeyError:
+        # a concurrent turn inserted the bucket first
+        message_buckets_collection.update_one(query, update)
+
+# -----------------------------
+# Read path
+# -----------------------------
+def scan(user_id, limit, before=None, after=None):
+    """
+    Up to limit messages strictly before / after the (createdAt, messageId)
+    cursor, nearest first. Buckets are read in batches sized to the page.
+    """
+    projection = {"_id": 0, "start": 1, "end": 1, "messages": 1}
+    if after is not None:
+        query = {"userId": user_id, "end": {"$gte": after[0]}}
+        buckets = message_buckets_collection.find(query, projection).sort("start", ASCENDING)
+        keep = lambda m: sort_key(m) > after
+        beyond = lambda bucket, last: bucket["start"] > last
+    else:
+        query = {"userId": user_id}
+        if before is not None:
+            query["start"] = {"$lte": before[0]}
+        buckets = message_buckets_collection.find(query, projection).sort("end", DESCENDING)
+        keep = lambda m: before is None or sort_key(m) < before
+        beyond = lambda bucket, last: bucket["end"] < last
+    buckets = buckets.batch_size(limit // config.TUTOR_BUCKET_SIZE + 2)
+
+    # Buckets overlap in time when concurrent turns straddle a bucket
+    # boundary, so a full page doesn't end the read: that only happens at
+    # a bucket that starts (ends) past the limit-th message found so far.
+    found = []
+    for bucket in buckets:
+        if len(found) >= limit:
+            found = sorted(found, key=sort_key, reverse=after is None)[:limit]
+            if beyond(bucket, found[-1]["createdAt"]):
+                break
+        found.extend(m for m in bucket["messages"] if keep(m))
+    buckets.close()
+
+    if config.MESSAGES_LEGACY_READS:
+        found.extend(legacy_scan(user_id, limit, before, after))
+    return sorted(found, key=sort_key, reverse=after is None)[:limit]
+
+def legacy_scan(user_id, limit, before=None, after=None):
+    query = {"userId": user_id}
+    cursor, direction = (after, ASCENDING) if after is not None else (before, DESCENDING)
+    if cursor is not None:
+        op = "$gt" if after is not None else "$lt"
+        query["$or"] = [
+            {"createdAt": {op: cursor[0]}},
+            {"createdAt": cursor[0], "messageId": {op: cursor[1]}}
+        ]
+    return list(
+        messages_collection.find(query, {"_id": 0, "messageId": 1, "role": 1, "content": 1, "createdAt": 1})
+        .sort([("createdAt", direction), ("messageId", direction)]).limit(limit)
+    )
+
+def latest_messages(user_id, limit):
+    """
+    The user's last limit messages, oldest first.
+    """
+    return scan(user_id, limit)[::-1]
+
+def message_page(user_id, limit=PAGE_DEFAULT, before=None, after=None):
+    """
+    One page for GET /tutors, oldest first:
+    {"messages", "hasMore", "before", "after"}. before/after are the cursors
+    to pass for the previous (older) and next (newer) page.
+    """
+    found = scan(user_id, limit + 1, before, after)
+    has_more = len(found) > limit
+    found = found[:limit]
+    if after is None:
+        found.reverse()
+
+    messages = [{**m, "userId": user_id} for m in found]
+    return {
+        "messages": messages,
+        "hasMore": has_more,
+        "before": encode_cursor(messages[0]) if messages else None,
+        "after": encode_cursor(messages[-1]) if messages else None
+    }
+
+# -----------------------------
+# Migration: python message_buckets.py [userId ...]
+# Moves flat messages into buckets of their own, oldest first. A bucket's
+# _id is derived from its first message (so it never collides with a turn
+# bucket's), and a rerun after a crash skips buckets that were already
+# written and only deletes the flat copies of the messages they hold.
+# -----------------------------
+def migrate_user(user_id):
+    moved = 0
+    migration = uuid.uuid4().hex
+    while True:
+        chunk = list(
+            messages_collection.find({"userId": user_id})
+            .sort([("createdAt", ASCENDING), ("messageId", ASCENDING)])
+            .limit(config.TUTOR_BUCKET_SIZE)
+        )
+        if not chunk:
+            return moved
+
+        bucket = {
+            "_id": f"{user_id}:{chunk[0]['messageId']}",
+            "userId": user_id,
+            "start": chunk[0]["createdAt"],
+            "end": chunk[-1]["createdAt"],
+            "count": len(chunk),
+            "messages": [slim(m) for m in chunk],
+            "migration": migration
+        }
+        try:
+            message_buckets_collection.insert_one(bucket)
+            stored = [m["messageId"] for m in chunk]
+        except DuplicateKeyError:
+            # written by an earlier run, possibly with another TUTOR_BUCKET_SIZE:
+            # only the messages that bucket holds may go
+            existing = message_buckets_collection.find_one({"_id": bucket["_id"]}, {"messages.messageId": 1})
+            stored = [m["messageId"] for m in existing["messages"]]
+
+        deleted = messages_collection.delete_many({"userId": user_id, "messageId": {"$in": stored}}).deleted_count
+        if not deleted:
+            print(f"❌ Bucket {bucket['_id']} doesn't hold its first message; stopping user {user_id}")
+            return moved
+        moved += deleted
+
+def migrate(user_ids=None):
+    user_ids = user_ids or messages_collection.distinct("userId")
+    moved = 0
+    for user_id in user_ids:
+        moved += migrate_user(user_id)
+    print(f"✅ Moved {moved} messages into buckets for {len(user_ids)} users")
+    return moved
+
+if __name__ == "__main__":
+    from indexes import ensure_indexes
+    ensure_indexes()
+    migrate([int(arg) for arg in sys.argv[1:]])
@@ -11,4 +11,20 @@ quests_collection = db['quests']                    # collection
 users_collection = db["users"]       
 messages_collection = db['messages']  
 pages_collection = db['pages']
-links_collection = db['links']
\ No newline at end of file
+links_collection = db['links']
+rollups_collection = db['daily_rollups']
+status_events_collection = db['quest_status_events']
+status_checkpoints_collection = db['quest_status_checkpoints']
+versions_collection = db['analytics_versions']
+spent_logs_collection = db['spent_logs']
+counters_collection = db['counters']
+llm_cache_collection = db['llm_cache']
+parent_interpretations_collection = db['parent_interpretations']
+llm_leases_collection = db['llm_leases']
+daily_summaries_collection = db['daily_summaries']
+period_summaries_collection = db['period_summaries']
+batch_jobs_collection = db['batch_jobs']
+tutor_prefetch_collection = db['tutor_prefetch']
+tutor_sequences_collection = db['tutor_sequences']
+tutor_digests_collection = db['tutor_digests']
+message_buckets_collection = db['message_buckets']
\ No newline at end of file
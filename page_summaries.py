@@ -0,0 +1,113 @@
+# page_summaries.py
+# Map-reduce for /logs/summary. Every page gets a short pre-summary,
+# computed in the background when it is created or edited and stored on
+# the page with a hash of the content it was made from. The daily summary
+# then only reduces those pre-summaries, so its prompt stays small however
+# much was written. A page whose content no longer matches its hash
+# (edited since, or never summarized) is refreshed before reducing.
+import hashlib
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import config
+from models.quest import pages_collection
+from summary_agent import summarize_page
+
+_pool = ThreadPoolExecutor(max_workers=config.PAGE_SUMMARY_WORKERS)
+_pending = set()
+_pending_lock = threading.Lock()
+
+def content_hash(content):
+    return hashlib.sha256((content or "").encode()).hexdigest()
+
+def is_fresh(page):
+    return bool(page.get("preSummary")) and page.get("preSummaryHash") == content_hash(page.get("content"))
+
+def condense(content):
+    """
+    Short pages are their own summary; longer ones go through the LLM.
+    """
+    content = (content or "").strip()
+    if len(content) <= config.PAGE_SUMMARY_MIN_CHARS:
+        return content
+    return summarize_page(content)[:config.PAGE_SUMMARY_MAX_CHARS]
+
+# -----------------------------
+# Map: one page
+# -----------------------------
+def refresh_page_summary(page):
+    """
+    Computes and stores the page's pre-summary. Returns the summary text.
+    The write only lands if the page hasn't been edited meanwhile.
+    """
+    summary = condense(page.get("content"))
+    pages_collection.update_one(
+        {"pageId": page["pageId"], "userId": page["userId"], "content": page.get("content")},
+        {"$set": {
+            "preSummary": summary,
+            "preSummaryHash": content_hash(page.get("content")),
+            "preSummaryAt": datetime.utcnow().isoformat() + "Z"
+        }}
+    )
+    return summary
+
+def run_refresh(page_id, user_id):
+    try:
+        page = pages_collection.find_one({"pageId": page_id, "userId": user_id}, {"_id": 0})
+        if page and not is_fresh(page):
+            refresh_page_summary(page)
+    except Exception as e:
+        print(f"❌ Page pre-summary failed for page {page_id}:", e)
+    finally:
+        with _pending_lock:
+            _pending.discard((page_id, user_id))
+
+def schedule_page_summary(page_id, user_id):
+    """
+    Called by /logs POST and PATCH; the request doesn't wait for the LLM.
+    """
+    with _pending_lock:
+        if (page_id, user_id) in _pending:
+            return
+        _pending.add((page_id, user_id))
+    _pool.submit(run_refresh, page_id, user_id)
+
+# -----------------------------
+# Reduce input: a day's pages
+# -----------------------------
+def day_pre_summaries(pages):
+    """
+    Pre-summaries in page order. Stale or missing ones are refreshed now,
+    in parallel; if the LLM fails, the truncated page text stands in.
+    """
+    def summary_of(page):
+        if is_fresh(page):
+            return page["preSummary"]
+        try:
+            return refresh_page_summary(page)
+        except Exception as e:
+            print(f"❌ Page pre-summary failed for page {page.get('pageId')}:", e)
+            return (page.get("content") or "")[:config.PAGE_SUMMARY_MAX_CHARS]
+
+    stale = [page for page in pages if not is_fresh(page)]
+    if len(stale) > 1:
+        return list(_pool.map(summary_of, pages))
+    return [summary_of(page) for page in pages]
+
+# -----------------------------
+# Backfill: python page_summaries.py [userId ...]
+# -----------------------------
+def backfill(user_ids=None):
+    query = {"userId": {"$in": user_ids}} if user_ids else {}
+    refreshed = 0
+    for page in pages_collection.find(query, {"_id": 0}):
+        if not is_fresh(page):
+            refresh_page_summary(page)
+            refreshed += 1
+    print(f"✅ Refreshed {refreshed} page pre-summaries")
+
+if __name__ == "__main__":
+    from indexes import ensure_indexes
+    ensure_indexes()
+    backfill([int(arg) for arg in sys.argv[1:]])
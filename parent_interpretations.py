@@ -0,0 +1,114 @@
+# parent_interpretations.py
+# Dashboard interpretations precomputed per (signal tuple, prompt version).
+# extract_parent_signals can only return four signal tuples, so each one's
+# interpretation is generated ahead of time in a few wording variants,
+# stored in parent_interpretations and held in memory by every worker.
+# /parents/interpretation then does a dictionary lookup instead of an LLM call.
+# Refresh on a schedule (e.g. hourly cron); entries older than
+# PARENT_INTERPRETATION_MAX_AGE_H are regenerated:
+#   python parent_interpretations.py [--force]
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pymongo.errors import PyMongoError
+import config
+from models.quest import parent_interpretations_collection
+from parents_llm import PROMPT_VERSION, VARIANT_HINTS, run_parent_interpretation
+
+SIGNAL_FIELDS = ("engagement_flow", "direction", "guidance_level")
+
+def signal_key(signals):
+    return "|".join(signals[field] for field in SIGNAL_FIELDS)
+
+# -----------------------------
+# In-memory table: signal key -> [guidance per variant]
+# -----------------------------
+_table = {}
+_loaded_at = None
+_load_lock = threading.Lock()
+
+def load_table():
+    variants = defaultdict(dict)
+    docs = parent_interpretations_collection.find(
+        {"prompt_version": PROMPT_VERSION},
+        {"_id": 0, "signal_key": 1, "variant": 1, "current_guidance": 1}
+    )
+    for doc in docs:
+        variants[doc["signal_key"]][doc["variant"]] = doc["current_guidance"]
+    return {key: [texts[v] for v in sorted(texts)] for key, texts in variants.items()}
+
+def current_table():
+    """
+    The table, reloaded from Mongo at most every PARENT_INTERPRETATION_RELOAD_S.
+    """
+    global _table, _loaded_at
+    if _loaded_at is not None and time.monotonic() - _loaded_at < config.PARENT_INTERPRETATION_RELOAD_S:
+        return _table
+
+    with _load_lock:
+        if _loaded_at is None or time.monotonic() - _loaded_at >= config.PARENT_INTERPRETATION_RELOAD_S:
+            try:
+                _table = load_table()
+            except PyMongoError as e:
+                print("❌ Parent interpretation reload failed:", e)
+            _loaded_at = time.monotonic()
+    return _table
+
+def precomputed_guidance(signals, child_id):
+    """
+    Guidance text for the signal tuple, or None if it hasn't been generated yet.
+    The variant rotates daily per child, so wording changes between visits.
+    """
+    variants = current_table().get(signal_key(signals))
+    if not variants:
+        return None
+    return variants[(child_id + datetime.utcnow().date().toordinal()) % len(variants)]
+
+# -----------------------------
+# Generation
+# -----------------------------
+def refresh(force=False):
+    from parents import SIGNAL_TUPLES, build_narrative_features
+
+    cutoff = (datetime.utcnow() - timedelta(hours=config.PARENT_INTERPRETATION_MAX_AGE_H)).isoformat() + "Z"
+    generated = skipped = failed = 0
+
+    for signals in SIGNAL_TUPLES:
+        key = signal_key(signals)
+        narrative = build_narrative_features(signals)
+
+        for variant in range(len(VARIANT_HINTS)):
+            doc_id = f"{key}:v{PROMPT_VERSION}:{variant}"
+            existing = parent_interpretations_collection.find_one({"_id": doc_id}, {"generatedAt": 1})
+            if existing and not force and existing["generatedAt"] > cutoff:
+                skipped += 1
+                continue
+
+            result = run_parent_interpretation(narrative, variant=variant, use_cache=False)
+            if result.get("interpretation_rationale") == "Error":
+                print(f"❌ Could not generate interpretation {doc_id}")
+                failed += 1
+                continue
+
+            parent_interpretations_collection.replace_one(
+                {"_id": doc_id},
+                {
+                    "signal_key": key,
+                    "prompt_version": PROMPT_VERSION,
+                    "variant": variant,
+                    "current_guidance": result["current_guidance"],
+                    "generatedAt": datetime.utcnow().isoformat() + "Z"
+                },
+                upsert=True
+            )
+            generated += 1
+
+    parent_interpretations_collection.delete_many({"prompt_version": {"$ne": PROMPT_VERSION}})
+    print(f"✅ Parent interpretations v{PROMPT_VERSION}: {generated} generated, {skipped} fresh, {failed} failed")
+
+if __name__ == "__main__":
+    from indexes import ensure_indexes
+    ensure_indexes()
+    refresh(force="--force" in sys.argv[1:])
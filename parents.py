@@ -2,8 +2,10 @@
 from flask import Blueprint, request, jsonify, Response
 from datetime import datetime, timedelta
 from collections import defaultdict
-from models.quest import quests_collection, users_collection, links_collection
+from models.quest import users_collection, links_collection
 from parents_llm import run_parent_interpretation
+from parent_interpretations import precomputed_guidance
+from activity_bitmap import load_bitmap, active_days_between
 from pymongo import ReturnDocument
 import oci
 import config
@@ -41,29 +43,27 @@ def resize_image(file, max_size=1024):
 # -----------------------------
 # EXTRACT PARENT SIGNALS
 # -----------------------------
+# The only signal tuples extract_parent_signals can return
+QUIET_SIGNALS = {"engagement_flow": "quiet", "direction": "steady", "guidance_level": "encourage"}
+STEADY_SIGNALS = {"engagement_flow": "steady", "direction": "stable", "guidance_level": "wait"}
+UNEVEN_SIGNALS = {"engagement_flow": "uneven", "direction": "recovering", "guidance_level": "gentle_support"}
+SLOWING_SIGNALS = {"engagement_flow": "slowing", "direction": "slowing", "guidance_level": "attention"}
+SIGNAL_TUPLES = (QUIET_SIGNALS, STEADY_SIGNALS, UNEVEN_SIGNALS, SLOWING_SIGNALS)
+
 def extract_parent_signals(child_id):
     child_id = int(child_id)
     today = datetime.utcnow().date()
     start = today - timedelta(days=ROLLING_DAYS)
 
-    quests = list(quests_collection.find({"userId": child_id}))
-    active_days = set()
-    has_any_activity = False
-
-    for q in quests:
-        for log in q.get("spent_logs", []):
-            d = datetime.strptime(log["spent_at"], "%Y-%m-%d").date()
-            if start <= d <= today and log["spent_minutes"] > 0:
-                active_days.add(d)
-                has_any_activity = True
-
-    if not has_any_activity:
-        return {"engagement_flow": "quiet", "direction": "steady", "guidance_level": "encourage"}
-    if len(active_days) >= 8:
-        return {"engagement_flow": "steady", "direction": "stable", "guidance_level": "wait"}
-    if 3 <= len(active_days) < 8:
-        return {"engagement_flow": "uneven", "direction": "recovering", "guidance_level": "gentle_support"}
-    return {"engagement_flow": "slowing", "direction": "slowing", "guidance_level": "attention"}
+    active_days = active_days_between(load_bitmap(child_id), start, today)
+
+    if not active_days:
+        return dict(QUIET_SIGNALS)
+    if active_days >= 8:
+        return dict(STEADY_SIGNALS)
+    if 3 <= active_days < 8:
+        return dict(UNEVEN_SIGNALS)
+    return dict(SLOWING_SIGNALS)
 
 # -----------------------------
 # BUILD NARRATIVE FEATURES
@@ -113,7 +113,13 @@ def parent_interpretation():
 
     signals = extract_parent_signals(child_id)
     narrative = build_narrative_features(signals)
-    interpretation = run_parent_interpretation(narrative)
+
+    # precomputed per signal tuple; live call only until the table is filled
+    guidance = precomputed_guidance(signals, child_id)
+    if guidance:
+        interpretation = {"current_guidance": guidance}
+    else:
+        interpretation = run_parent_interpretation(narrative)
     
     return jsonify({
         "current_guidance": interpretation.get("current_guidance", "No interpretation available."),
@@ -208,7 +214,7 @@ def get_gift():
     if not child_id:
         return jsonify({"error": "childId is required"}), 400
 
-    gift = users_collection.find_one({"userId": child_id}, {"_id": 0})
+    gift = users_collection.find_one({"userId": child_id}, {"_id": 0, "activity_bits": 0})
     if not gift:
         return jsonify({"error": "Not found"}), 404
 
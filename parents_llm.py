@@ -1,14 +1,14 @@
 # parents_llm.py
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 import re
+import llm_gateway
 from dotenv import load_dotenv
 # -----------------------------
 # 1) LLM (LOW VARIANCE)
 # -----------------------------
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
+llm = llm_gateway.chat_model(
+    "parents",
     temperature=0.2
 )
 
@@ -41,13 +41,24 @@ parent_prompt = ChatPromptTemplate.from_messages([
 # -----------------------------
 parent_chain = parent_prompt | llm | StrOutputParser()
 
+# Bump when parent_prompt changes: precomputed interpretations are keyed by it
+PROMPT_VERSION = 1
+
+# Wording variants for precomputed dashboard interpretations
+VARIANT_HINTS = (
+    "",
+    "Open with one reassuring sentence.",
+    "Frame it around what the parent may notice at home.",
+)
+
 # -----------------------------
 # 4) Public function (ONLY ENTRY)
 # -----------------------------
-def run_parent_interpretation(narrative_features, question=None):
+def run_parent_interpretation(narrative_features, question=None, variant=None, use_cache=True):
     """
     Generates a parent-friendly answer based on narrative features.
     Handles both dashboard interpretation and direct chat questions.
+    variant picks a VARIANT_HINTS wording for dashboard interpretations.
     """
     # 1. Format the narrative features into a bulleted string
     narrative_text = "\n".join(f"- {f}" for f in narrative_features)
@@ -55,6 +66,8 @@ def run_parent_interpretation(narrative_features, question=None):
     # 2. Determine if this is a general interpretation or a specific chat question
     is_chat = question is not None
     query = question or "Provide a general interpretation of the learning flow and a brief rationale."
+    if variant is not None and VARIANT_HINTS[variant]:
+        query += " " + VARIANT_HINTS[variant]
 
     # 3. Guardrail: Check for forbidden keywords (data privacy)
     forbidden_keywords = ["number", "minutes", "spent", "log", "date", "time", "statistics", "detail"]
@@ -65,10 +78,10 @@ def run_parent_interpretation(narrative_features, question=None):
 
     # 4. Call the LLM
     try:
-        raw_output = parent_chain.invoke({
+        raw_output = llm_gateway.invoke("parents", parent_chain, {
             "narrative": narrative_text,
             "question": query
-        })
+        }, use_cache=use_cache, coalesce=True)
         print("✅ Raw LLM Output:", raw_output)
     except Exception as e:
         print(f"❌ LLM Invoke Error: {e}")
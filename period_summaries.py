@@ -0,0 +1,110 @@
+# period_summaries.py
+# Weekly and monthly reflections built from stored daily summaries
+# (daily_summaries.py) rather than from raw pages. Keys are the analytics
+# bucket keys ("%G-W%V", "%Y-%m") and cover the same days: a month is its
+# calendar days, not the ISO weeks inside it, since weeks straddle month
+# boundaries. Every stored summary keeps a fingerprint of its days'
+# fingerprints, so a week or month is only sent to the LLM again when one
+# of its days changed.
+import hashlib
+from datetime import datetime, timedelta
+from daily_summaries import UNAVAILABLE, get_daily_summary, page_day
+from models.quest import daily_summaries_collection, pages_collection, period_summaries_collection
+from summary_agent import summarize_period
+
+PERIODS = ("weekly", "monthly")
+
+# -----------------------------
+# Bucket structure
+# -----------------------------
+def week_days(key):
+    monday = datetime.strptime(key + "-1", "%G-W%V-%u").date()
+    return [(monday + timedelta(days=i)).isoformat() for i in range(7)]
+
+def month_days(key):
+    first = datetime.strptime(key, "%Y-%m").date()
+    next_month = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return [(first + timedelta(days=i)).isoformat() for i in range((next_month - first).days)]
+
+def children_fingerprint(children):
+    parts = "|".join(f"{key}:{result['fingerprint']}" for key, result in children)
+    return hashlib.sha256(parts.encode()).hexdigest()
+
+# -----------------------------
+# Children
+# -----------------------------
+def day_children(user_id, days):
+    """
+    [(date, daily summary)] for the days that have pages.
+    Stored daily summaries are loaded in one query.
+    """
+    day_after = (datetime.strptime(days[-1], "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+    active_days = {
+        page_day(page.get("createdAt"))
+        for page in pages_collection.find(
+            {"userId": user_id, "createdAt": {"$gte": days[0], "$lt": day_after}},
+            {"_id": 0, "createdAt": 1}
+        )
+    }
+    stored = {
+        doc["date"]: doc
+        for doc in daily_summaries_collection.find({"userId": user_id, "date": {"$in": days}}, {"_id": 0})
+    }
+
+    children = []
+    for day in days:
+        if day in active_days:
+            result = get_daily_summary(user_id, day, stored.get(day))
+            if result:
+                children.append((day, result))
+    return children
+
+# -----------------------------
+# Read-through
+# -----------------------------
+def get_period_summary(user_id, period, key):
+    """
+    {summary, updatedAt, fingerprint} for the week / month, or None if it has no pages.
+    """
+    days = week_days(key) if period == "weekly" else month_days(key)
+    children = day_children(user_id, days)
+    if not children:
+        return None
+
+    # a child the LLM couldn't summarize: answer, but don't store
+    if any(result["fingerprint"] is None for _, result in children):
+        return {"summary": UNAVAILABLE, "updatedAt": datetime.utcnow().isoformat() + "Z", "fingerprint": None}
+
+    fingerprint = children_fingerprint(children)
+    stored = period_summaries_collection.find_one(
+        {"userId": user_id, "period": period, "key": key},
+        {"_id": 0, "summary": 1, "updatedAt": 1, "fingerprint": 1}
+    )
+    if stored and stored.get("fingerprint") == fingerprint:
+        return stored
+
+    summaries_text = "\n".join(f"{child_key}: {result['summary']}" for child_key, result in children)
+    try:
+        summary = summarize_period(period, summaries_text)
+    except Exception as e:
+        print(f"❌ {period} summary AI error:", e)
+        return {"summary": UNAVAILABLE, "updatedAt": datetime.utcnow().isoformat() + "Z", "fingerprint": None}
+
+    updated_at = datetime.utcnow().isoformat() + "Z"
+    period_summaries_collection.update_one(
+        {"userId": user_id, "period": period, "key": key},
+        {"$set": {"summary": summary, "fingerprint": fingerprint, "updatedAt": updated_at}},
+        upsert=True
+    )
+    return {"summary": summary, "updatedAt": updated_at, "fingerprint": fingerprint}
+
+def stored_period_summaries(user_id, period, keys):
+    """
+    Stored summaries for the given bucket keys (no generation). Returns {key: doc}.
+    """
+    docs = period_summaries_collection.find(
+        {"userId": user_id, "period": period, "key": {"$in": list(keys)}},
+        {"_id": 0, "key": 1, "summary": 1, "updatedAt": 1}
+    )
+    return {doc["key"]: doc for doc in docs}
@@ -0,0 +1,156 @@
+# quick_prefetch.py
+# Speculative quick actions (TUTOR_PREFETCH=1). After an assistant answer
+# is saved, the most-clicked quick actions are generated in a background
+# pool, within a per-user hourly budget, and stored in tutor_prefetch
+# against the assistant messageId. A click on one of them is answered from
+# there (or by waiting on the in-flight generation) instead of a fresh
+# Gemini call. Hits, misses and unused generations show whether it pays off.
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, timedelta
+from pymongo.errors import PyMongoError
+import config
+from models.quest import tutor_prefetch_collection
+from tutor_agent import QUICK_ACTIONS, quick_action_prompt, run_tutor
+
+_pool = ThreadPoolExecutor(max_workers=config.TUTOR_PREFETCH_WORKERS)
+_lock = threading.Lock()
+_inflight = {}       # (assistant messageId, action) -> Future
+_clicks = Counter()  # quick action -> clicks seen by this worker
+_budgets = OrderedDict()  # userId -> (window start, generations used), oldest window first
+_counters = {"scheduled": 0, "generated": 0, "failed": 0, "over_budget": 0, "hits": 0, "waited": 0, "misses": 0}
+
+def count(counter):
+    with _lock:
+        _counters[counter] += 1
+
+def top_actions():
+    """
+    Quick actions by clicks, ties in QUICK_ACTIONS order.
+    """
+    with _lock:
+        return sorted(QUICK_ACTIONS, key=lambda action: (-_clicks[action], QUICK_ACTIONS.index(action)))
+
+def take_budget(user_id):
+    """
+    One generation from the user's hourly budget. Windows are kept in the
+    order they started, so the expired ones are dropped from the front and
+    only users active in the last hour are tracked.
+    """
+    now = time.monotonic()
+    with _lock:
+        while _budgets:
+            oldest, (started, _) = next(iter(_budgets.items()))
+            if now - started < 3600:
+                break
+            del _budgets[oldest]
+
+        started, used = _budgets.get(user_id, (now, 0))
+        if used >= config.TUTOR_PREFETCH_BUDGET_PER_HOUR:
+            return False
+        _budgets[user_id] = (started, used + 1)  # a new window goes last
+        return True
+
+# -----------------------------
+# Generate
+# -----------------------------
+def generate(user_id, assistant_message_id, action, answer_text, history_text):
+    try:
+        content = run_tutor(quick_action_prompt(action, answer_text), history_text, chain="tutor_prefetch")
+        tutor_prefetch_collection.insert_one({
+            "assistantMessageId": assistant_message_id,
+            "userId": user_id,
+            "action": action,
+            "content": content,
+            "used": False,
+            "createdAt": datetime.utcnow()  # BSON date for the TTL index
+        })
+        count("generated")
+        return content
+    except Exception as e:
+        print(f"❌ Quick action prefetch failed ({action}):", e)
+        count("failed")
+        return None
+    finally:
+        with _lock:
+            _inflight.pop((assistant_message_id, action), None)
+
+def schedule_prefetch(user_id, assistant_message, history_text):
+    """
+    Called after an assistant answer is saved. history_text is the turn's history.
+    """
+    if not config.TUTOR_PREFETCH:
+        return
+
+    history_text = f"{history_text}\nAssistant: {assistant_message['content']}".strip()
+    for action in top_actions()[:config.TUTOR_PREFETCH_TOP_K]:
+        if not take_budget(user_id):
+            count("over_budget")
+            return
+        key = (assistant_message["messageId"], action)
+        with _lock:
+            _counters["scheduled"] += 1
+            _inflight[key] = _pool.submit(
+                generate, user_id, assistant_message["messageId"], action, assistant_message["content"], history_text
+            )
+
+# -----------------------------
+# Serve
+# -----------------------------
+def take_prefetched(user_id, assistant_message_id, action):
+    """
+    The prefetched answer for a click, or None (the caller generates as usual).
+    """
+    with _lock:
+        _clicks[action] += 1
+        future = _inflight.get((assistant_message_id, action))
+
+    if not config.TUTOR_PREFETCH or not assistant_message_id:
+        return None
+
+    if future is not None:
+        # generation still running in this worker: wait for it rather than start another
+        try:
+            if future.result(timeout=config.LLM_TUTOR_DEADLINE_S):
+                count("waited")
+        except FutureTimeout:
+            pass
+
+    try:
+        doc = tutor_prefetch_collection.find_one_and_update(
+            {"assistantMessageId": assistant_message_id, "action": action, "userId": user_id, "used": False},
+            {"$set": {"used": True, "usedAt": datetime.utcnow()}},
+            projection={"_id": 0, "content": 1}
+        )
+    except PyMongoError as e:
+        print("❌ Prefetch lookup failed:", e)
+        doc = None
+
+    if doc:
+        count("hits")
+        return doc["content"]
+    count("misses")
+    return None
+
+def prefetch_stats():
+    with _lock:
+        counters = dict(_counters)
+        clicks = dict(_clicks)
+
+    since = datetime.utcnow() - timedelta(days=1)
+    stored = tutor_prefetch_collection.count_documents({"createdAt": {"$gte": since}})
+    used = tutor_prefetch_collection.count_documents({"createdAt": {"$gte": since}, "used": True})
+    lookups = counters["hits"] + counters["misses"]
+    return {
+        "enabled": config.TUTOR_PREFETCH,
+        **counters,
+        "clicks": clicks,
+        "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0,
+        "last_24h": {
+            "generated": stored,
+            "used": used,
+            "waste_rate": round(1 - used / stored, 4) if stored else 0
+        }
+    }
@@ -0,0 +1,159 @@
+# rollups.py
+# Per-user daily rollups: one document per (userId, day) holding
+# actual minutes per subject and planned minutes by deadline day.
+# Analytics reads these instead of walking every study-time log.
+import sys
+from collections import defaultdict
+from pymongo import ReplaceOne, UpdateOne
+from analytics_cache import bump_version
+from models.quest import quests_collection, rollups_collection, spent_logs_collection
+from spent_logs import embedded_logs
+
+# -----------------------------
+# Subject keys
+# -----------------------------
+# Subjects become field names under "actual", so "." and "$" are swapped
+# for their fullwidth forms on write and restored on read
+def encode_subject(subject):
+    subject = subject if subject is not None else "Unknown"
+    return str(subject).replace(".", "．").replace("$", "＄")
+
+def decode_subject(key):
+    return key.replace("．", ".").replace("＄", "$")
+
+def to_day(date_str):
+    return (date_str or "")[:10]
+
+# -----------------------------
+# Write path (single-document $inc, safe under concurrent writers)
+# -----------------------------
+def spent_increment(subject, minutes, sign=1):
+    return {
+        "actual_total": sign * minutes,
+        f"actual.{encode_subject(subject)}": sign * minutes,
+        "active_logs": sign if minutes > 0 else 0
+    }
+
+def record_spent(user_id, subject, spent_at, minutes):
+    rollups_collection.update_one(
+        {"userId": user_id, "day": to_day(spent_at)},
+        {"$inc": spent_increment(subject, minutes)},
+        upsert=True
+    )
+
+def record_quest_created(quest):
+    if not quest.get("deadline"):
+        return
+    rollups_collection.update_one(
+        {"userId": quest["userId"], "day": to_day(quest["deadline"])},
+        {"$inc": {"planned_total": quest.get("suggested_minutes", 0)}},
+        upsert=True
+    )
+
+def record_quest_deleted(quest, logs):
+    """
+    Reverses everything a quest contributed: its planned minutes and every spent log.
+    """
+    increments = defaultdict(lambda: defaultdict(int))
+
+    for log in logs:
+        day = to_day(log.get("spent_at"))
+        for field, value in spent_increment(quest.get("subject"), log.get("spent_minutes", 0), sign=-1).items():
+            increments[day][field] += value
+
+    if quest.get("deadline"):
+        increments[to_day(quest["deadline"])]["planned_total"] -= quest.get("suggested_minutes", 0)
+
+    ops = [
+        UpdateOne({"userId": quest["userId"], "day": day}, {"$inc": dict(fields)}, upsert=True)
+        for day, fields in increments.items()
+    ]
+    if ops:
+        rollups_collection.bulk_write(ops, ordered=False)
+
+def delete_user_rollups(user_id):
+    rollups_collection.delete_many({"userId": user_id})
+
+# -----------------------------
+# Backfill
+# -----------------------------
+def build_user_rollups(user_id):
+    """
+    Recomputes a user's rollup days from the spent_logs time-series and the
+    quests' deadlines with two aggregation pipelines, so only per-day totals
+    come back over the wire. Logs of quests the spent_logs migration hasn't
+    reached yet are added from the quests themselves.
+    """
+    days = defaultdict(lambda: {"actual_total": 0, "actual": {}, "planned_total": 0, "active_logs": 0})
+
+    spent_rows = spent_logs_collection.aggregate([
+        {"$match": {"meta.userId": user_id}},
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$spent_at"}},
+                "subject": {"$ifNull": ["$meta.subject", "Unknown"]}
+            },
+            "minutes": {"$sum": "$spent_minutes"},
+            "active_logs": {"$sum": {"$cond": [{"$gt": ["$spent_minutes", 0]}, 1, 0]}}
+        }}
+    ])
+    for row in spent_rows:
+        day = days[row["_id"]["day"]]
+        day["actual_total"] += row["minutes"]
+        key = encode_subject(row["_id"]["subject"])
+        day["actual"][key] = day["actual"].get(key, 0) + row["minutes"]
+        day["active_logs"] += row["active_logs"]
+
+    for quest, log in embedded_logs(user_id):
+        day = days[to_day(log["spent_at"])]
+        minutes = log.get("spent_minutes", 0)
+        day["actual_total"] += minutes
+        key = encode_subject(quest.get("subject"))
+        day["actual"][key] = day["actual"].get(key, 0) + minutes
+        day["active_logs"] += 1 if minutes > 0 else 0
+
+    planned_rows = quests_collection.aggregate([
+        {"$match": {"userId": user_id, "deadline": {"$nin": [None, ""]}}},
+        {"$group": {
+            "_id": {"$substrCP": ["$deadline", 0, 10]},
+            "planned": {"$sum": "$suggested_minutes"}
+        }}
+    ])
+    for row in planned_rows:
+        days[row["_id"]]["planned_total"] += row["planned"]
+
+    return days
+
+def rebuild_user_rollups(user_id):
+    """
+    Replaces each rebuilt day in place (upsert), then drops the user's days
+    that no longer have any activity. Live $inc writes never find the user's
+    rollups half deleted, and a day they create meanwhile is replaced rather
+    than colliding with an insert.
+    """
+    days = build_user_rollups(user_id)
+
+    if days:
+        rollups_collection.bulk_write([
+            ReplaceOne({"userId": user_id, "day": day}, {"userId": user_id, "day": day, **row}, upsert=True)
+            for day, row in days.items()
+        ], ordered=False)
+    rollups_collection.delete_many({"userId": user_id, "day": {"$nin": list(days)}})
+    bump_version(user_id)
+    return len(days)
+
+def backfill(user_ids=None):
+    if not user_ids:
+        user_ids = quests_collection.distinct("userId")
+
+    for user_id in user_ids:
+        count = rebuild_user_rollups(user_id)
+        print(f"✅ Rebuilt {count} rollup days for user {user_id}")
+
+# -----------------------------
+# CLI: python rollups.py [userId ...]
+# -----------------------------
+if __name__ == "__main__":
+    from indexes import ensure_indexes
+    ensure_indexes()
+    backfill([int(arg) for arg in sys.argv[1:]])
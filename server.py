@@ -1,18 +1,34 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from datetime import datetime
-from models.quest import quests_collection, users_collection, messages_collection, pages_collection
+import json
+import time
+from models.quest import quests_collection, users_collection, pages_collection
 from flask_cors import CORS
 from pymongo import ReturnDocument
 from bson.objectid import ObjectId
-from tutor_agent import run_tutor
-from summary_agent import summarize_logs
+from tutor_agent import run_tutor, stream_tutor, record_stream, stream_stats, QUICK_ACTIONS, quick_action_prompt
+from conversation_cache import BUFFER_LIMIT, begin_turn, record_turn, history_cache_stats
+from message_buckets import PAGE_DEFAULT, PAGE_MAX, append_messages, latest_messages, decode_cursor, message_page
+from conversation_digest import current_digest, load_uncovered, uncovered, with_digest, schedule_digest, digest_stats
+from quick_prefetch import schedule_prefetch, take_prefetched, prefetch_stats
+from llm_gateway import gateway_stats
+from page_summaries import schedule_page_summary
+from daily_summaries import page_day, invalidate_day, get_daily_summary
+from period_summaries import PERIODS, get_period_summary, stored_period_summaries
+from rollups import record_spent, record_quest_created, record_quest_deleted, delete_user_rollups
+from kanban import record_status_event, delete_user_status_events
+from analytics_cache import bump_version
+from activity_bitmap import set_active_day, clear_inactive_days
+from ids import allocator as id_allocator
+from spent_logs import parse_spent_at, record_log, logs_by_quest, delete_quest_logs, delete_user_logs
+from indexes import ensure_indexes
 import config
 import oci
 
 app = Flask(__name__)
 CORS(app)  # allows all origins (quick fix)
 
-from analytics import analytics_bp
+from analytics import analytics_bp, build_buckets, resolve_bucket_key
 app.register_blueprint(analytics_bp)
 
 from parents import parents_bp
@@ -42,14 +58,9 @@ def get_next_id(counter_name):
     """
     Returns the next integer ID for the given counter.
     counter_name: string, e.g., "userId", "pageId", "questId", "messageId"
+    IDs come from per-process leased blocks (see ids.py).
     """
-    counter = users_collection.database.counters.find_one_and_update(
-        {"_id": counter_name},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=ReturnDocument.AFTER
-    )
-    return counter["seq"]
+    return id_allocator.next_id(counter_name)
 
 # -----------------------------
 # Specific helper functions
@@ -75,14 +86,18 @@ def now_iso():
 # CREATE a quest
 @app.route("/quests", methods=["POST"])
 def create_quest():
-    data = request.get_json()
+    data = request.get_json() or {}
+    try:
+        user_id = int(data.get("userId"))  # analytics and GET /quests query int userIds
+    except (TypeError, ValueError):
+        return jsonify({"error": "userId is required"}), 400
 
     quest_id = get_next_quest_id()  # generate unique questId
     created_at = datetime.utcnow().isoformat() + "Z"  # ISO date
 
     quest_doc = {
         "questId": quest_id,
-        "userId": data.get("userId"),
+        "userId": user_id,
 
         "title": data.get("title"),
         "subject": data.get("subject"),
@@ -95,8 +110,8 @@ def create_quest():
         "suggested_minutes": data.get("suggested_minutes", 0),
         "deadline": data.get("deadline"),
 
-        #ANALYTICS
-        "spent_logs": [],
+        #ANALYTICS (logs live in the spent_logs time-series collection)
+        "spent_total": 0,
 
         "created_at": datetime.utcnow().isoformat() + "Z",
         "updated_at": datetime.utcnow().isoformat() + "Z"
@@ -104,6 +119,9 @@ def create_quest():
     
     quests_collection.insert_one(quest_doc)
     quest_doc.pop("_id", None)
+    record_quest_created(quest_doc)
+    record_status_event(quest_doc["userId"], quest_id, "prepare")
+    bump_version(quest_doc["userId"])
 
     return jsonify(quest_doc), 201
 
@@ -115,14 +133,24 @@ def get_user_quests():
         return jsonify({"error": "userId parameter is required"}), 400
     
     user_id = int(user_id)  # convert to number if you are using numeric userId
+    include = request.args.get("include", "").split(",")
+
+    # spent_logs_invalid holds what the migration couldn't move; it isn't API data
+    user_quests = list(quests_collection.find({"userId": user_id}, {"_id": 0, "spent_logs_invalid": 0}))
+    logs = logs_by_quest(user_id) if "logs" in include else {}
 
-    user_quests = list(quests_collection.find({"userId": user_id}, {"_id": 0}))
     for quest in user_quests:
         # remove None fields
         for key in list(quest.keys()):
             if quest[key] is None:
                 quest.pop(key)
 
+        # quests not migrated yet still carry an embedded array
+        embedded = quest.pop("spent_logs", [])
+        quest["spent_total"] = quest.get("spent_total", 0) + sum(log.get("spent_minutes", 0) for log in embedded)
+        if "logs" in include:
+            quest["spent_logs"] = embedded + logs.get(quest["questId"], [])
+
     return jsonify(user_quests), 200
 
 # UPDATE quest info
@@ -171,18 +199,23 @@ def change_quest_status():
     if status not in ["prepare", "active", "done"]:
         return jsonify({"error": "Invalid status"}), 400
 
-    result = quests_collection.update_one(
+    # Returns the document before the update, so the transition is known
+    previous = quests_collection.find_one_and_update(
         {"userId": user_id, "questId": quest_id},
         {"$set": {
             "status": status,
             "updated_at": datetime.utcnow().isoformat() + "Z"
-        }}
-
+        }},
+        projection={"_id": 0, "status": 1}
     )
 
-    if result.matched_count == 0:
+    if not previous:
         return jsonify({"error": "Quest not found"}), 404
 
+    if previous.get("status") != status:
+        record_status_event(user_id, quest_id, status, previous.get("status"))
+        bump_version(user_id)
+
     return jsonify({
         "userId": user_id,
         "questId": quest_id,
@@ -201,22 +234,32 @@ def add_spent_log():
     if not all([user_id, quest_id, spent_at, spent_minutes]):
         return jsonify({"error": "Missing required fields"}), 400
 
+    if not parse_spent_at(spent_at):
+        return jsonify({"error": "spent_at must be YYYY-MM-DD"}), 400
+
     spent_log = {
         "spent_at": spent_at,
         "spent_minutes": int(spent_minutes)
     }
 
-    result = quests_collection.update_one(
+    quest = quests_collection.find_one_and_update(
         {"userId": int(user_id), "questId": int(quest_id)},
         {
-            "$push": {"spent_logs": spent_log},
+            "$inc": {"spent_total": spent_log["spent_minutes"]},
             "$set": {"updated_at": datetime.utcnow().isoformat() + "Z"}
-        }
+        },
+        projection={"_id": 0, "subject": 1}
     )
 
-    if result.matched_count == 0:
+    if not quest:
         return jsonify({"error": "Quest not found"}), 404
 
+    record_log(int(user_id), int(quest_id), quest.get("subject"), spent_at, spent_log["spent_minutes"])
+    record_spent(int(user_id), quest.get("subject"), spent_at, spent_log["spent_minutes"])
+    if spent_log["spent_minutes"] > 0:
+        set_active_day(int(user_id), spent_at)
+    bump_version(user_id)
+
     return jsonify({
         "message": "Study time logged",
         "questId": quest_id,
@@ -230,11 +273,18 @@ def delete_quest():
     user_id = data.get("userId")
     quest_id = data.get("questId")
 
-    quest = quests_collection.find_one({"questId": quest_id, "userId": user_id})
+    # find_one_and_delete returns the exact document removed, so its logs are reversed once
+    quest = quests_collection.find_one_and_delete({"questId": quest_id, "userId": user_id})
     if not quest:
         return jsonify({"error": "Quest not found for this user"}), 404
 
-    quests_collection.delete_one({"questId": quest_id, "userId": user_id})
+    logs = quest.get("spent_logs", []) + logs_by_quest(user_id, [quest_id]).get(quest_id, [])
+    delete_quest_logs(user_id, quest_id)
+
+    record_quest_deleted(quest, logs)
+    clear_inactive_days(user_id, {log.get("spent_at", "")[:10] for log in logs})
+    record_status_event(user_id, quest_id, None, quest.get("status"))
+    bump_version(user_id)
     remaining_quests = list(quests_collection.find({"userId": user_id}, {"questId": 1, "_id": 0}))
     
     remaining_ids = [q["questId"] for q in remaining_quests]
@@ -326,7 +376,7 @@ def update_user():
 
     user = users_collection.find_one(
         {"userId": user_id},
-        {"_id": 0, "password": 0, "email": 0}  # don't return sensitive info
+        {"_id": 0, "password": 0, "email": 0, "activity_bits": 0}  # don't return sensitive info or the bitmap
     )
 
     return jsonify(user), 200
@@ -340,8 +390,19 @@ def delete_user():
     if not user_id:
         return jsonify({"status": "Failures"}), 400
 
+    # userIds are ints: anything else can't match a user, and must fail
+    # before the deletes rather than in bump_version after them
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return jsonify({"status": "Failure"}), 404
+
     user_result = users_collection.delete_one({"userId": user_id})
     quests_collection.delete_many({"userId": user_id})
+    delete_user_rollups(user_id)
+    delete_user_status_events(user_id)
+    delete_user_logs(user_id)
+    bump_version(user_id)
 
     if user_result.deleted_count == 0:
         return jsonify({"status": "Failure"}), 404
@@ -351,20 +412,14 @@ def delete_user():
 # ===========
 # TUTORS
 # ===========
-@app.route("/tutors", methods=["POST"])
-def send_message():
-    data = request.get_json()
-
-    user_id = data.get("userId")
-    quick_action = data.get("quickAction")
-    content = data.get("content", "")
-
-    if not user_id or not quick_action:
-        return jsonify({"error": "userId and quickAction are required"}), 400
-
-    if quick_action == "text" and not content:
-        return jsonify({"error": "content is required when quickAction is text"}), 400
-
+def start_tutor_turn(user_id, quick_action, content):
+    """
+    Builds the user message and the LLM input for a tutor turn. Nothing is
+    written yet: save_tutor_turn stores both messages once the reply exists.
+    Returns (turn, user_message, content_to_send, history_text, reply_to);
+    turn is passed on to save_tutor_turn, reply_to is the messageId of the
+    answer a quick action refers to.
+    """
     seq_id = get_next_message_id()  # e.g., 1001
 
     # -------------------------
@@ -377,72 +432,208 @@ def send_message():
         "content": content,
         "createdAt": datetime.utcnow().isoformat() + "Z"
     }
-    messages_collection.insert_one(user_message)
 
     # -------------------------
-    # ASSISTANT MESSAGE
+    # ASSISTANT INPUT
     # -------------------------
-    # 1) Load previous messages (last 50)
-    previous_messages = list(
-        messages_collection.find(
-            {"userId": user_id},
-            {"role": 1, "content": 1, "_id": 0}
-        ).sort("createdAt", 1).limit(50)
-    )
-
-    # 2) Build history string
-    history_text = build_history(previous_messages, limit=6)
-
-        # 3) For quick actions, include last tutor response
-    if quick_action in ["why", "hint", "example", "summary", "application"]:
-        last_assistant = list(
-            messages_collection.find(
-                {"userId": user_id, "role": "assistant"},
-                {"content": 1, "_id": 0}
-            ).sort("createdAt", -1).limit(1)
-        )
+    # 1) Latest messages: this worker's buffer, or Mongo if it isn't current
+    turn_seq, previous_messages = begin_turn(user_id)
+    cached = previous_messages is not None
+    if not cached:
+        previous_messages = latest_messages(user_id, BUFFER_LIMIT)
+
+    # 2) Build history string: rolling digest + the messages it doesn't cover
+    digest = current_digest(user_id, reload=not cached)
+    recent = uncovered(load_uncovered(user_id, previous_messages, digest) + [user_message], digest)
+    history_text = with_digest(digest, build_history(recent, limit=len(recent)))
+
+    # 3) For quick actions, include last tutor response
+    reply_to = None
+    if quick_action in QUICK_ACTIONS:
+        last_assistant = [m for m in previous_messages if m["role"] == "assistant"][-1:]
         last_text = last_assistant[0]["content"] if last_assistant else ""
-        
-        content_to_send = (
-            f"User clicked '{quick_action}' on the last tutor answer:\n{last_text}\n"
-            "Respond appropriately to the user."
-        )
+        reply_to = last_assistant[0].get("messageId") if last_assistant else None
+
+        content_to_send = quick_action_prompt(quick_action, last_text)
     else:
         content_to_send = content
-        
+
+    turn = (seq_id, turn_seq, previous_messages)
+    return turn, user_message, content_to_send, history_text, reply_to
+
+def save_tutor_turn(turn, user_message, content, created_at):
+    """
+    Writes the user message and the reply together. Returns the assistant message.
+    """
+    seq_id, turn_seq, previous_messages = turn
+    assistant_message = {
+        "messageId": f"{seq_id}-A",
+        "userId": user_message["userId"],
+        "role": "assistant",
+        "content": content,
+        "createdAt": created_at
+    }
+    new_messages = [user_message, assistant_message]
+    append_messages(user_message["userId"], new_messages, turn_seq)
+    record_turn(user_message["userId"], turn_seq, previous_messages, new_messages)
+    schedule_digest(user_message["userId"], previous_messages + new_messages)
+    return assistant_message
+
+def read_tutor_request(data):
+    """
+    Returns (user_id, quick_action, content, error_response).
+    """
+    data = data or {}
+    user_id = data.get("userId")
+    quick_action = data.get("quickAction")
+    content = data.get("content", "")
+
+    if not user_id or not quick_action:
+        return None, None, None, (jsonify({"error": "userId and quickAction are required"}), 400)
+
+    if quick_action == "text" and not content:
+        return None, None, None, (jsonify({"error": "content is required when quickAction is text"}), 400)
+
+    return user_id, quick_action, content, None
+
+@app.route("/tutors", methods=["POST"])
+def send_message():
+    user_id, quick_action, content, error = read_tutor_request(request.get_json())
+    if error:
+        return error
+
+    turn, user_message, content_to_send, history_text, reply_to = start_tutor_turn(user_id, quick_action, content)
     created_at_assistant = datetime.utcnow().isoformat() + "Z"
 
+    # speculative answer for this quick action, if one was prefetched
+    assistant_content = take_prefetched(user_id, reply_to, quick_action) if reply_to else None
+    failed = False
+
     try:
         # 4) Call tutor LLM with memory
-        assistant_content = run_tutor(content_to_send, history_text)
+        if assistant_content is None:
+            assistant_content = run_tutor(content_to_send, history_text, coalesce=quick_action != "text")
 
     except Exception as e:
         print("❌ Tutor AI error:", e)
         assistant_content = "Sorry, I couldn't generate a response right now."
         created_at_assistant = datetime.utcnow().isoformat() + "Z"
+        failed = True
 
-    assistant_message = {
-        "messageId": f"{seq_id}-A",
-        "userId": user_id,
-        "role": "assistant",
-        "content": assistant_content,
-        "createdAt": created_at_assistant
-    }
-    messages_collection.insert_one(assistant_message)
-
-    user_message.pop("_id", None)
-    assistant_message.pop("_id", None)
+    assistant_message = save_tutor_turn(turn, user_message, assistant_content, created_at_assistant)
+    if not failed:
+        schedule_prefetch(user_id, assistant_message, history_text)
 
     return jsonify({
         "userMessage": user_message,
         "assistantMessage": assistant_message
     }), 200
 
+# =========
+# STREAMING TUTOR (Server-Sent Events)
+# =========
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def single_chunk(text):
+    # a prefetched answer, sent as one token event
+    yield text
+
+@app.route("/tutors/stream", methods=["POST"])
+def stream_message():
+    """
+    Same input as POST /tutors. Emits:
+      event: user    -> the user message
+      event: token   -> {"text": chunk}, as the model produces it
+      event: done    -> the saved assistant message
+    Both messages are persisted once the stream finishes. If the
+    client disconnects, the upstream Gemini stream is closed and nothing is saved.
+    """
+    user_id, quick_action, content, error = read_tutor_request(request.get_json())
+    if error:
+        return error
+
+    turn, user_message, content_to_send, history_text, reply_to = start_tutor_turn(user_id, quick_action, content)
+    prefetched = take_prefetched(user_id, reply_to, quick_action) if reply_to else None
+
+    def generate():
+        started = time.perf_counter()
+        first_token_at = None
+        parts = []
+        outcome = "completed"
+        tokens = single_chunk(prefetched) if prefetched is not None else stream_tutor(content_to_send, history_text)
+
+        try:
+            yield sse("user", user_message)
+            try:
+                for chunk in tokens:
+                    if not chunk:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(chunk)
+                    yield sse("token", {"text": chunk})
+                assistant_content = "".join(parts).strip()
+            except GeneratorExit:
+                raise
+            except Exception as e:
+                print("❌ Tutor AI stream error:", e)
+                outcome = "failed"
+                assistant_content = "Sorry, I couldn't generate a response right now."
+
+            assistant_message = save_tutor_turn(
+                turn, user_message, assistant_content, datetime.utcnow().isoformat() + "Z"
+            )
+            if outcome == "completed":
+                schedule_prefetch(user_id, assistant_message, history_text)
+            yield sse("done", assistant_message)
+
+        except GeneratorExit:
+            # client went away: stop pulling tokens from Gemini
+            outcome = "cancelled"
+            raise
+        finally:
+            tokens.close()
+            record_stream(outcome, started, first_token_at)
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.route("/tutors/stream/stats", methods=["GET"])
+def get_stream_stats():
+    return jsonify(stream_stats()), 200
+
+@app.route("/tutors/history/stats", methods=["GET"])
+def get_history_cache_stats():
+    return jsonify(history_cache_stats()), 200
+
+@app.route("/tutors/digest/stats", methods=["GET"])
+def get_digest_stats():
+    return jsonify(digest_stats()), 200
+
+@app.route("/tutors/prefetch/stats", methods=["GET"])
+def get_prefetch_stats():
+    return jsonify(prefetch_stats()), 200
+
+# =========
+# LLM GATEWAY STATS (per chain latency / errors / breaker)
+# =========
+@app.route("/llm/stats", methods=["GET"])
+def get_llm_stats():
+    return jsonify(gateway_stats()), 200
+
 # =========
 # GET CONVO FROM A USER
 # ========
 @app.route("/tutors", methods=["GET"])
 def get_user_messages():
+    """
+    Paginated, oldest first within a page. Without a cursor: the latest page.
+    ?before=<cursor> pages back, ?after=<cursor> forward (cursors come from
+    the previous response); ?limit= defaults to 50, max 200.
+    """
     user_id = request.args.get("userId")
 
     if not user_id:
@@ -450,14 +641,17 @@ def get_user_messages():
 
     user_id = int(user_id)
 
-    messages = list(
-        messages_collection.find(
-            {"userId": user_id},
-            {"_id": 0}
-        ).sort("createdAt", 1)  # SORT BY TIME (ASC)
-    )
+    try:
+        limit = min(max(int(request.args.get("limit", PAGE_DEFAULT)), 1), PAGE_MAX)
+        before = decode_cursor(request.args["before"]) if "before" in request.args else None
+        after = decode_cursor(request.args["after"]) if "after" in request.args else None
+    except ValueError:
+        return jsonify({"error": "limit must be a number and before/after valid cursors"}), 400
 
-    return jsonify(messages), 200
+    if before and after:
+        return jsonify({"error": "use either before or after"}), 400
+
+    return jsonify(message_page(user_id, limit, before, after)), 200
 
 # -----------------------------
 # CREATE a new quick note (page)
@@ -481,6 +675,8 @@ def create_page():
 
     pages_collection.insert_one(page_doc)
     page_doc.pop("_id", None)
+    schedule_page_summary(page_doc["pageId"], page_doc["userId"])
+    invalidate_day(page_doc["userId"], page_day(page_doc["createdAt"]))
     return jsonify(page_doc), 201
 
 # -----------------------------
@@ -509,6 +705,10 @@ def update_page():
     if not updated_page:
         return jsonify({"error": "Page not found"}), 404
 
+    if "content" in update_fields:
+        schedule_page_summary(updated_page["pageId"], updated_page["userId"])
+    invalidate_day(updated_page["userId"], page_day(updated_page.get("createdAt")))
+
     return jsonify(updated_page), 200
 
 # -----------------------------
@@ -522,14 +722,19 @@ def delete_page():
     if not page_id or not user_id:
         return jsonify({"error": "pageId and userId are required"}), 400
 
-    result = pages_collection.delete_one({
-        "pageId": int(page_id),   # 🔑 THIS is the fix
-        "userId": int(user_id)
-    })
+    deleted_page = pages_collection.find_one_and_delete(
+        {
+            "pageId": int(page_id),   # 🔑 THIS is the fix
+            "userId": int(user_id)
+        },
+        projection={"_id": 0, "createdAt": 1}
+    )
 
-    if result.deleted_count == 0:
+    if not deleted_page:
         return jsonify({"message": "Page not found"}), 404
 
+    invalidate_day(int(user_id), page_day(deleted_page.get("createdAt")))
+
     return jsonify({"message": "Success"}), 200
 
 # -----------------------------
@@ -551,31 +756,45 @@ def get_logs_by_date():
     return jsonify({"entries": logs}), 200
 
 # -----------------------------
-# GET summary of today's summary (MOCK)
+# GET summary of a day's logs (stored per day, rebuilt when its pages change)
 # -----------------------------
 @app.route("/logs/summary", methods=["GET"])
 def get_logs_summary():
     user_id = request.args.get("userId")
     date = request.args.get("date")  # OPTIONAL
+    period = request.args.get("period", "daily")  # daily | weekly | monthly
 
     if not user_id:
         return jsonify({"error": "userId is required"}), 400
 
     user_id = int(user_id)
 
-    # If date not provided → use today
+    # If date not provided → use today (YYYY-MM-DD, the createdAt prefix)
     if not date:
-        date = datetime.utcnow().isoformat() + "Z"
+        date = datetime.utcnow().strftime("%Y-%m-%d")
 
-    logs = list(pages_collection.find(
-        {
+    if period in PERIODS:
+        # the week / month containing date, keyed like analytics buckets
+        try:
+            key = resolve_bucket_key(date, period)
+        except ValueError:
+            return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+
+        result = get_period_summary(user_id, period, key)
+        return jsonify({
             "userId": user_id,
-            "createdAt": {"$regex": f"^{date}"}
-        },
-        {"_id": 0}
-    ))
+            "period": period,
+            "key": key,
+            "summary": result["summary"] if result else "No activity logged for this period.",
+            "updatedAt": result["updatedAt"] if result else datetime.utcnow().isoformat() + "Z"
+        }), 200
 
-    if not logs:
+    if period != "daily":
+        return jsonify({"error": "period must be daily, weekly or monthly"}), 400
+
+    result = get_daily_summary(user_id, date)
+
+    if result is None:
         return jsonify({
             "userId": user_id,
             "date": date,
@@ -583,19 +802,35 @@ def get_logs_summary():
             "updatedAt": datetime.utcnow().isoformat() + "Z"
         }), 200
 
-    combined_text = "\n".join(log["content"] for log in logs)
-
-    try:
-        summary_text = summarize_logs(combined_text)
-    except Exception as e:
-        print("❌ Summary AI error:", e)
-        summary_text = "Summary is temporarily unavailable."
-
     return jsonify({
         "userId": user_id,
         "date": date,
-        "summary": summary_text,
-        "updatedAt": datetime.utcnow().isoformat() + "Z"
+        "summary": result["summary"],
+        "updatedAt": result["updatedAt"]
+    }), 200
+
+# -----------------------------
+# GET stored weekly / monthly summaries for the analytics buckets
+# -----------------------------
+@app.route("/logs/summary/periods", methods=["GET"])
+def get_period_summaries():
+    user_id = request.args.get("userId")
+    period = request.args.get("period", "weekly")
+
+    if not user_id:
+        return jsonify({"error": "userId is required"}), 400
+    if period not in PERIODS:
+        return jsonify({"error": "period must be weekly or monthly"}), 400
+
+    keys = build_buckets(period)
+    stored = stored_period_summaries(int(user_id), period, keys)
+
+    return jsonify({
+        "period": period,
+        "summaries": [
+            {"key": key, "summary": stored.get(key, {}).get("summary"), "updatedAt": stored.get(key, {}).get("updatedAt")}
+            for key in keys
+        ]
     }), 200
 
 # -----------------------------
@@ -635,4 +870,5 @@ def search_pages_by_content():
 # RUN SERVER
 # -----------------------------
 if __name__ == "__main__":
+    ensure_indexes()
     app.run(host="0.0.0.0", port=8000, debug=True)
@@ -0,0 +1,149 @@
+# single_flight.py
+# Coalesces concurrent identical LLM calls. The first caller for a key
+# runs the call; callers arriving while it is in flight wait and share its
+# result or error. Within a worker this uses a per-key Event. With
+# SINGLE_FLIGHT_MONGO=1 the leader also takes a lease document in
+# llm_leases, so callers in other gunicorn workers wait for the result
+# instead of issuing their own call. A lease that expires (crashed worker)
+# is taken over by the next caller.
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError, PyMongoError
+import config
+from models.quest import llm_leases_collection
+
+_owner_token = uuid.uuid4().hex[:8]
+DONE_GRACE_S = 2  # finished results stay visible this long for late followers
+POLL_S = 0.1
+
+class FlightError(Exception):
+    """
+    The shared call failed in another worker.
+    """
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+_flights = {}
+_flights_lock = threading.Lock()
+_counters = {}
+
+def count(chain, counter):
+    with _flights_lock:
+        counters = _counters.setdefault(chain, {"leaders": 0, "coalesced": 0, "coalesced_remote": 0, "takeovers": 0})
+        counters[counter] += 1
+
+def flight_stats(chain):
+    with _flights_lock:
+        return dict(_counters.get(chain, {}))
+
+# -----------------------------
+# In-process
+# -----------------------------
+def run(chain, key, fn, lease_s):
+    """
+    fn() once per key among concurrent callers; everyone gets its result or error.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Flight()
+
+    if not leader:
+        count(chain, "coalesced")
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    count(chain, "leaders")
+    try:
+        if config.SINGLE_FLIGHT_MONGO:
+            flight.result = run_with_lease(chain, key, fn, lease_s)
+        else:
+            flight.result = fn()
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+# -----------------------------
+# Across workers (Mongo lease)
+# -----------------------------
+def owner():
+    # pid at call time: forked gunicorn workers share module state
+    return f"{os.getpid()}-{_owner_token}"
+
+def acquire_lease(key, lease_s):
+    now = datetime.utcnow()
+    lease = {"owner": owner(), "status": "running", "expiresAt": now + timedelta(seconds=lease_s)}
+    try:
+        llm_leases_collection.insert_one({"_id": key, **lease})
+        return True
+    except DuplicateKeyError:
+        taken = llm_leases_collection.find_one_and_update(
+            {"_id": key, "expiresAt": {"$lt": now}},
+            {"$set": lease, "$unset": {"result": "", "error": ""}}
+        )
+        return taken is not None
+
+def wait_for_lease(key, lease_s):
+    """
+    The finished lease document, or None if its holder went away.
+    """
+    deadline = time.monotonic() + lease_s
+    while time.monotonic() < deadline:
+        doc = llm_leases_collection.find_one({"_id": key})
+        if doc is None or doc["expiresAt"] < datetime.utcnow():
+            return None
+        if doc["status"] != "running":
+            return doc
+        time.sleep(POLL_S)
+    return None
+
+def finish_lease(key, **fields):
+    try:
+        llm_leases_collection.update_one(
+            {"_id": key, "owner": owner()},
+            {"$set": {**fields, "expiresAt": datetime.utcnow() + timedelta(seconds=DONE_GRACE_S)}}
+        )
+    except PyMongoError as e:
+        print("❌ LLM lease release failed:", e)
+
+def run_with_lease(chain, key, fn, lease_s):
+    try:
+        leader = acquire_lease(key, lease_s)
+        if not leader:
+            doc = wait_for_lease(key, lease_s)
+            if doc is not None:
+                count(chain, "coalesced_remote")
+                if doc["status"] == "failed":
+                    raise FlightError(doc.get("error", "shared LLM call failed"))
+                return doc["result"]
+            leader = acquire_lease(key, lease_s)
+            if leader:
+                count(chain, "takeovers")
+    except PyMongoError as e:
+        print("❌ LLM lease error:", e)
+        return fn()
+
+    try:
+        result = fn()
+    except Exception as e:
+        if leader:
+            finish_lease(key, status="failed", error=str(e))
+        raise
+    if leader:
+        finish_lease(key, status="done", result=result)
+    return result
@@ -0,0 +1,124 @@
+# spent_logs.py
+# Study-time logs live in a MongoDB time-series collection instead of an
+# unbounded array on each quest:
+#   {"spent_at": datetime, "spent_minutes": int, "meta": {"userId", "questId", "subject"}}
+# Quests keep only a running "spent_total". The collection is created by
+# indexes.ensure_indexes().
+import sys
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from analytics_cache import bump_version
+from models.quest import quests_collection, spent_logs_collection
+
+def parse_spent_at(spent_at):
+    """
+    'YYYY-MM-DD' (or a longer ISO string) -> datetime at midnight, None if invalid.
+    """
+    try:
+        return datetime.strptime((spent_at or "")[:10], "%Y-%m-%d")
+    except ValueError:
+        return None
+
+def log_doc(user_id, quest_id, subject, spent_at, minutes, **meta):
+    return {
+        "spent_at": parse_spent_at(spent_at),
+        "spent_minutes": minutes,
+        "meta": {"userId": user_id, "questId": quest_id, "subject": subject, **meta}
+    }
+
+def as_api_log(doc):
+    return {"spent_at": doc["spent_at"].strftime("%Y-%m-%d"), "spent_minutes": doc["spent_minutes"]}
+
+# -----------------------------
+# Write path
+# -----------------------------
+def record_log(user_id, quest_id, subject, spent_at, minutes):
+    spent_logs_collection.insert_one(log_doc(user_id, quest_id, subject, spent_at, minutes))
+
+def delete_quest_logs(user_id, quest_id):
+    spent_logs_collection.delete_many({"meta.userId": user_id, "meta.questId": quest_id})
+
+def delete_user_logs(user_id):
+    spent_logs_collection.delete_many({"meta.userId": user_id})
+
+# -----------------------------
+# Read path
+# -----------------------------
+def logs_by_quest(user_id, quest_ids=None):
+    """
+    Returns {questId: [{"spent_at": "YYYY-MM-DD", "spent_minutes": int}]} in time order.
+    """
+    query = {"meta.userId": user_id}
+    if quest_ids is not None:
+        query["meta.questId"] = {"$in": list(quest_ids)}
+
+    logs = defaultdict(list)
+    for doc in spent_logs_collection.find(query, {"_id": 0, "spent_at": 1, "spent_minutes": 1, "meta.questId": 1}).sort("spent_at", 1):
+        logs[doc["meta"]["questId"]].append(as_api_log(doc))
+    return logs
+
+def embedded_logs(user_id):
+    """
+    (quest, log) for each valid log still embedded in one of the user's
+    quests, i.e. quests the migration below hasn't reached yet.
+    """
+    quests = quests_collection.find(
+        {"userId": user_id, "spent_logs.0": {"$exists": True}},
+        {"questId": 1, "subject": 1, "spent_logs": 1}
+    )
+    for quest in quests:
+        for log in quest["spent_logs"]:
+            if parse_spent_at(log.get("spent_at")):
+                yield quest, log
+
+# -----------------------------
+# Online migration: python spent_logs.py
+# Moves embedded quest.spent_logs arrays into the time-series collection.
+# A quest's array is unset only if it is unchanged since it was copied;
+# otherwise the copy (tagged with a migration id) is removed and retried.
+# Logs whose spent_at can't be parsed have no place in the time-series, so
+# the same update moves them to quest.spent_logs_invalid instead.
+# -----------------------------
+def migrate_quest(quest):
+    migration = uuid.uuid4().hex
+    logs = quest["spent_logs"]
+    docs, invalid = [], []
+    for log in logs:
+        doc = log_doc(quest["userId"], quest["questId"], quest.get("subject"), log.get("spent_at"), log.get("spent_minutes", 0), migration=migration)
+        if doc["spent_at"] is None:
+            invalid.append(log)
+        else:
+            docs.append(doc)
+    if invalid:
+        print(f"⚠️ Quest {quest['questId']}: keeping {len(invalid)} logs with invalid spent_at in spent_logs_invalid")
+
+    if docs:
+        spent_logs_collection.insert_many(docs)
+
+    update = {"$unset": {"spent_logs": ""}, "$inc": {"spent_total": sum(d["spent_minutes"] for d in docs)}}
+    if invalid:
+        update["$push"] = {"spent_logs_invalid": {"$each": invalid}}
+    result = quests_collection.update_one({"_id": quest["_id"], "spent_logs": logs}, update)
+    if result.matched_count == 0:
+        spent_logs_collection.delete_many({"meta.questId": quest["questId"], "meta.migration": migration})
+        return False
+    bump_version(quest["userId"])
+    return True
+
+def migrate(batch_size=500):
+    moved = 0
+    while True:
+        quests = list(quests_collection.find({"spent_logs": {"$exists": True}}).limit(batch_size))
+        if not quests:
+            break
+        for quest in quests:
+            if migrate_quest(quest):
+                moved += 1
+        print(f"✅ Migrated {moved} quests so far")
+    return moved
+
+if __name__ == "__main__":
+    from indexes import ensure_indexes
+    ensure_indexes()
+    migrate(*[int(arg) for arg in sys.argv[1:2]])
@@ -1,14 +1,14 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 import os
+import llm_gateway
 
 # 1) LLM
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
+llm = llm_gateway.chat_model(
+    "summary",
     temperature=0.2
 )
 
@@ -26,4 +26,38 @@ summary_chain = summary_prompt | llm | StrOutputParser()
 
 # 4) Public function
 def summarize_logs(logs_text: str) -> str:
-    return summary_chain.invoke({"logs": logs_text})
+    return llm_gateway.invoke("summary", summary_chain, {"logs": logs_text}, coalesce=True)
+
+
+# 5) Per-page pre-summary (map step; summarize_logs reduces these)
+page_llm = llm_gateway.chat_model(
+    "page_summary",
+    temperature=0.2,
+    max_output_tokens=120
+)
+
+page_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "You condense one note from a user's learning log. "
+     "Write 1-2 short sentences keeping what was studied, done or felt."),
+    ("human", "{content}")
+])
+
+page_chain = page_prompt | page_llm | StrOutputParser()
+
+def summarize_page(content: str) -> str:
+    return llm_gateway.invoke("page_summary", page_chain, {"content": content}, coalesce=True).strip()
+
+# 6) Weekly / monthly reflection from shorter summaries (period_summaries.py)
+period_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "You write a {period} reflection on a user's learning from shorter summaries, "
+     "each labelled with the day or week it covers. "
+     "Write 3-4 reflective sentences about themes, mindset and progress across the whole period."),
+    ("human", "{summaries}")
+])
+
+period_chain = period_prompt | llm | StrOutputParser()
+
+def summarize_period(period: str, summaries_text: str) -> str:
+    return llm_gateway.invoke("summary", period_chain, {"period": period, "summaries": summaries_text}, coalesce=True)
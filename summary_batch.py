@@ -0,0 +1,104 @@
+# summary_batch.py
+# Pre-generates daily summaries overnight so morning views of yesterday
+# are served from daily_summaries instead of calling Gemini on the request
+# path. Users with pages on the date are summarized by a bounded worker
+# pool under a rate limit; workers wait for their own rate tokens, so
+# progress is reported (and saved on the batch_jobs document) as results
+# come in. Re-running is safe and resumes where a crashed run stopped:
+# users whose stored summary is current are skipped.
+#   python summary_batch.py [YYYY-MM-DD]     (default: yesterday, UTC)
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import config
+from daily_summaries import get_daily_summary, is_current, load_summary
+from models.quest import batch_jobs_collection, pages_collection
+
+class RateLimiter:
+    """
+    Spaces starts evenly: at most per_minute acquisitions per minute.
+    """
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0
+        self.next_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+def users_with_pages(date):
+    return pages_collection.distinct("userId", {"createdAt": {"$regex": f"^{date}"}})
+
+def summarize_user(user_id, date, limiter):
+    """
+    Returns "skipped", "done" or "failed".
+    """
+    try:
+        stored = load_summary(user_id, date)
+        if is_current(stored):
+            return "skipped"  # done by an earlier (interrupted) run or a live view
+        limiter.acquire()
+        result = get_daily_summary(user_id, date, stored)
+    except Exception as e:
+        print(f"❌ Batch summary failed for user {user_id}:", e)
+        return "failed"
+    return "done" if result is None or result["fingerprint"] else "failed"
+
+def run(date, concurrency=None, per_minute=None):
+    concurrency = concurrency or config.SUMMARY_BATCH_CONCURRENCY
+    per_minute = per_minute or config.SUMMARY_BATCH_RATE_PER_MIN
+    limiter = RateLimiter(per_minute)
+    job_id = f"daily-summaries:{date}"
+
+    user_ids = users_with_pages(date)
+    counts = {"total": len(user_ids), "skipped": 0, "done": 0, "failed": 0}
+    failed_users = []
+    started = time.perf_counter()
+    batch_jobs_collection.update_one(
+        {"_id": job_id},
+        {"$set": {"status": "running", "startedAt": datetime.utcnow().isoformat() + "Z", **counts}},
+        upsert=True
+    )
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(summarize_user, user_id, date, limiter): user_id for user_id in user_ids}
+
+        for finished, future in enumerate(as_completed(futures), 1):
+            outcome = future.result()
+            counts[outcome] += 1
+            if outcome == "failed":
+                failed_users.append(futures[future])
+            if finished % 50 == 0:
+                rate = counts["done"] / max(time.perf_counter() - started, 1e-9) * 60
+                print(f"… {finished}/{len(futures)} processed ({rate:.1f}/min, {counts['failed']} failed)")
+                batch_jobs_collection.update_one({"_id": job_id}, {"$set": counts})
+
+    elapsed = time.perf_counter() - started
+    per_min = round(counts["done"] / elapsed * 60, 1) if elapsed else 0
+    batch_jobs_collection.update_one(
+        {"_id": job_id},
+        {"$set": {
+            "status": "finished" if not counts["failed"] else "finished_with_failures",
+            "finishedAt": datetime.utcnow().isoformat() + "Z",
+            **counts,
+            "failedUserIds": failed_users,
+            "elapsedSeconds": round(elapsed, 1),
+            "summariesPerMinute": per_min
+        }}
+    )
+    print(f"✅ {date}: {counts['done']} summarized, {counts['skipped']} already current, "
+          f"{counts['failed']} failed of {counts['total']} users in {elapsed:.1f}s ({per_min}/min)")
+    return counts
+
+if __name__ == "__main__":
+    from indexes import ensure_indexes
+    ensure_indexes()
+    target = sys.argv[1] if len(sys.argv) > 1 else (datetime.utcnow().date() - timedelta(days=1)).isoformat()
+    run(target)
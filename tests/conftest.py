@@ -0,0 +1,140 @@
+# tests/conftest.py
+# The suite runs offline: pymongo.MongoClient is swapped for mongomock
+# (pip install mongomock pytest) before any module connects, the LLM
+# chains use the fake backend, and OCI's instance-principal signer is
+# stubbed so importing server doesn't wait on the metadata endpoint.
+# Each test starts from an empty database with the app's indexes built.
+import os
+import sys
+import threading
+from datetime import datetime
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017/")
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["FAKE_LLM_LATENCY"] = "fixed"
+os.environ["FAKE_LLM_LATENCY_MS"] = "0"
+os.environ["FAKE_LLM_TOKEN_MS"] = "0"
+os.environ["FAKE_LLM_PROMPT_TOKEN_MS"] = "0"
+os.environ["ANALYTICS_VERSION_STORE"] = "local"
+os.environ["TUTOR_DIGEST"] = "0"
+
+import pytest
+mongomock = pytest.importorskip("mongomock")
+import pymongo
+import oci
+
+pymongo.MongoClient = mongomock.MongoClient
+oci.auth.signers.InstancePrincipalsSecurityTokenSigner = lambda *args, **kwargs: None
+oci.object_storage.ObjectStorageClient = lambda *args, **kwargs: None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# -----------------------------
+# mongomock gaps (server features the app relies on)
+# -----------------------------
+from mongomock import aggregate as _aggregate
+
+_date_operator = _aggregate._Parser._handle_date_operator
+def _handle_date_operator(self, operator, values):
+    if operator == "$dateFromString":
+        return datetime.strptime(self.parse(values["dateString"]), values.get("format", "%Y-%m-%dT%H:%M:%S.%LZ"))
+    return _date_operator(self, operator, values)
+_aggregate._Parser._handle_date_operator = _handle_date_operator
+
+_string_operator = _aggregate._Parser._handle_string_operator
+def _handle_string_operator(self, operator, values):
+    # ASCII-only test data: code points and bytes agree
+    return _string_operator(self, "$substr" if operator == "$substrCP" else operator, values)
+_aggregate._Parser._handle_string_operator = _handle_string_operator
+
+_create_collection = mongomock.Database.create_collection
+def create_collection(self, name, **kwargs):
+    kwargs.pop("timeseries", None)  # stored as a plain collection
+    return _create_collection(self, name, **kwargs)
+mongomock.Database.create_collection = create_collection
+
+_update_one = mongomock.Collection.update_one
+def update_one(self, filter, update, *args, **kwargs):
+    if "$bit" in update:
+        update = dict(update)
+        doc = self.find_one(filter) or {}
+        values = {}
+        for path, ops in update.pop("$bit").items():
+            value = doc
+            for part in path.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            value = value or 0
+            for op, mask in ops.items():
+                value = {"or": value | mask, "and": value & mask, "xor": value ^ mask}[op]
+            values[path] = value
+        update.setdefault("$set", {}).update(values)
+    return _update_one(self, filter, update, *args, **kwargs)
+mongomock.Collection.update_one = update_one
+
+# newer pymongo passes sort= to every bulk update / replace
+for _name in ("add_update", "add_replace"):
+    def _drop_sort(method):
+        return lambda self, *args, sort=None, **kwargs: method(self, *args, **kwargs)
+    setattr(mongomock.collection.BulkOperationBuilder, _name, _drop_sort(getattr(mongomock.collection.BulkOperationBuilder, _name)))
+
+# -----------------------------
+# Fixtures
+# -----------------------------
+@pytest.fixture(autouse=True)
+def db():
+    from models.quest import client, db
+    from indexes import ensure_indexes
+    import analytics_cache
+    import conversation_cache
+
+    client.drop_database(db.name)
+    ensure_indexes()
+    # in-process state keyed by userId would outlive the dropped data
+    analytics_cache.cache.entries.clear()
+    analytics_cache._local_versions.clear()
+    with conversation_cache._lock:
+        for user_id in list(conversation_cache._buffers):
+            conversation_cache._drop(user_id)
+    yield db
+
+@pytest.fixture
+def app():
+    from server import app
+    app.config["TESTING"] = True
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+OPERATIONS = (
+    "find", "find_one", "find_one_and_update", "insert_one", "insert_many", "update_one",
+    "update_many", "delete_one", "delete_many", "aggregate", "count_documents", "distinct", "bulk_write"
+)
+
+@pytest.fixture
+def mongo_ops(monkeypatch):
+    """
+    Records (collection, operation) for every Mongo call made on the test's
+    thread; background jobs (digest folds, prefetches) are not counted.
+    Calls mongomock makes internally (find_one -> find) count once.
+    """
+    ops = []
+    thread = threading.get_ident()
+    local = threading.local()
+
+    def recording(name, method):
+        def wrapper(self, *args, **kwargs):
+            outermost = not getattr(local, "depth", 0)
+            if outermost and threading.get_ident() == thread:
+                ops.append((self.name, name))
+            local.depth = getattr(local, "depth", 0) + 1
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                local.depth -= 1
+        return wrapper
+
+    for name in OPERATIONS:
+        monkeypatch.setattr(mongomock.Collection, name, recording(name, getattr(mongomock.Collection, name)))
+    return ops
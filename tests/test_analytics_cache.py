@@ -0,0 +1,99 @@
+# tests/test_analytics_cache.py
+import time
+from datetime import datetime
+
+import pytest
+
+import analytics
+import config
+from analytics_cache import bump_version
+from models.quest import quests_collection
+
+USER_ID = 12
+
+@pytest.fixture
+def cached_summary(client):
+    """
+    Caches /analytics/summary for USER_ID, then bumps the user's version so
+    the entry is outdated.
+    """
+    url = f"/analytics/summary?userId={USER_ID}"
+    first = client.get(url).get_json()
+    bump_version(USER_ID)
+    return url, first
+
+def summary_with(total):
+    return lambda user_id, buckets, mode: {buckets[-1]: {"actual": total, "planned": 0}}
+
+def test_outdated_entry_is_recomputed_when_that_is_fast(client, cached_summary, monkeypatch):
+    url, _ = cached_summary
+    monkeypatch.setattr(analytics, "aggregate_bucket_totals", summary_with(90))
+
+    response = client.get(url)
+
+    assert "X-Analytics-Cache" not in response.headers
+    assert response.get_json()["total_actual_minutes"] == 90
+
+def test_outdated_entry_is_served_when_the_recompute_fails(client, cached_summary, monkeypatch):
+    url, first = cached_summary
+    def fail(*args):
+        raise RuntimeError("mongo down")
+    monkeypatch.setattr(analytics, "aggregate_bucket_totals", fail)
+
+    response = client.get(url)
+
+    assert response.headers["X-Analytics-Cache"] == "stale"
+    assert response.get_json() == first
+
+def test_outdated_entry_is_served_while_a_slow_recompute_finishes(client, cached_summary, monkeypatch):
+    url, first = cached_summary
+    monkeypatch.setattr(config, "ANALYTICS_CACHE_SLOW_MS", 20)
+    def slow(*args):
+        time.sleep(0.2)
+        return summary_with(90)(*args)
+    monkeypatch.setattr(analytics, "aggregate_bucket_totals", slow)
+
+    response = client.get(url)
+    assert response.headers["X-Analytics-Cache"] == "stale"
+    assert response.get_json() == first
+
+    time.sleep(0.4)
+    response = client.get(url)
+    assert "X-Analytics-Cache" not in response.headers
+    assert response.get_json()["total_actual_minutes"] == 90
+
+def test_outdated_entry_is_recomputed_inline_when_the_workers_are_busy(client, cached_summary, monkeypatch):
+    url, _ = cached_summary
+    monkeypatch.setattr(config, "ANALYTICS_REVALIDATE_WORKERS", 0)
+    monkeypatch.setattr(config, "ANALYTICS_CACHE_SLOW_MS", 0)
+    monkeypatch.setattr(analytics, "aggregate_bucket_totals", summary_with(90))
+
+    response = client.get(url)
+
+    assert "X-Analytics-Cache" not in response.headers
+    assert response.get_json()["total_actual_minutes"] == 90
+
+def test_delete_user_rejects_a_non_numeric_user_before_deleting(client):
+    quests_collection.insert_one({"userId": "abc", "questId": 1})
+
+    response = client.delete("/users", json={"userId": "abc"})
+
+    assert response.status_code == 404
+    assert quests_collection.count_documents({}) == 1
+
+@pytest.mark.parametrize("body", [{}, {"title": "no user"}, {"userId": None}, {"userId": "abc"}])
+def test_create_quest_requires_a_user_before_inserting(client, body):
+    response = client.post("/quests", json=body)
+
+    assert response.status_code == 400
+    assert quests_collection.count_documents({}) == 0
+
+def test_create_quest_stores_a_numeric_string_user_as_an_int(client):
+    deadline = datetime.utcnow().date().isoformat()
+    response = client.post("/quests", json={"userId": "5", "title": "t", "deadline": deadline, "suggested_minutes": 30})
+
+    assert response.get_json()["userId"] == 5
+    quests = client.get("/quests", query_string={"userId": 5}).get_json()
+    assert [q["questId"] for q in quests] == [response.get_json()["questId"]]
+    summary = client.get("/analytics/summary", query_string={"userId": 5}).get_json()
+    assert summary["total_planned_minutes"] == 30
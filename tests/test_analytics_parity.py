@@ -0,0 +1,185 @@
+# tests/test_analytics_parity.py
+# The pipeline-backed analytics endpoints must return exactly what the
+# original quest-scan implementation did. reference_* below are the
+# baseline handlers' loops, run over the same fixture quests (with their
+# logs embedded, as they used to be stored).
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+from analytics import build_buckets, resolve_bucket_key
+from kanban import build_kanban_buckets, status_snapshots
+from models.quest import quests_collection
+from rollups import rebuild_user_rollups
+from spent_logs import record_log
+
+USER_ID = 41
+
+def fixture_quests():
+    today = datetime.utcnow().date()
+    day = lambda offset: (today + timedelta(days=offset)).isoformat()
+    quests = [
+        {"subject": "Math", "deadline": day(-2), "suggested_minutes": 30,
+         "spent_logs": [(day(-30), 15), (day(-1), 20)]},
+        {"subject": "History", "spent_logs": [(day(-3), 40)]},
+        {"spent_logs": [(day(-5), 10), (day(-400), 99)]},  # no subject
+        {"subject": "Math", "spent_logs": [(day(0), 25)]},
+        {"subject": "Chem.lab $1", "deadline": day(3), "suggested_minutes": 50,
+         "spent_logs": [(day(-2), 0)]},
+        {"subject": None, "spent_logs": [(day(-8), 40)]},  # ties with History
+        {"subject": "Art", "spent_logs": [(day(-200), 60), (day(-45), 5)]},
+        {"subject": "Bio", "deadline": day(-1), "suggested_minutes": 45, "spent_logs": []},
+    ]
+    for i, quest in enumerate(quests):
+        quest["userId"] = USER_ID
+        quest["questId"] = 9000 + i
+        quest["spent_logs"] = [{"spent_at": at, "spent_minutes": m} for at, m in quest["spent_logs"]]
+    return quests
+
+def load(quests):
+    for quest in quests:
+        quests_collection.insert_one({k: v for k, v in quest.items() if k != "spent_logs"})
+        for log in quest["spent_logs"]:
+            record_log(quest["userId"], quest["questId"], quest.get("subject"), log["spent_at"], log["spent_minutes"])
+    # another user's activity must not leak in
+    record_log(USER_ID + 1, 1, "Math", datetime.utcnow().date().isoformat(), 500)
+    rebuild_user_rollups(USER_ID)
+
+# -----------------------------
+# Baseline implementation
+# -----------------------------
+def reference_summary(quests, mode):
+    buckets = build_buckets(mode)
+    actual = defaultdict(int)
+    planned = defaultdict(int)
+    for q in quests:
+        for log in q.get("spent_logs", []):
+            key = resolve_bucket_key(log["spent_at"], mode)
+            if key in buckets:
+                actual[key] += log["spent_minutes"]
+        if q.get("deadline"):
+            key = resolve_bucket_key(q["deadline"], mode)
+            if key in buckets:
+                planned[key] += q.get("suggested_minutes", 0)
+    total_actual = sum(actual.values())
+    total_planned = sum(planned.values())
+    return {
+        "total_actual_minutes": total_actual,
+        "total_planned_minutes": total_planned,
+        "achievement_rate": int(total_actual / total_planned * 100) if total_planned > 0 else 0
+    }
+
+def reference_plan_vs_actual(quests, mode):
+    buckets = build_buckets(mode)
+    result = {b: {"actual": 0, "planned": 0} for b in buckets}
+    for q in quests:
+        for log in q.get("spent_logs", []):
+            key = resolve_bucket_key(log["spent_at"], mode)
+            if key in result:
+                result[key]["actual"] += log["spent_minutes"]
+        if q.get("deadline"):
+            key = resolve_bucket_key(q["deadline"], mode)
+            if key in result:
+                result[key]["planned"] += q.get("suggested_minutes", 0)
+    response = []
+    for k in buckets:
+        a = result[k]["actual"]
+        p = result[k]["planned"]
+        response.append({"bucket": k, "actual": a, "planned": p, "achievement": int(a / p * 100) if p > 0 else 0})
+    return response
+
+def reference_subjects(quests, mode):
+    buckets = build_buckets(mode)
+    subject_map = defaultdict(int)
+    for q in quests:
+        subject = q.get("subject", "Unknown")
+        for log in q.get("spent_logs", []):
+            key = resolve_bucket_key(log["spent_at"], mode)
+            if key in buckets:
+                subject_map[subject] += log["spent_minutes"]
+    total = sum(subject_map.values())
+    return [
+        {"subject": s, "minutes": m, "share": int(m / total * 100) if total > 0 else 0}
+        for s, m in subject_map.items()
+    ]
+
+def reference_daily_actual_308(quests):
+    today = datetime.utcnow().date()
+    daily_actual = {(today - timedelta(days=i)).isoformat(): 0 for i in range(307, -1, -1)}
+    for q in quests:
+        for log in q.get("spent_logs", []):
+            spent_date = log.get("spent_at", "")[:10]
+            if spent_date in daily_actual:
+                daily_actual[spent_date] += log.get("spent_minutes", 0)
+    return [{"date": d, "actual_minutes": daily_actual[d]} for d in sorted(daily_actual.keys())]
+
+# -----------------------------
+# Parity
+# -----------------------------
+@pytest.mark.parametrize("mode", ["daily", "weekly", "monthly"])
+@pytest.mark.parametrize("path, reference", [
+    ("/analytics/summary", reference_summary),
+    ("/analytics/plan-vs-actual", reference_plan_vs_actual),
+    ("/analytics/subjects", reference_subjects),
+])
+def test_bucketed_endpoints_match_quest_scan(client, path, reference, mode):
+    quests = fixture_quests()
+    load(quests)
+
+    response = client.get(path, query_string={"userId": USER_ID, "mode": mode})
+
+    assert response.status_code == 200
+    assert response.get_json() == reference(quests, mode)
+
+def test_daily_actual_308_matches_quest_scan(client):
+    quests = fixture_quests()
+    load(quests)
+
+    response = client.get("/analytics/daily-actual-308", query_string={"userId": USER_ID})
+
+    assert response.get_json() == reference_daily_actual_308(quests)
+
+def test_subjects_keep_first_seen_order_not_minutes_order(client):
+    quests = fixture_quests()
+    load(quests)
+
+    response = client.get("/analytics/subjects", query_string={"userId": USER_ID, "mode": "weekly"})
+
+    subjects = [row["subject"] for row in response.get_json()]
+    assert subjects[:4] == ["Math", "History", "Unknown", "Chem.lab $1"]
+
+@pytest.mark.parametrize("mode", ["daily", "weekly", "monthly"])
+def test_dashboard_panels_match_single_endpoints(client, mode):
+    load(fixture_quests())
+
+    dashboard = client.get("/analytics/dashboard", query_string={"userId": USER_ID, "mode": mode}).get_json()
+
+    for panel in ("summary", "plan-vs-actual", "subjects", "streak", "kanban"):
+        single = client.get(f"/analytics/{panel}", query_string={"userId": USER_ID, "mode": mode}).get_json()
+        assert dashboard[panel] == single, panel
+
+def test_dashboard_reads_each_source_once(client, mongo_ops, monkeypatch):
+    monkeypatch.setattr(config, "SPENT_LOGS_LEGACY_READS", False)  # spent_logs migration done
+    load(fixture_quests())
+    status_snapshots(USER_ID, build_kanban_buckets("weekly", datetime.utcnow().date()))  # stores the checkpoint
+    query = {"userId": USER_ID, "mode": "weekly"}
+
+    del mongo_ops[:]
+    client.get("/analytics/dashboard", query_string=query)
+    dashboard_ops = list(mongo_ops)
+
+    del mongo_ops[:]
+    for panel in ("summary", "plan-vs-actual", "subjects", "streak", "kanban"):
+        client.get(f"/analytics/{panel}", query_string=query)
+
+    assert dashboard_ops == [
+        ("daily_rollups", "aggregate"),
+        ("spent_logs", "aggregate"),
+        ("users", "find_one"),
+        ("quest_status_checkpoints", "find_one"),
+        ("quest_status_events", "find"),
+    ]
+    # the same reads, except that summary and plan-vs-actual each aggregate the rollups
+    assert len(mongo_ops) == 6
@@ -0,0 +1,102 @@
+# tests/test_conversation_digest.py
+import pytest
+
+import config
+import conversation_digest
+from conversation_cache import BUFFER_LIMIT, HISTORY_LIMIT
+from conversation_digest import current_digest, fold, load_uncovered, schedule_digest, uncovered
+from message_buckets import append_messages, latest_messages
+from models.quest import tutor_digests_collection
+
+USER_ID = 7
+
+@pytest.fixture(autouse=True)
+def digest_on(monkeypatch):
+    monkeypatch.setattr(config, "TUTOR_DIGEST", True)
+    conversation_digest._digests.entries.clear()
+
+def message(i):
+    return {
+        "messageId": f"{i}-{'U' if i % 2 == 0 else 'A'}",
+        "role": "user" if i % 2 == 0 else "assistant",
+        "content": f"message {i}",
+        "createdAt": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}.000Z"
+    }
+
+def store(n):
+    messages = [message(i) for i in range(n)]
+    for i in range(0, n, 2):
+        append_messages(USER_ID, messages[i:i + 2])
+    return messages
+
+def set_digest(through):
+    tutor_digests_collection.insert_one({"_id": USER_ID, "text": "earlier", "through": through})
+
+def test_prompt_reads_messages_the_buffer_no_longer_holds():
+    messages = store(40)
+    set_digest(messages[9]["createdAt"])  # a fold that fell behind: 30 messages uncovered
+    digest = current_digest(USER_ID)
+
+    buffered = latest_messages(USER_ID, BUFFER_LIMIT)
+    recent = uncovered(load_uncovered(USER_ID, buffered, digest), digest)
+
+    assert recent == messages[10:]
+
+def test_prompt_uses_the_buffer_when_it_reaches_the_digest():
+    messages = store(40)
+    set_digest(messages[33]["createdAt"])
+    digest = current_digest(USER_ID)
+
+    buffered = latest_messages(USER_ID, BUFFER_LIMIT)
+
+    assert load_uncovered(USER_ID, buffered, digest) is buffered
+    assert uncovered(buffered, digest) == messages[-HISTORY_LIMIT:]
+
+def test_fold_catches_up_oldest_first_in_chunks(monkeypatch):
+    messages = store(100)
+    folds = []
+    def fold_digest(digest, turns):
+        folds.append(turns)
+        return f"digest {len(folds)}"
+    monkeypatch.setattr(conversation_digest, "fold_digest", fold_digest)
+
+    assert fold(USER_ID) == 100 - HISTORY_LIMIT
+
+    sizes = [len(turns.splitlines()) for turns in folds]
+    assert sizes == [config.TUTOR_DIGEST_MAX_FOLD, config.TUTOR_DIGEST_MAX_FOLD, 100 - HISTORY_LIMIT - 2 * config.TUTOR_DIGEST_MAX_FOLD]
+    assert folds[0].splitlines()[0] == "User: message 0"
+    stored = tutor_digests_collection.find_one({"_id": USER_ID})
+    assert stored["text"] == "digest 3"
+    assert stored["through"] == messages[-HISTORY_LIMIT - 1]["createdAt"]
+
+    # caught up: nothing more until TUTOR_DIGEST_EVERY messages are waiting
+    assert fold(USER_ID) == 0
+
+def test_fold_resumes_from_the_stored_digest(monkeypatch):
+    messages = store(30)
+    set_digest(messages[11]["createdAt"])
+    folds = []
+    monkeypatch.setattr(conversation_digest, "fold_digest", lambda digest, turns: folds.append((digest, turns)) or "next")
+
+    assert fold(USER_ID) == 30 - HISTORY_LIMIT - 12
+
+    assert folds[0][0] == "earlier"
+    assert folds[0][1].splitlines()[0] == "User: message 12"
+
+def test_schedule_digest_decides_from_the_stored_digest(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(conversation_digest._pool, "submit", lambda fn, user_id: submitted.append(user_id))
+    messages = [message(i) for i in range(BUFFER_LIMIT)]
+
+    # a fold already covers all but the window: nothing to do, however many turns this worker saw
+    set_digest(messages[-HISTORY_LIMIT - 1]["createdAt"])
+    for _ in range(5):
+        schedule_digest(USER_ID, messages)
+    assert submitted == []
+
+    # a worker that never saw this user's earlier turns still folds a backlog
+    tutor_digests_collection.delete_many({})
+    conversation_digest._digests.entries.clear()
+    schedule_digest(USER_ID, messages)
+    assert submitted == [USER_ID]
+    conversation_digest._pending.discard(USER_ID)
@@ -0,0 +1,168 @@
+# tests/test_kanban.py
+from datetime import date, timedelta
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import kanban
+from analytics_cache import current_version
+from kanban import (
+    STATUSES, apply_event, backfill_status_events, build_kanban_buckets, delete_user_status_events,
+    status_baseline, status_event, status_snapshots
+)
+from models.quest import quests_collection, status_checkpoints_collection, status_events_collection
+
+def test_monthly_buckets_step_back_one_calendar_month():
+    buckets = build_kanban_buckets("monthly", date(2025, 10, 1), count=14)
+
+    assert [b["label"] for b in buckets] == [
+        "2024-09", "2024-10", "2024-11", "2024-12", "2025-01", "2025-02", "2025-03",
+        "2025-04", "2025-05", "2025-06", "2025-07", "2025-08", "2025-09", "2025-10"
+    ]
+    assert buckets[5]["start"] == date(2025, 2, 1)
+    assert buckets[5]["end"] == date(2025, 2, 28)
+    assert buckets[-1]["end"] == date(2025, 10, 31)
+
+@pytest.mark.parametrize("buckets", ["ten", "", "1.5", "100000"])
+def test_kanban_rejects_bad_bucket_counts(client, buckets):
+    response = client.get("/analytics/kanban", query_string={"userId": 1, "buckets": buckets})
+
+    assert response.status_code == 400
+
+def test_kanban_rejects_empty_and_negative_bucket_counts(client):
+    for buckets in (0, -3):
+        response = client.get("/analytics/kanban", query_string={"userId": 1, "buckets": buckets})
+        assert response.status_code == 400
+
+# -----------------------------
+# Checkpointed baseline
+# -----------------------------
+def seed_events(user_id):
+    events = []
+    for i in range(1, 13):
+        month = f"2025-{i:02d}"
+        events.append(status_event(user_id, i, "prepare", at=f"{month}-03T09:00:00Z"))
+        if i % 2:
+            events.append(status_event(user_id, i, "active", "prepare", at=f"{month}-20T09:00:00Z"))
+        if i % 4 == 1:
+            events.append(status_event(user_id, i, "done", "active", at=f"{month}-28T09:00:00Z"))
+    events.append(status_event(user_id, 3, None, "done", at="2025-11-15T09:00:00Z"))  # deleted
+    status_events_collection.insert_many(events)
+
+def full_scan_counts(user_id, before_day):
+    counts = {status: 0 for status in STATUSES}
+    for event in status_events_collection.find({"userId": user_id, "day": {"$lt": before_day}}):
+        apply_event(counts, event)
+    return counts
+
+def test_baseline_from_checkpoints_matches_full_scan():
+    seed_events(5)
+
+    for before_day in ("2025-01-01", "2025-03-20", "2025-07-01", "2025-06-15", "2025-12-31", "2026-02-10"):
+        assert status_baseline(5, before_day) == full_scan_counts(5, before_day)
+
+def test_baseline_stores_a_checkpoint_and_reads_only_events_after_it():
+    seed_events(5)
+
+    status_baseline(5, "2025-09-17")
+    checkpoint = status_checkpoints_collection.find_one({"userId": 5})
+    assert checkpoint["day"] == "2025-09-01"
+    assert checkpoint["counts"] == full_scan_counts(5, "2025-09-01")
+
+    # events before the checkpoint no longer count towards later baselines
+    status_events_collection.delete_many({"userId": 5, "day": {"$lt": "2025-09-01"}})
+    since = full_scan_counts(5, "2025-09-25")
+    assert status_baseline(5, "2025-09-25") == {
+        status: checkpoint["counts"][status] + since[status] for status in STATUSES
+    }
+
+def test_deleting_status_events_drops_checkpoints():
+    seed_events(5)
+    status_baseline(5, "2025-09-17")
+
+    delete_user_status_events(5)
+
+    assert status_checkpoints_collection.count_documents({"userId": 5}) == 0
+
+class RacingCheckpoints:
+    """
+    The upsert fails as if a concurrent baseline had just inserted the checkpoint.
+    """
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find_one(self, *args, **kwargs):
+        return self.collection.find_one(*args, **kwargs)
+
+    def update_one(self, query, update, upsert=False):
+        self.collection.update_one(query, update, upsert=upsert)
+        raise DuplicateKeyError("E11000 duplicate key")
+
+def test_baseline_that_loses_the_checkpoint_race_still_counts(monkeypatch):
+    seed_events(5)
+    monkeypatch.setattr(kanban, "status_checkpoints_collection", RacingCheckpoints(status_checkpoints_collection))
+
+    assert status_baseline(5, "2025-09-17") == full_scan_counts(5, "2025-09-17")
+    assert status_checkpoints_collection.count_documents({"userId": 5}) == 1
+
+@pytest.mark.parametrize("mode, end_date", [
+    ("daily", date(2025, 9, 4)), ("weekly", date(2025, 11, 20)), ("monthly", date(2026, 1, 31))
+])
+def test_snapshots_match_full_scan(mode, end_date):
+    seed_events(5)
+    status_baseline(5, "2025-06-15")  # an older checkpoint to start from
+
+    snapshots = status_snapshots(5, build_kanban_buckets(mode, end_date))
+
+    for bucket, snapshot in zip(build_kanban_buckets(mode, end_date), snapshots):
+        day_after = (bucket["end"] + timedelta(days=1)).isoformat()
+        assert snapshot == {"bucket": bucket["label"], **full_scan_counts(5, day_after)}
+
+# -----------------------------
+# Backfill
+# -----------------------------
+def test_backfill_replaces_events_and_checkpoints():
+    seed_events(5)
+    status_baseline(5, "2025-09-17")
+    quests_collection.insert_many([
+        {"userId": 5, "questId": 1, "status": "done", "created_at": "2025-01-02T00:00:00Z", "updated_at": "2025-02-02T00:00:00Z"},
+        {"userId": 5, "questId": 2, "status": "prepare", "created_at": "2025-03-02T00:00:00Z"},
+    ])
+    status_events_collection.insert_one(status_event(6, 1, "prepare", at="2025-01-01T00:00:00Z"))
+    version = current_version(5)
+
+    backfill_status_events([5])
+
+    events = status_events_collection.find({"userId": 5}, {"_id": 0, "questId": 1, "status": 1, "day": 1})
+    assert sorted((e["questId"], e["status"], e["day"]) for e in events) == [
+        (1, "done", "2025-02-02"), (1, "prepare", "2025-01-02"), (2, "prepare", "2025-03-02")
+    ]
+    assert status_checkpoints_collection.count_documents({"userId": 5}) == 0
+    assert status_events_collection.count_documents({"userId": 6}) == 1
+    assert current_version(5) == version + 1
+    assert status_baseline(5, "2025-09-17") == {"prepare": 1, "active": 0, "done": 1}
+
+class SnapshotDuringDelete:
+    """
+    A snapshot lands while the backfill is swapping the old events for the seed.
+    """
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def delete_many(self, query):
+        status_baseline(5, "2025-09-17")
+        return self.collection.delete_many(query)
+
+def test_snapshot_during_backfill_leaves_no_checkpoint_behind(monkeypatch):
+    seed_events(5)
+    quests_collection.insert_one({"userId": 5, "questId": 1, "status": "active", "created_at": "2025-01-02T00:00:00Z"})
+    monkeypatch.setattr(kanban, "status_events_collection", SnapshotDuringDelete(status_events_collection))
+
+    backfill_status_events([5])
+    monkeypatch.undo()
+
+    assert status_checkpoints_collection.count_documents({"userId": 5}) == 0
+    assert status_baseline(5, "2025-09-17") == {"prepare": 0, "active": 1, "done": 0}
@@ -0,0 +1,65 @@
+# tests/test_llm_gateway.py
+import time
+
+import pytest
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+import config
+import llm_gateway
+from fake_llm import FakeChatModel, FakeLLMError
+
+@pytest.fixture
+def state(monkeypatch):
+    """
+    A fresh "summary" chain with a short deadline.
+    """
+    state = llm_gateway.ChainState("summary")
+    monkeypatch.setitem(llm_gateway._chains, "summary", state)
+    monkeypatch.setitem(llm_gateway.DEADLINES_S, "summary", 0.3)
+    monkeypatch.setattr(config, "LLM_RETRY_BASE_S", 0.01)
+    monkeypatch.setattr(config, "LLM_MIN_ATTEMPT_S", 0.1)
+    return state
+
+def chain(latency_ms, error_rate=0):
+    model = FakeChatModel(
+        latency="fixed", latency_ms=latency_ms, token_ms=0, prompt_token_ms=0, error_rate=error_rate, timeout=30
+    )
+    return ChatPromptTemplate.from_messages([("human", "{question}")]) | model | StrOutputParser()
+
+def test_no_retry_without_enough_deadline_left(state):
+    with pytest.raises(FakeLLMError):
+        llm_gateway.call("summary", chain(latency_ms=250, error_rate=1), {"question": "flaky"})
+
+    # a 503 after 250ms of a 300ms deadline: less than LLM_MIN_ATTEMPT_S is left
+    assert state.counters["retries"] == 0
+
+def test_retries_while_the_deadline_allows(state, monkeypatch):
+    monkeypatch.setitem(llm_gateway.DEADLINES_S, "summary", 5)
+    monkeypatch.setattr(config, "LLM_RETRIES", 2)
+
+    with pytest.raises(FakeLLMError):
+        llm_gateway.call("summary", chain(latency_ms=0, error_rate=1), {"question": "flaky"})
+
+    assert state.counters["retries"] == 2
+
+def test_attempts_time_out_at_the_deadline(state):
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        llm_gateway.call("summary", chain(latency_ms=10_000), {"question": "stuck"})
+
+    assert time.monotonic() - started < 0.6
+    assert state.failures == 1
+
+def test_cancelled_stream_is_neither_a_success_nor_a_failure(state):
+    state.failures = config.LLM_BREAKER_FAILURES  # half-open: the next call is a probe
+
+    chunks = llm_gateway.stream("summary", chain(latency_ms=0), {"question": "hi"})
+    assert next(chunks)
+    assert state.probing
+    chunks.close()  # the client disconnected
+
+    assert not state.probing
+    assert state.failures == config.LLM_BREAKER_FAILURES
+    assert state.counters["ok"] == 0
+    assert state.slots.acquire(blocking=False)
@@ -0,0 +1,114 @@
+# tests/test_message_buckets.py
+from pymongo.errors import DuplicateKeyError
+
+import message_buckets
+from message_buckets import TURNS_PER_BUCKET, append_messages, latest_messages, message_page, migrate_user, scan, slim
+from models.quest import message_buckets_collection, messages_collection
+
+def turn(i):
+    at = f"2026-02-01T10:{i // 60:02d}:{i % 60:02d}"
+    return [
+        {"messageId": f"{i}-U", "role": "user", "content": f"q{i}", "createdAt": at + ".000Z"},
+        {"messageId": f"{i}-A", "role": "assistant", "content": f"a{i}", "createdAt": at + ".500Z"},
+    ]
+
+def test_turns_fill_one_bucket_per_sequence_range():
+    for seq in range(1, 2 * TURNS_PER_BUCKET + 3):
+        append_messages(5, turn(seq), seq)
+
+    buckets = {b["_id"]: b["count"] for b in message_buckets_collection.find({"userId": 5})}
+    assert buckets == {"5:0": 2 * (TURNS_PER_BUCKET - 1), "5:1": 2 * TURNS_PER_BUCKET, "5:2": 6}
+    last = 2 * TURNS_PER_BUCKET + 2
+    assert [m["content"] for m in latest_messages(5, 4)] == [f"q{last - 1}", f"a{last - 1}", f"q{last}", f"a{last}"]
+
+class RacingCollection:
+    """
+    The first upsert fails as if another turn's insert of the same bucket
+    had landed just before it.
+    """
+    def __init__(self, collection):
+        self.collection = collection
+        self.calls = []
+
+    def update_one(self, query, update, upsert=False):
+        self.calls.append(upsert)
+        if upsert:
+            self.collection.update_one(query, {"$setOnInsert": update["$setOnInsert"]}, upsert=True)
+            raise DuplicateKeyError("E11000 duplicate key")
+        return self.collection.update_one(query, update)
+
+def test_append_that_loses_the_insert_race_updates_the_winner(monkeypatch):
+    racing = RacingCollection(message_buckets_collection)
+    monkeypatch.setattr(message_buckets, "message_buckets_collection", racing)
+
+    append_messages(5, turn(1), 1)
+
+    assert racing.calls == [True, False]
+    assert message_buckets_collection.count_documents({"userId": 5}) == 1
+    assert message_buckets_collection.find_one({"_id": "5:0"})["count"] == 2
+
+def test_append_without_a_turn_sequence_takes_a_fresh_one():
+    append_messages(5, turn(1), None)
+    append_messages(5, turn(2), None)
+
+    assert message_buckets_collection.find_one({"_id": "5:0"})["count"] == 4
+
+def test_legacy_messages_are_indexed_in_read_order():
+    keys = [list(index["key"]) for index in messages_collection.index_information().values()]
+
+    assert [("userId", 1), ("createdAt", 1), ("messageId", 1)] in keys
+
+def test_pages_merge_legacy_and_bucketed_messages():
+    messages_collection.insert_many([{**m, "userId": 5} for i in (1, 2) for m in turn(i)])
+    for seq in (3, 4):
+        append_messages(5, turn(seq), seq)
+
+    page = message_page(5, limit=3)
+    older = message_page(5, limit=10, before=tuple(page["before"].split("|")))
+
+    assert [m["messageId"] for m in page["messages"]] == ["3-A", "4-U", "4-A"]
+    assert [m["messageId"] for m in older["messages"]] == ["1-U", "1-A", "2-U", "2-A", "3-U"]
+
+def test_scan_reads_past_a_full_page_into_overlapping_buckets():
+    # turns 2 and 3 ran concurrently across a bucket boundary: bucket 1 got
+    # turn 3's messages, bucket 0 turn 2's, which finished later
+    late = [{**m, "createdAt": m["createdAt"].replace("10:00:02", "10:00:04")} for m in turn(2)]
+    append_messages(5, turn(1), TURNS_PER_BUCKET - 2)
+    append_messages(5, turn(3), TURNS_PER_BUCKET)
+    append_messages(5, late, TURNS_PER_BUCKET - 1)
+    append_messages(5, turn(5), TURNS_PER_BUCKET + 1)
+
+    assert [m["messageId"] for m in scan(5, 4)] == ["5-A", "5-U", "2-A", "2-U"]
+    assert [m["messageId"] for m in scan(5, 2, after=("2026-02-01T10:00:01.500Z", "1-A"))] == ["3-U", "3-A"]
+
+def flat(i):
+    return [{**m, "userId": 5} for m in turn(i)]
+
+def test_migration_rerun_keeps_messages_a_smaller_earlier_bucket_missed(monkeypatch):
+    messages_collection.insert_many([m for i in range(1, 4) for m in flat(i)])
+    # an earlier run (TUTOR_BUCKET_SIZE=2) stored turn 1, then crashed
+    message_buckets_collection.insert_one({
+        "_id": "5:1-U", "userId": 5, "start": turn(1)[0]["createdAt"], "end": turn(1)[1]["createdAt"],
+        "count": 2, "messages": [slim(m) for m in turn(1)]
+    })
+    monkeypatch.setattr(message_buckets.config, "TUTOR_BUCKET_SIZE", 50)
+
+    assert migrate_user(5) == 6
+
+    assert messages_collection.count_documents({}) == 0
+    assert [m["messageId"] for m in latest_messages(5, 10)] == ["1-U", "1-A", "2-U", "2-A", "3-U", "3-A"]
+
+def test_migration_rerun_skips_messages_a_larger_earlier_bucket_holds(monkeypatch):
+    messages_collection.insert_many([m for i in range(1, 4) for m in flat(i)])
+    # an earlier run (TUTOR_BUCKET_SIZE=4) stored turns 1-2 but deleted no flat copies
+    message_buckets_collection.insert_one({
+        "_id": "5:1-U", "userId": 5, "start": turn(1)[0]["createdAt"], "end": turn(2)[1]["createdAt"],
+        "count": 4, "messages": [slim(m) for i in (1, 2) for m in turn(i)]
+    })
+    monkeypatch.setattr(message_buckets.config, "TUTOR_BUCKET_SIZE", 2)
+
+    assert migrate_user(5) == 6
+
+    assert messages_collection.count_documents({}) == 0
+    assert message_buckets_collection.count_documents({}) == 2
+    assert [m["messageId"] for m in latest_messages(5, 10)] == ["1-U", "1-A", "2-U", "2-A", "3-U", "3-A"]
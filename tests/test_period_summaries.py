@@ -0,0 +1,23 @@
+# tests/test_period_summaries.py
+import period_summaries
+from models.quest import daily_summaries_collection, pages_collection
+from period_summaries import get_period_summary, month_days
+
+def test_month_days_are_the_calendar_month():
+    assert month_days("2024-02") == [f"2024-02-{d:02d}" for d in range(1, 30)]
+    assert month_days("2025-12")[-1] == "2025-12-31"
+
+def test_monthly_summary_covers_the_analytics_month(monkeypatch):
+    # 2025-09-01 is in ISO week 36, whose Thursday is in August, and
+    # 2025-09-30 in week 40, whose Thursday is in October
+    for page_id, day in enumerate(["2025-08-31", "2025-09-01", "2025-09-15", "2025-09-30", "2025-10-01"]):
+        pages_collection.insert_one({"userId": 1, "pageId": page_id, "createdAt": f"{day}T10:00:00Z", "content": "notes"})
+        daily_summaries_collection.insert_one({
+            "userId": 1, "date": day, "version": 1, "stale": False,
+            "summary": f"studied on {day}", "fingerprint": f"fp-{day}", "updatedAt": f"{day}T23:00:00Z"
+        })
+    prompts = []
+    monkeypatch.setattr(period_summaries, "summarize_period", lambda period, text: prompts.append(text) or "a month")
+
+    assert get_period_summary(1, "monthly", "2025-09")["summary"] == "a month"
+    assert prompts == ["\n".join(f"{day}: studied on {day}" for day in ["2025-09-01", "2025-09-15", "2025-09-30"])]
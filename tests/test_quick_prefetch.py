@@ -0,0 +1,108 @@
+# tests/test_quick_prefetch.py
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+import quick_prefetch
+from models.quest import tutor_prefetch_collection
+from quick_prefetch import prefetch_stats, take_budget, take_prefetched
+
+@pytest.fixture(autouse=True)
+def prefetch(monkeypatch):
+    """
+    Prefetch on, with this worker's clicks, budgets and counters reset.
+    """
+    monkeypatch.setattr(config, "TUTOR_PREFETCH", True)
+    monkeypatch.setattr(quick_prefetch, "_clicks", Counter())
+    monkeypatch.setattr(quick_prefetch, "_budgets", type(quick_prefetch._budgets)())
+    monkeypatch.setattr(quick_prefetch, "_counters", dict.fromkeys(quick_prefetch._counters, 0))
+    yield
+    # generations scheduled by the test must not land in the next one's database
+    with quick_prefetch._lock:
+        inflight = list(quick_prefetch._inflight.values())
+    for future in inflight:
+        future.result()
+
+def store(user_id, assistant_message_id, action, content, used=False, age=timedelta(0)):
+    tutor_prefetch_collection.insert_one({
+        "assistantMessageId": assistant_message_id, "userId": user_id, "action": action,
+        "content": content, "used": used, "createdAt": datetime.utcnow() - age
+    })
+
+def send(client, user_id, quick_action, content=""):
+    response = client.post("/tutors", json={"userId": user_id, "quickAction": quick_action, "content": content})
+    assert response.status_code == 200
+    return response.get_json()["assistantMessage"]
+
+# -----------------------------
+# Budget
+# -----------------------------
+def test_budget_stops_at_the_hourly_limit(monkeypatch):
+    monkeypatch.setattr(config, "TUTOR_PREFETCH_BUDGET_PER_HOUR", 2)
+
+    assert [take_budget(1) for _ in range(3)] == [True, True, False]
+    assert take_budget(2)
+
+def test_expired_budget_windows_are_dropped(monkeypatch):
+    monkeypatch.setattr(config, "TUTOR_PREFETCH_BUDGET_PER_HOUR", 1)
+    now = [1000.0]
+    monkeypatch.setattr(quick_prefetch.time, "monotonic", lambda: now[0])
+    take_budget(1)
+    now[0] += 1800
+    take_budget(2)
+
+    now[0] += 1800  # user 1's window is an hour old, user 2's half that
+    assert take_budget(1)
+    assert not take_budget(2)
+    assert list(quick_prefetch._budgets) == [2, 1]
+
+# -----------------------------
+# Serving clicks
+# -----------------------------
+def test_click_is_served_once_from_the_stored_answer():
+    store(1, "10-A", "hint", "Try the chain rule.")
+
+    assert take_prefetched(1, "10-A", "hint") == "Try the chain rule."
+    assert take_prefetched(1, "10-A", "hint") is None  # already used
+    assert take_prefetched(1, "10-A", "why") is None
+
+    stats = prefetch_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["clicks"] == {"hint": 2, "why": 1}
+
+def test_click_on_another_users_message_is_a_miss():
+    store(1, "10-A", "hint", "Try the chain rule.")
+
+    assert take_prefetched(2, "10-A", "hint") is None
+    assert tutor_prefetch_collection.find_one({"assistantMessageId": "10-A"})["used"] is False
+
+def test_turn_prefetches_the_top_action_and_serves_its_click(client, monkeypatch):
+    monkeypatch.setattr(config, "TUTOR_PREFETCH_TOP_K", 1)
+    answer = send(client, 1, "text", "What is a derivative?")
+
+    # no clicks yet: "why" leads QUICK_ACTIONS; the click waits for it if still running
+    why = send(client, 1, "why")
+
+    stored = tutor_prefetch_collection.find_one({"assistantMessageId": answer["messageId"]})
+    assert (stored["action"], stored["used"]) == ("why", True)
+    assert why["content"] == stored["content"]
+    assert prefetch_stats()["hits"] == 1
+
+# -----------------------------
+# Stats
+# -----------------------------
+def test_hit_and_waste_rates():
+    store(1, "10-A", "hint", "a", used=True)
+    store(1, "10-A", "why", "b")
+    store(1, "11-A", "hint", "c")
+    store(1, "11-A", "why", "d")
+    store(1, "9-A", "hint", "e", age=timedelta(days=2))  # outside the last 24h
+    take_prefetched(1, "11-A", "hint")
+    take_prefetched(1, "12-A", "hint")
+
+    stats = prefetch_stats()
+
+    assert stats["hit_rate"] == 0.5
+    assert stats["last_24h"] == {"generated": 4, "used": 2, "waste_rate": 0.5}
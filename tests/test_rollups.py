@@ -0,0 +1,33 @@
+# tests/test_rollups.py
+import rollups
+from analytics_cache import current_version
+from models.quest import rollups_collection
+from rollups import rebuild_user_rollups, record_spent
+from spent_logs import record_log
+
+def test_rebuild_replaces_days_in_place_and_drops_stale_ones():
+    record_log(3, 1, "Math", "2025-03-01", 20)
+    record_spent(3, "Math", "2025-03-01", 20)
+    rollups_collection.insert_one({"userId": 3, "day": "2025-02-01", "actual_total": 99, "actual": {}})  # no logs left
+    record_spent(4, "Math", "2025-02-01", 5)  # another user's day stays
+    version = current_version(3)
+
+    assert rebuild_user_rollups(3) == 1
+
+    rows = list(rollups_collection.find({"userId": 3}, {"_id": 0}))
+    assert rows == [{"userId": 3, "day": "2025-03-01", "actual_total": 20, "actual": {"Math": 20}, "planned_total": 0, "active_logs": 1}]
+    assert rollups_collection.count_documents({"userId": 4}) == 1
+    assert current_version(3) == version + 1
+
+def test_rebuild_over_a_day_a_live_write_just_created(monkeypatch):
+    record_log(3, 1, "Math", "2025-03-01", 20)
+    build = rollups.build_user_rollups
+    def build_then_write(user_id):
+        days = build(user_id)
+        record_spent(3, "Math", "2025-03-01", 20)  # the rollup write of the log above lands now
+        return days
+    monkeypatch.setattr(rollups, "build_user_rollups", build_then_write)
+
+    rebuild_user_rollups(3)
+
+    assert rollups_collection.find_one({"userId": 3, "day": "2025-03-01"})["actual_total"] == 20
@@ -0,0 +1,72 @@
+# tests/test_spent_logs.py
+from datetime import datetime, timedelta
+
+from activity_bitmap import load_bitmap, rebuild_bitmap, streak_length
+from analytics_cache import current_version
+from models.quest import quests_collection, rollups_collection, spent_logs_collection, users_collection
+from rollups import rebuild_user_rollups
+from spent_logs import logs_by_quest, migrate, record_log
+
+def test_migration_moves_valid_logs_and_keeps_invalid_ones():
+    logs = [
+        {"spent_at": "2025-03-01", "spent_minutes": 30},
+        {"spent_at": "yesterday", "spent_minutes": 15},
+        {"spent_at": "2025-03-02T10:00:00Z", "spent_minutes": 20},
+        {"spent_minutes": 5},
+    ]
+    quests_collection.insert_one({"userId": 1, "questId": 10, "subject": "Math", "spent_total": 0, "spent_logs": logs})
+
+    assert migrate() == 1
+    assert current_version(1) == 1
+
+    quest = quests_collection.find_one({"questId": 10})
+    assert "spent_logs" not in quest
+    assert quest["spent_logs_invalid"] == [logs[1], logs[3]]
+    assert quest["spent_total"] == 50
+    assert logs_by_quest(1)[10] == [
+        {"spent_at": "2025-03-01", "spent_minutes": 30},
+        {"spent_at": "2025-03-02", "spent_minutes": 20},
+    ]
+    assert spent_logs_collection.count_documents({}) == 2
+
+def test_migrated_quests_hide_the_invalid_logs(client):
+    quests_collection.insert_one({"userId": 1, "questId": 10, "spent_logs": [{"spent_at": "never", "spent_minutes": 5}]})
+    migrate()
+
+    for include in ("", "logs"):
+        quest = client.get("/quests", query_string={"userId": 1, "include": include}).get_json()[0]
+        assert "spent_logs_invalid" not in quest
+
+# -----------------------------
+# Reads before the migration
+# -----------------------------
+def unmigrated_user():
+    today = datetime.utcnow().date()
+    days = [(today - timedelta(days=i)).isoformat() for i in (1, 0)]
+    users_collection.insert_one({"userId": 1})
+    quests_collection.insert_many([
+        {"userId": 1, "questId": 10, "subject": "Math", "spent_logs": [
+            {"spent_at": days[0], "spent_minutes": 30}, {"spent_at": "bad", "spent_minutes": 9}
+        ]},
+        {"userId": 1, "questId": 11, "subject": "Art"},
+    ])
+    record_log(1, 11, "Art", days[1], 20)
+    return days
+
+def test_rollup_rebuild_counts_unmigrated_logs(client):
+    days = unmigrated_user()
+
+    rebuild_user_rollups(1)
+    rebuild_bitmap(1)
+
+    rows = {row["day"]: row for row in rollups_collection.find({"userId": 1})}
+    assert rows[days[0]]["actual"] == {"Math": 30}
+    assert rows[days[1]]["actual"] == {"Art": 20}
+    assert streak_length(load_bitmap(1), datetime.utcnow().date()) == 2
+
+def test_subjects_count_unmigrated_logs(client):
+    unmigrated_user()
+
+    subjects = client.get("/analytics/subjects", query_string={"userId": 1}).get_json()
+
+    assert [(s["subject"], s["minutes"]) for s in subjects] == [("Math", 30), ("Art", 20)]
@@ -0,0 +1,34 @@
+# tests/test_summary_batch.py
+import threading
+
+import summary_batch
+from models.quest import batch_jobs_collection, daily_summaries_collection, pages_collection
+
+DATE = "2025-05-04"
+
+class RecordingLimiter:
+    def __init__(self):
+        self.threads = []
+
+    def acquire(self):
+        self.threads.append(threading.current_thread())
+
+def test_run_skips_current_users_and_takes_rate_tokens_in_the_workers(monkeypatch):
+    for user_id in range(1, 6):
+        pages_collection.insert_one({"userId": user_id, "pageId": user_id, "createdAt": f"{DATE}T08:00:00Z", "content": "x"})
+    daily_summaries_collection.insert_one({"userId": 2, "date": DATE, "stale": False, "summary": "ok", "fingerprint": "f"})
+
+    def fake_summary(user_id, date, stored):
+        assert stored is None
+        return {"summary": "s", "fingerprint": None if user_id == 4 else "f"}
+    limiter = RecordingLimiter()
+    monkeypatch.setattr(summary_batch, "get_daily_summary", fake_summary)
+    monkeypatch.setattr(summary_batch, "RateLimiter", lambda per_minute: limiter)
+
+    counts = summary_batch.run(DATE, concurrency=2)
+
+    assert counts == {"total": 5, "skipped": 1, "done": 3, "failed": 1}
+    assert len(limiter.threads) == 4
+    assert threading.main_thread() not in limiter.threads
+    job = batch_jobs_collection.find_one({"_id": f"daily-summaries:{DATE}"})
+    assert job["status"] == "finished_with_failures" and job["failedUserIds"] == [4]
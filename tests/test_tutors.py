@@ -0,0 +1,44 @@
+# tests/test_tutors.py
+import pytest
+
+import config
+
+def send(client, user_id, content):
+    response = client.post("/tutors", json={"userId": user_id, "quickAction": "text", "content": content})
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_tutor_turn_mongo_round_trips(client, mongo_ops, monkeypatch):
+    monkeypatch.setattr(config, "TUTOR_DIGEST", True)
+    send(client, 99, "warm up the ID allocator")
+
+    # first turn of a user this worker hasn't seen: bump the turn sequence,
+    # read the recent buckets (plus the pre-bucket messages) and the digest,
+    # then one write for both messages
+    del mongo_ops[:]
+    send(client, 1, "What is a derivative?")
+    assert mongo_ops == [
+        ("tutor_sequences", "find_one_and_update"),
+        ("message_buckets", "find"),
+        ("messages", "find"),
+        ("tutor_digests", "find_one"),
+        ("message_buckets", "update_one"),
+    ]
+
+    # steady conversation: history comes from this worker's buffer
+    for content in ("And an integral?", "Give me an example."):
+        del mongo_ops[:]
+        send(client, 1, content)
+        assert mongo_ops == [
+            ("tutor_sequences", "find_one_and_update"),
+            ("message_buckets", "update_one"),
+        ]
+
+def test_tutor_turns_are_stored_in_order(client):
+    for i in range(3):
+        send(client, 1, f"question {i}")
+
+    messages = client.get("/tutors", query_string={"userId": 1}).get_json()["messages"]
+
+    assert [m["role"] for m in messages] == ["user", "assistant"] * 3
+    assert [m["content"] for m in messages[::2]] == ["question 0", "question 1", "question 2"]
@@ -0,0 +1,15 @@
+# tests/test_users.py
+from models.quest import users_collection
+
+def test_update_user_does_not_return_the_activity_bitmap(client):
+    users_collection.insert_one({
+        "userId": 3, "email": "a@b.c", "password": "x", "nickname": "old",
+        "activity_bits": {"634": 7, "635": 1}
+    })
+
+    response = client.patch("/users", json={"userId": 3, "nickname": "new"})
+
+    assert response.status_code == 200
+    user = response.get_json()
+    assert user["nickname"] == "new"
+    assert "activity_bits" not in user and "password" not in user
@@ -1,13 +1,14 @@
 # tutor_agent.py
-
-from langchain_google_genai import ChatGoogleGenerativeAI
+import threading
+from collections import deque
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+import llm_gateway
 
 
 # 1) LLM (less restrictive, more stable)
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
+llm = llm_gateway.chat_model(
+    "tutor",
     temperature=0.3,
     max_output_tokens=300
 )
@@ -32,18 +33,93 @@ tutor_chain = tutor_prompt | llm | StrOutputParser()
 
 
 # 4) Public function
-def run_tutor(message: str, history: str) -> str:
+def run_tutor(message: str, history: str, coalesce: bool = False, chain: str = "tutor") -> str:
+    # coalesce: share one in-flight call with identical concurrent requests (quick actions)
+    # chain: gateway limits to use ("tutor_prefetch" for speculative quick actions)
     if not history or not history.strip():
         history = "No prior conversation."
 
-    response = tutor_chain.invoke({
+    response = llm_gateway.invoke(chain, tutor_chain, {
         "message": message,
         "history": history
-    })
+    }, coalesce=coalesce)
 
     return response.strip()
 
 
+# 5) Streaming variant: yields text chunks as Gemini produces them.
+# Closing the generator closes the upstream stream (cancels the call).
+def stream_tutor(message: str, history: str):
+    if not history or not history.strip():
+        history = "No prior conversation."
+
+    return llm_gateway.stream("tutor", tutor_chain, {
+        "message": message,
+        "history": history
+    })
+
+
+# 6) Time-to-first-token (last 500 streams)
+_ttft_ms = deque(maxlen=500)
+_stream_counts = {"streams": 0, "completed": 0, "cancelled": 0, "failed": 0}
+_stream_lock = threading.Lock()
+
+def record_stream(outcome, started, first_token_at=None):
+    with _stream_lock:
+        _stream_counts["streams"] += 1
+        _stream_counts[outcome] += 1
+        if first_token_at is not None:
+            _ttft_ms.append((first_token_at - started) * 1000)
+
+def stream_stats():
+    with _stream_lock:
+        samples = sorted(_ttft_ms)
+        counts = dict(_stream_counts)
+
+    def percentile(p):
+        return round(samples[min(len(samples) - 1, int(p * len(samples)))], 1) if samples else None
+
+    return {
+        **counts,
+        "ttft_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "samples": len(samples)}
+    }
+
+
+# 7) Rolling digest of older turns (conversation_digest.py)
+digest_llm = llm_gateway.chat_model(
+    "digest",
+    temperature=0.2,
+    max_output_tokens=300
+)
+
+digest_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "You keep a running summary of a tutoring conversation. "
+     "Merge the earlier summary with the new turns into one summary of at most 150 words: "
+     "topics covered, what the learner understood or struggled with, open questions. "
+     "Keep names, numbers and definitions the tutor may need later."),
+    ("human", "Earlier summary:\n{digest}\n\nNew turns:\n{turns}")
+])
+
+digest_chain = digest_prompt | digest_llm | StrOutputParser()
+
+def fold_digest(digest: str, turns: str) -> str:
+    return llm_gateway.invoke("digest", digest_chain, {
+        "digest": digest or "None yet.",
+        "turns": turns
+    }).strip()
+
+
+# Quick-action buttons shown under every assistant answer
+QUICK_ACTIONS = ("why", "hint", "example", "summary", "application")
+
+def quick_action_prompt(quick_action, last_text):
+    return (
+        f"User clicked '{quick_action}' on the last tutor answer:\n{last_text}\n"
+        "Respond appropriately to the user."
+    )
+
+
 def build_history(messages, limit=6, max_chars=1000):
     """
     messages: list of dicts -> {role: 'user'|'assistant', content: str}